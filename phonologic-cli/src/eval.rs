@@ -0,0 +1,271 @@
+use std::io::{self, BufRead, Write};
+use std::sync::mpsc::sync_channel;
+use std::thread;
+
+use phonologic::distance::feature_distance::FeatureCostCalculator;
+use phonologic::distance::levenshtein::ComputeCost;
+use phonologic::distance::phoneme_distance::PhonemeCostCalculator;
+use phonologic::distance::phoneme_tokenizer::PhonemeTokenizer;
+use phonologic::errors::PhlDistanceError;
+use phonologic::helpers::parallel::par_map;
+use phonologic::phl::systems::PhonologicalFeatureSystem;
+
+pub struct EvalOptions {
+    pub delimiter: char,
+    pub has_header: bool,
+    pub batch_size: usize,
+}
+
+/// One row of the input file.
+pub struct Record {
+    pub id: String,
+    pub reference: String,
+    pub hypothesis: String,
+}
+
+#[derive(Copy, Clone, Debug, Default, PartialEq)]
+pub struct Scores {
+    pub feature_cost: f64,
+    pub feature_length: f64,
+    pub phoneme_cost: f64,
+    pub phoneme_length: f64,
+}
+
+impl Scores {
+    pub fn feature_error_rate(&self) -> f64 {
+        rate(self.feature_cost, self.feature_length)
+    }
+
+    pub fn phoneme_error_rate(&self) -> f64 {
+        rate(self.phoneme_cost, self.phoneme_length)
+    }
+}
+
+fn rate(cost: f64, length: f64) -> f64 {
+    if length != 0.0 { cost / length } else { 0.0 }
+}
+
+/// Corpus totals. Error rates are pooled over every scored utterance, rather than averaged per utterance.
+#[derive(Clone, Debug, Default)]
+pub struct Totals {
+    pub utterances: usize,
+    pub failed: usize,
+    pub scores: Scores,
+}
+
+impl Totals {
+    fn add(&mut self, result: &Result<Scores, PhlDistanceError>) {
+        self.utterances += 1;
+        match result {
+            Ok(scores) => {
+                self.scores.feature_cost += scores.feature_cost;
+                self.scores.feature_length += scores.feature_length;
+                self.scores.phoneme_cost += scores.phoneme_cost;
+                self.scores.phoneme_length += scores.phoneme_length;
+            }
+            Err(_) => self.failed += 1,
+        }
+    }
+
+    pub fn feature_error_rate(&self) -> f64 {
+        self.scores.feature_error_rate()
+    }
+
+    pub fn phoneme_error_rate(&self) -> f64 {
+        self.scores.phoneme_error_rate()
+    }
+}
+
+pub struct Scorer<'a> {
+    system: &'a PhonologicalFeatureSystem,
+    tokenizer: PhonemeTokenizer,
+}
+
+impl<'a> Scorer<'a> {
+    pub fn new(system: &'a PhonologicalFeatureSystem) -> Self {
+        let tokenizer = PhonemeTokenizer::build(system);
+        Self { system, tokenizer }
+    }
+
+    /// Feature and phoneme costs of one pair. Only the totals are needed, so no alignment is built.
+    pub fn score(&self, reference: &str, hypothesis: &str) -> Result<Scores, PhlDistanceError> {
+        let reference = self.tokenizer.tokenize(reference);
+        let hypothesis = self.tokenizer.tokenize(hypothesis);
+        let feature_cost = FeatureCostCalculator::new(self.system).distance_only(&reference, &hypothesis)?;
+        let phoneme_cost = PhonemeCostCalculator::new(self.system).distance_only(&reference, &hypothesis)?;
+        Ok(Scores {
+            feature_cost: feature_cost.0,
+            feature_length: (reference.len() * self.system.num_features) as f64,
+            phoneme_cost: phoneme_cost.0,
+            phoneme_length: reference.len() as f64,
+        })
+    }
+}
+
+const OUTPUT_HEADER: &str = "utterance_id\tfer\tper\tfeature_cost\tfeature_length\tphoneme_cost\tphoneme_length\terror";
+
+/// Scores every row of `input`, writing a TSV row per utterance to `output` in input order.
+///
+/// A reader thread parses the next batch while the current one is scored across all cores, so at most a few batches
+/// are held in memory at once. Utterances that can't be scored (e.g. an unknown symbol) are reported in the `error`
+/// column and left out of the totals; a malformed row stops the run.
+pub fn evaluate<R: BufRead + Send, W: Write>(
+    scorer: &Scorer,
+    input: R,
+    output: &mut W,
+    options: &EvalOptions,
+) -> io::Result<Totals> {
+    writeln!(output, "{OUTPUT_HEADER}")?;
+    let mut totals = Totals::default();
+
+    thread::scope(|scope| {
+        let (sender, batches) = sync_channel::<io::Result<Vec<Record>>>(1);
+        let reader = scope.spawn(move || {
+            for batch in read_batches(input, options) {
+                let failed = batch.is_err();
+                if sender.send(batch).is_err() || failed {
+                    break;
+                }
+            }
+        });
+
+        for batch in batches {
+            let batch = batch?;
+            let results = par_map(&batch, |record| scorer.score(&record.reference, &record.hypothesis));
+            for (record, result) in batch.iter().zip(results.iter()) {
+                write_row(output, record, result)?;
+                totals.add(result);
+            }
+        }
+        reader.join().expect("reader thread panicked");
+        Ok(totals)
+    })
+}
+
+fn write_row<W: Write>(output: &mut W, record: &Record, result: &Result<Scores, PhlDistanceError>) -> io::Result<()> {
+    let id = record.id.replace(['\t', '\n'], " ");
+    match result {
+        Ok(s) => writeln!(
+            output,
+            "{id}\t{}\t{}\t{}\t{}\t{}\t{}\t",
+            s.feature_error_rate(), s.phoneme_error_rate(),
+            s.feature_cost, s.feature_length, s.phoneme_cost, s.phoneme_length,
+        ),
+        Err(e) => writeln!(output, "{id}\t\t\t\t\t\t\t{e:?}"),
+    }
+}
+
+/// Groups the rows of `input` into batches of `options.batch_size`, skipping the header and blank lines.
+fn read_batches<'a, R: BufRead + 'a>(
+    input: R,
+    options: &'a EvalOptions,
+) -> impl Iterator<Item=io::Result<Vec<Record>>> + 'a {
+    let skip = if options.has_header { 1 } else { 0 };
+    let mut records = input
+        .lines()
+        .enumerate()
+        .skip(skip)
+        .filter(|(_, line)| line.as_ref().map_or(true, |l| !l.trim().is_empty()))
+        .map(move |(idx, line)| parse_record(idx + 1, &line?, options.delimiter));
+    std::iter::from_fn(move || {
+        let mut batch = Vec::with_capacity(options.batch_size);
+        for record in records.by_ref() {
+            match record {
+                Ok(record) => batch.push(record),
+                Err(e) => return Some(Err(e)),
+            }
+            if batch.len() == options.batch_size {
+                break;
+            }
+        }
+        if batch.is_empty() { None } else { Some(Ok(batch)) }
+    })
+}
+
+fn parse_record(line_number: usize, line: &str, delimiter: char) -> io::Result<Record> {
+    let mut fields = split_fields(line.trim_end_matches('\r'), delimiter).into_iter();
+    match (fields.next(), fields.next(), fields.next()) {
+        (Some(id), Some(reference), Some(hypothesis)) => Ok(Record { id, reference, hypothesis }),
+        _ => Err(io::Error::new(
+            io::ErrorKind::InvalidData,
+            format!("line {line_number}: expected utterance id, reference and hypothesis columns"),
+        )),
+    }
+}
+
+/// Splits a delimited line, honoring double-quoted fields (with `""` for a literal quote) as CSV writers produce them.
+fn split_fields(line: &str, delimiter: char) -> Vec<String> {
+    let mut fields = vec![];
+    let mut field = String::new();
+    let mut quoted = false;
+    let mut chars = line.chars().peekable();
+    while let Some(c) = chars.next() {
+        if quoted {
+            match c {
+                '"' if chars.peek() == Some(&'"') => {
+                    field.push('"');
+                    chars.next();
+                }
+                '"' => quoted = false,
+                _ => field.push(c),
+            }
+        }
+        else if c == '"' && field.is_empty() {
+            quoted = true;
+        }
+        else if c == delimiter {
+            fields.push(std::mem::take(&mut field));
+        }
+        else {
+            field.push(c);
+        }
+    }
+    fields.push(field);
+    fields
+}
+
+#[cfg(test)]
+mod tests {
+    use phonologic::phl::systems::PhonologicalFeatureSystem;
+    use crate::eval::{evaluate, split_fields, EvalOptions, Scorer};
+
+    #[test]
+    fn test_evaluate() {
+        let system = PhonologicalFeatureSystem::load("hayes-arpabet").unwrap();
+        let scorer = Scorer::new(&system);
+        let input = "utterance_id\ttranscript\tasr_transcript\n\
+            house\tHH AW S\tHH AW S\n\
+            \n\
+            octopus\tAA K T AH P UH S\tAA K T T T AH P UH S\n\
+            comb\tK OW M\tK OW 1\n\
+            cat\tK AE T\tK AE D\n";
+        let options = EvalOptions { delimiter: '\t', has_header: true, batch_size: 2 };
+        let mut output = vec![];
+        let totals = evaluate(&scorer, input.as_bytes(), &mut output, &options).unwrap();
+        let output = String::from_utf8(output).unwrap();
+        let rows: Vec<Vec<&str>> = output.lines().map(|l| l.split('\t').collect()).collect();
+
+        assert_eq!(5, rows.len());
+        assert_eq!(vec!["house", "octopus", "comb", "cat"], rows[1..].iter().map(|r| r[0]).collect::<Vec<_>>());
+        assert_eq!(("0", "0", ""), (rows[1][1], rows[1][2], rows[1][7]));
+        assert_eq!(("2", "7"), (rows[2][5], rows[2][6]));
+        assert!(!rows[3][7].is_empty());
+        assert_eq!(("1", "3"), (rows[4][5], rows[4][6]));
+
+        assert_eq!((4, 1), (totals.utterances, totals.failed));
+        assert_eq!(3.0 / 13.0, totals.phoneme_error_rate());
+        assert!(totals.feature_error_rate() > 0.0);
+
+        let malformed = "a\tK AE T\tK AE T\nb\tK AE T\n";
+        let options = EvalOptions { delimiter: '\t', has_header: false, batch_size: 1 };
+        let error = evaluate(&scorer, malformed.as_bytes(), &mut vec![], &options).unwrap_err();
+        assert!(error.to_string().starts_with("line 2:"));
+    }
+
+    #[test]
+    fn test_split_fields() {
+        assert_eq!(vec!["a", "K AE T", "K AE D"], split_fields("a,K AE T,K AE D", ','));
+        assert_eq!(vec!["a, b", "say \"hi\"", ""], split_fields("\"a, b\",\"say \"\"hi\"\"\",", ','));
+        assert_eq!(vec!["a", "b,c"], split_fields("a\tb,c", '\t'));
+    }
+}
@@ -0,0 +1,133 @@
+extern crate phonologic;
+
+mod eval;
+
+use std::fs::File;
+use std::io::{self, BufReader, BufWriter, Read, Write};
+use std::path::PathBuf;
+use std::process::ExitCode;
+
+use clap::{Args, Parser, Subcommand};
+
+use phonologic::phl::systems::{PhonologicalFeatureSystem, COMPILED_EXTENSION};
+use crate::eval::{EvalOptions, Scorer};
+
+#[derive(Parser)]
+#[command(name = "phonologic", version, about = "Phonological feature distances between transcripts")]
+struct Cli {
+    #[command(subcommand)]
+    command: Command,
+}
+
+#[derive(Subcommand)]
+enum Command {
+    /// Score a file of (utterance id, reference, hypothesis) rows.
+    ///
+    /// Writes one row per utterance with its feature error rate (FER) and phoneme error rate (PER) as it goes, and
+    /// the corpus totals to stderr at the end. The file is read in batches, so memory use doesn't grow with its size.
+    Eval(EvalArgs),
+
+    /// Compile a .phl feature system into the binary form, which loads without parsing.
+    Compile(CompileArgs),
+}
+
+#[derive(Args)]
+struct CompileArgs {
+    /// The .phl file to compile
+    input: PathBuf,
+
+    /// Where to write the compiled system (defaults to the input path with a .phlb extension)
+    #[arg(short, long)]
+    output: Option<PathBuf>,
+}
+
+#[derive(Args)]
+struct EvalArgs {
+    /// TSV or CSV file to score, or `-` for stdin
+    input: PathBuf,
+
+    /// Feature system to score with. The default reads both IPA and ARPAbet
+    #[arg(short, long, default_value = "hayes-ipa-arpabet")]
+    system: String,
+
+    /// Where to write the per-utterance scores (defaults to stdout)
+    #[arg(short, long)]
+    output: Option<PathBuf>,
+
+    /// Field delimiter. Defaults to `,` for .csv files and a tab otherwise
+    #[arg(short, long)]
+    delimiter: Option<char>,
+
+    /// The first row is data, not a header
+    #[arg(long)]
+    no_header: bool,
+
+    /// Number of rows to read and score at a time
+    #[arg(long, default_value_t = 4096)]
+    batch_size: usize,
+}
+
+fn main() -> ExitCode {
+    let cli = Cli::parse();
+    let result = match cli.command {
+        Command::Eval(args) => run_eval(args),
+        Command::Compile(args) => run_compile(args),
+    };
+    match result {
+        Ok(()) => ExitCode::SUCCESS,
+        Err(e) if is_broken_pipe(e.as_ref()) => ExitCode::SUCCESS,
+        Err(e) => {
+            eprintln!("phonologic: {e}");
+            ExitCode::FAILURE
+        }
+    }
+}
+
+/// Output piped into something like `head` that stops reading isn't a failure.
+fn is_broken_pipe(e: &(dyn std::error::Error + 'static)) -> bool {
+    e.downcast_ref::<io::Error>().map_or(false, |e| e.kind() == io::ErrorKind::BrokenPipe)
+}
+
+fn run_eval(args: EvalArgs) -> Result<(), Box<dyn std::error::Error>> {
+    let system = PhonologicalFeatureSystem::load(&args.system)
+        .map_err(|e| format!("couldn't load system {:?}: {e:?}", args.system))?;
+    let scorer = Scorer::new(&system);
+
+    let is_csv = args.input.extension().map_or(false, |ext| ext.eq_ignore_ascii_case("csv"));
+    let options = EvalOptions {
+        delimiter: args.delimiter.unwrap_or(if is_csv { ',' } else { '\t' }),
+        has_header: !args.no_header,
+        batch_size: args.batch_size.max(1),
+    };
+
+    let input: Box<dyn Read + Send> = if args.input.as_os_str() == "-" {
+        Box::new(io::stdin())
+    }
+    else {
+        Box::new(File::open(&args.input).map_err(|e| format!("{}: {e}", args.input.display()))?)
+    };
+    let output: Box<dyn Write> = match &args.output {
+        Some(path) => Box::new(File::create(path).map_err(|e| format!("{}: {e}", path.display()))?),
+        None => Box::new(io::stdout().lock()),
+    };
+
+    let mut output = BufWriter::new(output);
+    let totals = eval::evaluate(&scorer, BufReader::new(input), &mut output, &options)?;
+    output.flush()?;
+
+    eprintln!("utterances\t{}", totals.utterances);
+    eprintln!("failed\t{}", totals.failed);
+    eprintln!("FER\t{}", totals.feature_error_rate());
+    eprintln!("PER\t{}", totals.phoneme_error_rate());
+    Ok(())
+}
+
+fn run_compile(args: CompileArgs) -> Result<(), Box<dyn std::error::Error>> {
+    let input = args.input.to_string_lossy();
+    let system = PhonologicalFeatureSystem::load(&input)
+        .map_err(|e| format!("couldn't load system {input:?}: {e:?}"))?;
+    let output = args.output.unwrap_or_else(|| args.input.with_extension(COMPILED_EXTENSION));
+    system.save(&output.to_string_lossy())
+        .map_err(|e| format!("couldn't write {}: {e:?}", output.display()))?;
+    Ok(())
+}
@@ -1,14 +1,28 @@
 extern crate phonologic;
 
-use js_sys::Array;
+use std::any::type_name;
+use std::borrow::Cow;
+use std::sync::Arc;
+
+use js_sys::{Array, Float64Array, Function, Int32Array, Object, Reflect, Uint32Array, Uint8Array};
 use wasm_bindgen::prelude::*;
+use wasm_bindgen::JsCast;
 
+use phonologic::distance::columnar::{AnalysisColumns, AnalysisColumnsBuilder};
+use phonologic::distance::cost_table::CostWeights;
 use phonologic::distance::feature_distance::FeatureCostCalculator;
-use phonologic::distance::levenshtein::{Action, ComputeCost, LevenshteinStep};
+use phonologic::distance::levenshtein::{
+    Action, ComputeCost, Cost, LevenshteinStep, SpaceBounded, DEFAULT_MAX_TABLE_CELLS,
+};
+use phonologic::distance::memo::{MemoCache, Memoized};
 use phonologic::distance::phoneme_distance::PhonemeCostCalculator;
 use phonologic::distance::phoneme_tokenizer::PhonemeTokenizer;
+use phonologic::distance::stats::{Recorded, Stats, Timer};
+use phonologic::distance::utterance::{self, Transcript};
 use phonologic::errors::PhlDistanceError;
 use phonologic::phl::parsing;
+use phonologic::phl::registry::{self, SharedSystem};
+use phonologic::phl::symbols::{SymbolId, SymbolTable};
 use phonologic::phl::systems::PhonologicalFeatureSystem;
 use crate::AnalysisAction::*;
 
@@ -30,6 +44,37 @@ impl Analysis {
     }
 }
 
+/// Phoneme and feature analyses of the same pair.
+#[wasm_bindgen(inspectable)]
+#[derive(Clone)]
+pub struct CombinedAnalysis {
+    pub(crate) phonemes: Analysis,
+    pub(crate) features: Analysis,
+}
+
+#[wasm_bindgen]
+impl CombinedAnalysis {
+    #[wasm_bindgen(getter)]
+    pub fn phonemes(&self) -> Analysis {
+        self.phonemes.clone()
+    }
+
+    #[wasm_bindgen(getter)]
+    pub fn features(&self) -> Analysis {
+        self.features.clone()
+    }
+}
+
+/// The totals of an `Analysis`, for when the alignment itself isn't needed.
+#[wasm_bindgen(inspectable)]
+#[derive(Clone)]
+pub struct Distance {
+    pub cost: f64,
+    pub length: f64,
+    #[wasm_bindgen(js_name = errorRate)]
+    pub error_rate: f64,
+}
+
 #[wasm_bindgen(inspectable)]
 #[derive(Clone)]
 pub struct AnalysisStep {
@@ -54,10 +99,11 @@ impl AnalysisStep {
 }
 
 impl AnalysisStep {
-    fn from(levenshtein_step: &LevenshteinStep<parsing::Symbol>, length: f64) -> Self {
+    fn from(levenshtein_step: &LevenshteinStep<SymbolId>, symbols: &SymbolTable, length: f64) -> Self {
         let action = levenshtein_step.action.into();
-        let left = levenshtein_step.expected.clone().unwrap_or(parsing::Symbol::new("")).to_string();
-        let right = levenshtein_step.actual.clone().unwrap_or(parsing::Symbol::new("")).to_string();
+        let resolve = |id: Option<SymbolId>| id.map(|id| symbols.resolve(id).to_string()).unwrap_or_default();
+        let left = resolve(levenshtein_step.expected);
+        let right = resolve(levenshtein_step.actual);
         let cost = levenshtein_step.cost.0;
         AnalysisStep { action, left, right, cost, length }
     }
@@ -138,58 +184,305 @@ impl FeatureDeltaCollection {
     }
 }
 
+/// A transcript tokenized and checked against a system once, by `PhlAnalyzer.tokenize`, for the `*Utterances`
+/// methods.
+#[wasm_bindgen]
+pub struct Utterance {
+    text: String,
+    utterance: utterance::Utterance,
+    system: Arc<PhonologicalFeatureSystem>,
+    tokenizer: Arc<PhonemeTokenizer>,
+}
+
+#[wasm_bindgen]
+impl Utterance {
+    #[wasm_bindgen(getter)]
+    pub fn text(&self) -> String {
+        self.text.clone()
+    }
+
+    #[wasm_bindgen(getter)]
+    pub fn symbols(&self) -> Array {
+        self.utterance.tokens().iter().map(|&id| JsValue::from(self.system.symbols().resolve(id).to_string())).collect()
+    }
+
+    /// The symbols the system has no features for, which feature costs would fail on, as `{position, symbol}`
+    /// objects.
+    #[wasm_bindgen(getter)]
+    pub fn unknown(&self) -> Array {
+        self.utterance.unknown()
+            .iter()
+            .map(|unknown| {
+                let object = Object::new();
+                set(&object, "position", unknown.position as f64);
+                set(&object, "symbol", unknown.symbol.to_string());
+                JsValue::from(object)
+            })
+            .collect()
+    }
+
+    #[wasm_bindgen(getter, js_name = isValid)]
+    pub fn is_valid(&self) -> bool {
+        self.utterance.is_valid()
+    }
+
+    #[wasm_bindgen(getter)]
+    pub fn length(&self) -> usize {
+        self.utterance.tokens().len()
+    }
+}
+
+impl Utterance {
+    /// Whether `analyzer` can score this without checking its symbols.
+    fn is_known_to(&self, analyzer: &PhlAnalyzer) -> bool {
+        Arc::ptr_eq(&self.tokenizer, &analyzer.tokenizer) && self.utterance.is_valid()
+    }
+}
+
+impl Transcript for Utterance {
+    fn tokens<'a>(&'a self, tokenizer: &PhonemeTokenizer) -> Cow<'a, Vec<SymbolId>> {
+        if std::ptr::eq(tokenizer, &*self.tokenizer) {
+            Cow::Borrowed(self.utterance.tokens())
+        }
+        else {
+            // Tokens of another system don't mean anything here
+            self.text.tokens(tokenizer)
+        }
+    }
+}
+
 #[wasm_bindgen(inspectable)]
 pub struct PhlAnalyzer {
-    system: PhonologicalFeatureSystem,
-    tokenizer: PhonemeTokenizer
+    system: Arc<PhonologicalFeatureSystem>,
+    tokenizer: Arc<PhonemeTokenizer>,
+    stats: Arc<Stats>,
+    memo: Option<Arc<MemoCache>>,
+    max_table_cells: usize,
 }
 
 impl PhlAnalyzer {
-    fn analysis<C: ComputeCost<parsing::Symbol>, LFn: Fn(&Vec<parsing::Symbol>) -> f64>(
+    fn analysis<C: ComputeCost<SymbolId>, LFn: Fn(&Vec<SymbolId>) -> f64>(
         &self,
         calculator: &C,
-        left: &str,
-        right: &str,
+        left: &(impl Transcript + ?Sized),
+        right: &(impl Transcript + ?Sized),
         length_fn: LFn
     ) -> Result<Analysis, PhlDistanceError> {
-        let left_tokens = self.tokenizer.tokenize(left);
-        let right_tokens = self.tokenizer.tokenize(right);
+        let (left_tokens, right_tokens) = self.stats.tokenize_pair(&self.tokenizer, left, right);
         let length = length_fn(&left_tokens);
-        let steps = calculator.diff_steps(&left_tokens, &right_tokens);
+        let steps = self.wrapped(&self.stats.recording(calculator)).diff_steps(&left_tokens, &right_tokens);
         let steps = steps?;
         let analysis = self.compile_analysis(steps, length);
         Ok(analysis)
     }
 
+    fn analysis_within<C: ComputeCost<SymbolId>, LFn: Fn(&Vec<SymbolId>) -> f64>(
+        &self,
+        calculator: &C,
+        left: &(impl Transcript + ?Sized),
+        right: &(impl Transcript + ?Sized),
+        max_cost: f64,
+        length_fn: LFn
+    ) -> Result<Option<Analysis>, PhlDistanceError> {
+        let (left_tokens, right_tokens) = self.stats.tokenize_pair(&self.tokenizer, left, right);
+        let length = length_fn(&left_tokens);
+        let recorded = self.stats.recording(calculator);
+        let steps = self.wrapped(&recorded).diff_steps_within(&left_tokens, &right_tokens, Cost(max_cost))?;
+        Ok(steps.map(|steps| self.compile_analysis(steps, length)))
+    }
+
+    /// Tokenizes the pair once and aligns it with both phoneme and feature costs.
+    fn combined_analysis(
+        &self,
+        features: &FeatureCostCalculator,
+        left: &(impl Transcript + ?Sized),
+        right: &(impl Transcript + ?Sized),
+    ) -> Result<CombinedAnalysis, PhlDistanceError> {
+        let (phoneme_steps, feature_steps, length) = self.combined_steps(features, left, right)?;
+        Ok(CombinedAnalysis {
+            phonemes: self.compile_analysis(phoneme_steps, length),
+            features: self.compile_analysis(feature_steps, length * self.system.num_features as f64),
+        })
+    }
+
+    /// Scores a pair into the columns of `analyzeBatch`, leaving them untouched if either side fails.
+    fn push_batch_pair(
+        &self,
+        phonemes: &mut AnalysisColumnsBuilder,
+        features: &mut AnalysisColumnsBuilder,
+        left: &str,
+        right: &str,
+        with_steps: bool,
+    ) -> Result<(), PhlDistanceError> {
+        let num_features = self.system.num_features as f64;
+        if with_steps {
+            let features_calculator = FeatureCostCalculator::new(&self.system);
+            let (phoneme_steps, feature_steps, length) = self.combined_steps(&features_calculator, left, right)?;
+            phonemes.push_steps(&phoneme_steps, length);
+            features.push_steps(&feature_steps, length * num_features);
+        }
+        else {
+            let (left_tokens, right_tokens) = self.stats.tokenize_pair(&self.tokenizer, left, right);
+            let phonemes_calculator = PhonemeCostCalculator::new(&self.system);
+            let features_calculator = FeatureCostCalculator::new(&self.system);
+            let phoneme_cost = self.wrapped(&self.stats.recording(&phonemes_calculator))
+                .distance_only(&left_tokens, &right_tokens)?;
+            let feature_cost = self.wrapped(&self.stats.recording(&features_calculator))
+                .distance_only(&left_tokens, &right_tokens)?;
+            let length = left_tokens.len() as f64;
+            phonemes.push_cost(phoneme_cost.0, length);
+            features.push_cost(feature_cost.0, length * num_features);
+        }
+        Ok(())
+    }
+
+    /// The phoneme and feature steps of a pair, and its length in phonemes.
+    fn combined_steps(
+        &self,
+        features: &FeatureCostCalculator,
+        left: &(impl Transcript + ?Sized),
+        right: &(impl Transcript + ?Sized),
+    ) -> Result<(Vec<LevenshteinStep<SymbolId>>, Vec<LevenshteinStep<SymbolId>>, f64), PhlDistanceError> {
+        let (left_tokens, right_tokens) = self.stats.tokenize_pair(&self.tokenizer, left, right);
+        let phonemes = PhonemeCostCalculator::new(&self.system);
+        let phoneme_steps = self.wrapped(&self.stats.recording(&phonemes)).diff_steps(&left_tokens, &right_tokens)?;
+        let feature_steps = self.wrapped(&self.stats.recording(features)).diff_steps(&left_tokens, &right_tokens)?;
+        Ok((phoneme_steps, feature_steps, left_tokens.len() as f64))
+    }
+
+    fn distance<C: ComputeCost<SymbolId>, LFn: Fn(&Vec<SymbolId>) -> f64>(
+        &self,
+        calculator: &C,
+        left: &(impl Transcript + ?Sized),
+        right: &(impl Transcript + ?Sized),
+        length_fn: LFn
+    ) -> Result<Distance, PhlDistanceError> {
+        let (left_tokens, right_tokens) = self.stats.tokenize_pair(&self.tokenizer, left, right);
+        let length = length_fn(&left_tokens);
+        let cost = self.wrapped(&self.stats.recording(calculator)).distance_only(&left_tokens, &right_tokens)?.0;
+        let error_rate = if length != 0.0 { cost / length } else { 0.0 };
+        Ok(Distance { cost, length, error_rate })
+    }
+
     fn compile_analysis(
         &self,
-        levenshtein_steps: Vec<LevenshteinStep<parsing::Symbol>>,
+        levenshtein_steps: Vec<LevenshteinStep<SymbolId>>,
         length: f64
     ) -> Analysis {
-        let steps: Vec<_> = levenshtein_steps
-            .into_iter()
-            .map(|step| AnalysisStep::from(&step, length))
-            .collect();
-        let cost = steps.iter().map(|step| step.cost).sum();
-        let error_rate = if length != 0.0 { cost / length as f64 } else { 0.0 };
-        Analysis { steps, cost, length, error_rate }
+        #[cfg(feature = "tracing")]
+        let _span = tracing::trace_span!("compile_analysis", steps = levenshtein_steps.len()).entered();
+        self.stats.time(Timer::Compile, || {
+            let steps: Vec<_> = levenshtein_steps
+                .into_iter()
+                .map(|step| AnalysisStep::from(&step, self.system.symbols(), length))
+                .collect();
+            let cost = steps.iter().map(|step| step.cost).sum();
+            let error_rate = if length != 0.0 { cost / length as f64 } else { 0.0 };
+            Analysis { steps, cost, length, error_rate }
+        })
+    }
+
+    /// `recorded`, answering from this analyzer's cache if it has one, and tracing pairs too big for the full table in
+    /// O(m log n) memory.
+    fn wrapped<'a, C>(&'a self, recorded: &'a Recorded<'a, C>) -> SpaceBounded<Memoized<'a, Recorded<'a, C>>> {
+        let memoized = Memoized::new(self.memo.as_deref(), type_name::<C>(), recorded);
+        SpaceBounded::new(memoized, self.max_table_cells)
+    }
+
+    /// Feature costs for a pair of utterances, which skip checking each symbol if both are valid for this system.
+    fn feature_costs(&self, left: &Utterance, right: &Utterance) -> FeatureCostCalculator<'_> {
+        if left.is_known_to(self) && right.is_known_to(self) {
+            FeatureCostCalculator::for_known(&self.system)
+        }
+        else {
+            FeatureCostCalculator::new(&self.system)
+        }
     }
 }
 
 #[wasm_bindgen]
 impl PhlAnalyzer {
+    /// With a `cacheSize`, remembers the alignments of up to that many pairs, so scoring a pair again (with the same
+    /// costs) skips the alignment.
+    ///
+    /// Pairs whose alignment table would have more than `maxTableCells` cells (reference length + 1 times hypothesis
+    /// length + 1) are traced to the same steps without the full table, in O(m log n) memory for a reference of
+    /// length n and a hypothesis of length m, taking roughly log₂ n times the fill time.
+    ///
+    /// `weights` customizes the costs, which are compiled again with them for this analyzer: an object with any of
+    /// `features` (weights by feature name, 1 for any not named), `substitution`, `deletion` and `insertion`
+    /// (multipliers), and `zeroCostSymbols` (symbols that cost nothing besides `<sil>`, `<unk>` and `<spn>`).
     #[wasm_bindgen(constructor)]
-    pub fn new(system_name: &str) -> Self {
-        let system = PhonologicalFeatureSystem::load(system_name);
-        let system = system.unwrap_throw();
-        let tokenizer = PhonemeTokenizer::build(&system);
-        Self { system, tokenizer }
+    pub fn new(
+        system_name: &str,
+        cache_size: Option<usize>,
+        max_table_cells: Option<usize>,
+        weights: Option<Object>,
+    ) -> Self {
+        let weights = weights.map(|weights| cost_weights(&weights)).unwrap_or_default();
+        let SharedSystem { system, tokenizer, .. } = registry::load(system_name)
+            .and_then(|shared| shared.weighted(&weights))
+            .unwrap_throw();
+        let memo = cache_size.filter(|&size| size > 0).map(|size| Arc::new(MemoCache::new(size)));
+        let max_table_cells = max_table_cells.unwrap_or(DEFAULT_MAX_TABLE_CELLS);
+        Self { system, tokenizer, stats: Arc::new(Stats::with_clock(performance_now)), memo, max_table_cells }
+    }
+
+    /// The cache's `hits`, `misses`, `evictions`, `size` and `capacity`, as a plain object. All zero without a cache.
+    #[wasm_bindgen(method, js_name = cacheStats)]
+    pub fn cache_stats(&self) -> Object {
+        let stats = self.memo.as_ref().map(|memo| memo.stats()).unwrap_or_default();
+        let object = Object::new();
+        set(&object, "hits", stats.hits as f64);
+        set(&object, "misses", stats.misses as f64);
+        set(&object, "evictions", stats.evictions as f64);
+        set(&object, "size", stats.len as f64);
+        set(&object, "capacity", stats.capacity as f64);
+        object
+    }
+
+    #[wasm_bindgen(method, js_name = clearCache)]
+    pub fn clear_cache(&self) {
+        if let Some(memo) = &self.memo {
+            memo.clear();
+        }
+    }
+
+    /// Starts (or, with `false`, stops) counting the work this analyzer does, for `stats`. Off by default, when it
+    /// costs nothing.
+    #[wasm_bindgen(method, js_name = enableStats)]
+    pub fn enable_stats(&self, enabled: Option<bool>) {
+        self.stats.set_enabled(enabled.unwrap_or(true));
+    }
+
+    /// What this analyzer has done since stats were enabled or last reset, as a plain object: `pairs`, `tokens`,
+    /// `cells` (dynamic programming cells filled), `costCalls`, `unknownSymbolErrors`, and the seconds spent in each of
+    /// `tokenize`, `fill`, `backtrace` and `compile`.
+    #[wasm_bindgen(method)]
+    pub fn stats(&self) -> Object {
+        let stats = self.stats.snapshot();
+        let object = Object::new();
+        set(&object, "pairs", stats.pairs as f64);
+        set(&object, "tokens", stats.tokens as f64);
+        set(&object, "cells", stats.cells as f64);
+        set(&object, "costCalls", stats.cost_calls as f64);
+        set(&object, "unknownSymbolErrors", stats.unknown_symbol_errors as f64);
+        set(&object, "tokenizeSeconds", stats.tokenize_seconds);
+        set(&object, "fillSeconds", stats.fill_seconds);
+        set(&object, "backtraceSeconds", stats.backtrace_seconds);
+        set(&object, "compileSeconds", stats.compile_seconds);
+        object
+    }
+
+    #[wasm_bindgen(method, js_name = resetStats)]
+    pub fn reset_stats(&self) {
+        self.stats.reset();
     }
 
     #[wasm_bindgen(method, js_name = featureDiff)]
     pub fn feature_diff(&self, left: &str, right: &str) -> Analysis {
         let calculator = FeatureCostCalculator::new(&self.system);
-        let length_fn = |tokens: &Vec<parsing::Symbol>| { (tokens.len() * self.system.num_features) as f64};
+        let length_fn = |tokens: &Vec<SymbolId>| { (tokens.len() * self.system.num_features) as f64};
         let analysis = self.analysis(&calculator, left, right, length_fn);
         analysis.unwrap()
     }
@@ -197,22 +490,155 @@ impl PhlAnalyzer {
     #[wasm_bindgen(method, js_name = phonemeDiff)]
     pub fn phoneme_diff(&self, left: &str, right: &str) -> Analysis {
         let calculator = PhonemeCostCalculator::new(&self.system);
-        let length_fn = |tokens: &Vec<parsing::Symbol>| tokens.len() as f64;
+        let length_fn = |tokens: &Vec<SymbolId>| tokens.len() as f64;
         let analysis = self.analysis(&calculator, left, right, length_fn);
         analysis.unwrap()
     }
 
+    /// Both `phonemeDiff` and `featureDiff` of a pair, tokenizing it only once.
+    #[wasm_bindgen(method)]
+    pub fn analyze(&self, left: &str, right: &str) -> CombinedAnalysis {
+        self.combined_analysis(&FeatureCostCalculator::new(&self.system), left, right).unwrap()
+    }
+
+    /// `analyze` for many pairs at once, packed into typed arrays instead of an object per step, so the result can be
+    /// posted from a worker by transferring its buffers.
+    ///
+    /// Returns a plain object with `phonemes` and `features` columns: `cost`, `length` and `errorRate` per pair, and
+    /// the steps of pair `i` as rows `stepOffsets[i]..stepOffsets[i + 1]` of `stepAction` (an index into `actions`),
+    /// `stepLeft`/`stepRight` (indices into `symbols`, -1 for the empty side of an insertion or deletion) and
+    /// `stepCost`. Pairs that can't be scored are listed in `failed`, with their message in `errors`; their totals
+    /// are NaN and they have no steps.
+    ///
+    /// With `withSteps` set to `false`, only the totals are computed and every pair has no steps.
+    #[wasm_bindgen(method, js_name = analyzeBatch)]
+    pub fn analyze_batch(&self, left: Array, right: Array, with_steps: Option<bool>) -> Object {
+        let with_steps = with_steps.unwrap_or(true);
+        let symbols = self.system.symbols();
+        let mut phonemes = AnalysisColumnsBuilder::new(symbols);
+        let mut features = AnalysisColumnsBuilder::new(symbols);
+        let mut failed = vec![];
+        let errors = Array::new();
+        for i in 0..left.length().min(right.length()) {
+            let result = match (left.get(i).as_string(), right.get(i).as_string()) {
+                (Some(left), Some(right)) => self
+                    .push_batch_pair(&mut phonemes, &mut features, &left, &right, with_steps)
+                    .map_err(|e| format!("{e:?}")),
+                _ => Err("Transcripts must be strings".to_string()),
+            };
+            if let Err(message) = result {
+                failed.push(i);
+                errors.push(&JsValue::from(message));
+                phonemes.push_cost(f64::NAN, f64::NAN);
+                features.push_cost(f64::NAN, f64::NAN);
+            }
+        }
+
+        // Feature costs fail on symbols outside the system, so the symbols the phoneme columns added cover both
+        let phonemes = phonemes.finish();
+        let batch = Object::new();
+        set(&batch, "symbols", phonemes.symbols.iter().map(JsValue::from).collect::<Array>());
+        set(&batch, "actions", ["EQ", "DEL", "INS", "SUB"].into_iter().map(JsValue::from).collect::<Array>());
+        set(&batch, "phonemes", columns_object(&phonemes));
+        set(&batch, "features", columns_object(&features.finish()));
+        set(&batch, "failed", Uint32Array::from(&failed[..]));
+        set(&batch, "errors", errors);
+        batch
+    }
+
+    /// `undefined` when the cost exceeds `maxCost`.
+    #[wasm_bindgen(method, js_name = featureDiffWithin)]
+    pub fn feature_diff_within(&self, left: &str, right: &str, max_cost: f64) -> Option<Analysis> {
+        let calculator = FeatureCostCalculator::new(&self.system);
+        let length_fn = |tokens: &Vec<SymbolId>| { (tokens.len() * self.system.num_features) as f64};
+        let analysis = self.analysis_within(&calculator, left, right, max_cost, length_fn);
+        analysis.unwrap()
+    }
+
+    /// `undefined` when the cost exceeds `maxCost`.
+    #[wasm_bindgen(method, js_name = phonemeDiffWithin)]
+    pub fn phoneme_diff_within(&self, left: &str, right: &str, max_cost: f64) -> Option<Analysis> {
+        let calculator = PhonemeCostCalculator::new(&self.system);
+        let length_fn = |tokens: &Vec<SymbolId>| tokens.len() as f64;
+        let analysis = self.analysis_within(&calculator, left, right, max_cost, length_fn);
+        analysis.unwrap()
+    }
+
+    #[wasm_bindgen(method, js_name = featureDistance)]
+    pub fn feature_distance(&self, left: &str, right: &str) -> Distance {
+        let calculator = FeatureCostCalculator::new(&self.system);
+        let length_fn = |tokens: &Vec<SymbolId>| { (tokens.len() * self.system.num_features) as f64};
+        let distance = self.distance(&calculator, left, right, length_fn);
+        distance.unwrap()
+    }
+
+    #[wasm_bindgen(method, js_name = phonemeDistance)]
+    pub fn phoneme_distance(&self, left: &str, right: &str) -> Distance {
+        let calculator = PhonemeCostCalculator::new(&self.system);
+        let length_fn = |tokens: &Vec<SymbolId>| tokens.len() as f64;
+        let distance = self.distance(&calculator, left, right, length_fn);
+        distance.unwrap()
+    }
+
+    /// Tokenizes `text` and checks its symbols against the system once, for scoring it any number of times with the
+    /// `*Utterances` methods.
+    #[wasm_bindgen(method)]
+    pub fn tokenize(&self, text: &str) -> Utterance {
+        Utterance {
+            text: text.to_string(),
+            utterance: utterance::Utterance::new(&self.tokenizer, &self.system, text),
+            system: self.system.clone(),
+            tokenizer: self.tokenizer.clone(),
+        }
+    }
+
+    /// `featureDiff` of two utterances. Throws, rather than panicking, if a symbol isn't in the system.
+    #[wasm_bindgen(method, js_name = featureDiffUtterances)]
+    pub fn feature_diff_utterances(&self, left: &Utterance, right: &Utterance) -> Result<Analysis, JsValue> {
+        let calculator = self.feature_costs(left, right);
+        let length_fn = |tokens: &Vec<SymbolId>| { (tokens.len() * self.system.num_features) as f64};
+        self.analysis(&calculator, left, right, length_fn).map_err(js_error)
+    }
+
+    #[wasm_bindgen(method, js_name = phonemeDiffUtterances)]
+    pub fn phoneme_diff_utterances(&self, left: &Utterance, right: &Utterance) -> Result<Analysis, JsValue> {
+        let calculator = PhonemeCostCalculator::new(&self.system);
+        let length_fn = |tokens: &Vec<SymbolId>| tokens.len() as f64;
+        self.analysis(&calculator, left, right, length_fn).map_err(js_error)
+    }
+
+    #[wasm_bindgen(method, js_name = analyzeUtterances)]
+    pub fn analyze_utterances(&self, left: &Utterance, right: &Utterance) -> Result<CombinedAnalysis, JsValue> {
+        self.combined_analysis(&self.feature_costs(left, right), left, right).map_err(js_error)
+    }
+
+    #[wasm_bindgen(method, js_name = featureDistanceUtterances)]
+    pub fn feature_distance_utterances(&self, left: &Utterance, right: &Utterance) -> Result<Distance, JsValue> {
+        let calculator = self.feature_costs(left, right);
+        let length_fn = |tokens: &Vec<SymbolId>| { (tokens.len() * self.system.num_features) as f64};
+        self.distance(&calculator, left, right, length_fn).map_err(js_error)
+    }
+
+    #[wasm_bindgen(method, js_name = phonemeDistanceUtterances)]
+    pub fn phoneme_distance_utterances(&self, left: &Utterance, right: &Utterance) -> Result<Distance, JsValue> {
+        let calculator = PhonemeCostCalculator::new(&self.system);
+        let length_fn = |tokens: &Vec<SymbolId>| tokens.len() as f64;
+        self.distance(&calculator, left, right, length_fn).map_err(js_error)
+    }
+
     #[wasm_bindgen(method, js_name = featureDeltas)]
-    pub fn feature_deltas(&self, left: &str, right: &str) -> FeatureDeltaCollection {
+    pub fn feature_deltas(&self, left: &str, right: &str) -> Result<FeatureDeltaCollection, JsValue> {
         let left_tokens = self.tokenizer.tokenize(left);
         let right_tokens = self.tokenizer.tokenize(right);
         if left_tokens.len() != 1 || right_tokens.len() != 1 {
-            panic!("Invalid input {left} / {right}")
+            return Err(JsError::new(&format!("Invalid input {left} / {right}")).into());
         }
-        let left_token = &left_tokens[0];
-        let right_token = &right_tokens[0];
-        let analysis = self.feature_diff(&left.to_string(), &right.to_string());
-        let deltas = self.system.deltas(left_token, right_token)
+        let no_features = || JsError::new(&format!("No features to compare in {left} / {right}"));
+        let deltas = self.system.deltas(left_tokens[0], right_tokens[0]).ok_or_else(no_features)?;
+        let calculator = FeatureCostCalculator::new(&self.system);
+        let length_fn = |tokens: &Vec<SymbolId>| { (tokens.len() * self.system.num_features) as f64};
+        let analysis = self.analysis(&calculator, left, right, length_fn).map_err(js_error)?;
+        let deltas = deltas
             .into_iter()
             .map(|d| FeatureDelta{
                 name: d.name,
@@ -221,6 +647,70 @@ impl PhlAnalyzer {
                 cost: analysis.cost,
             })
             .collect();
-        FeatureDeltaCollection{ deltas }
+        Ok(FeatureDeltaCollection{ deltas })
+    }
+}
+
+fn js_error(e: PhlDistanceError) -> JsValue {
+    JsError::new(&format!("{e:?}")).into()
+}
+
+fn columns_object(columns: &AnalysisColumns) -> Object {
+    let step_offsets: Vec<u32> = columns.step_offsets.iter().map(|&offset| offset as u32).collect();
+    let object = Object::new();
+    set(&object, "cost", Float64Array::from(&columns.cost[..]));
+    set(&object, "length", Float64Array::from(&columns.length[..]));
+    set(&object, "errorRate", Float64Array::from(&columns.error_rate[..]));
+    set(&object, "stepOffsets", Uint32Array::from(&step_offsets[..]));
+    set(&object, "stepAction", Uint8Array::from(&columns.step_action[..]));
+    set(&object, "stepLeft", Int32Array::from(&columns.step_left[..]));
+    set(&object, "stepRight", Int32Array::from(&columns.step_right[..]));
+    set(&object, "stepCost", Float64Array::from(&columns.step_cost[..]));
+    object
+}
+
+/// `performance.now()` in seconds, from the window or worker we're running in.
+fn performance_now() -> f64 {
+    let now = Reflect::get(&js_sys::global(), &"performance".into()).and_then(|performance| {
+        let now: Function = Reflect::get(&performance, &"now".into())?.unchecked_into();
+        now.call0(&performance)
+    });
+    now.ok().and_then(|ms| ms.as_f64()).map_or(0.0, |ms| ms / 1000.0)
+}
+
+/// The `CostWeights` a `weights` object passed to the constructor describes. Throws if any of them isn't a number.
+fn cost_weights(object: &Object) -> CostWeights {
+    let get = |key: &str| Reflect::get(object, &key.into()).unwrap_throw();
+    let number = |value: JsValue, name: &str| value.as_f64().expect_throw(&format!("Weight of {name} isn't a number"));
+    let multiplier = |key: &str| {
+        let value = get(key);
+        if value.is_undefined() { 1.0 } else { number(value, key) }
+    };
+    let mut weights = CostWeights {
+        substitution: multiplier("substitution"),
+        deletion: multiplier("deletion"),
+        insertion: multiplier("insertion"),
+        ..Default::default()
+    };
+    let features = get("features");
+    if features.is_object() {
+        for entry in Object::entries(features.unchecked_ref()).iter() {
+            let entry: Array = entry.unchecked_into();
+            let name = entry.get(0).as_string().unwrap_throw();
+            let weight = number(entry.get(1), &name);
+            weights.features.insert(name, weight);
+        }
+    }
+    let zero_cost_symbols = get("zeroCostSymbols");
+    if Array::is_array(&zero_cost_symbols) {
+        weights.zero_cost_symbols = Array::from(&zero_cost_symbols)
+            .iter()
+            .map(|symbol| symbol.as_string().expect_throw("Zero-cost symbols must be strings"))
+            .collect();
     }
-}
\ No newline at end of file
+    weights
+}
+
+fn set(object: &Object, key: &str, value: impl Into<JsValue>) {
+    Reflect::set(object, &key.into(), &value.into()).unwrap_throw();
+}
@@ -0,0 +1,23 @@
+import {useEffect, useState} from "react";
+import type {Analysis, AnalysisTrace} from "../services/AnalysisService";
+import {AnalysisService} from "../services/AnalysisService";
+
+/** The trace of an analysis, computed the first time something shows it; null until it's ready. */
+export function useTrace(analysis: Analysis|null) {
+    const [trace, setTrace] = useState<AnalysisTrace|null>(() => analysis && AnalysisService.cachedTrace(analysis));
+
+    useEffect(() => {
+        if (!analysis) {
+            setTrace(null);
+            return;
+        }
+        let current = true;
+        setTrace(AnalysisService.cachedTrace(analysis));
+        AnalysisService.getTrace(analysis).then(trace => current && setTrace(trace));
+        return () => {
+            current = false;
+        };
+    }, [analysis]);
+
+    return trace;
+}
@@ -5,6 +5,7 @@ import {useContext, useEffect, useState} from "react";
 import {Analysis, AnalysisService} from "../services/AnalysisService";
 import {FeatureDelta} from "@phonologic/wasm";
 import {HoverContext} from "../HoverContext";
+import {useTrace} from "../analysis/useTrace";
 
 type DeltasProps = {
     step: AnalysisStep
@@ -38,6 +39,7 @@ type DetailsProps = {
 
 export function Details({selectedId, alphabet, analysis}: DetailsProps) {
     const [_, setHoverIndex] = useContext(HoverContext);
+    const trace = useTrace(analysis);
     function stepFeatureCost(step: AnalysisStep) {
         return `${costFormatted(step.cost)} / 24`
     }
@@ -47,7 +49,7 @@ export function Details({selectedId, alphabet, analysis}: DetailsProps) {
         return `${rounded}`
     }
 
-    let steps = analysis.features.steps;
+    let steps = trace?.features ?? [];
     return (
         <div id="detail" style={{visibility: selectedId ? "visible" : "hidden"}}>
             <table className="feature-steps">
@@ -2,6 +2,7 @@ import {AlignedSteps} from "../analysis/AlignedSteps";
 import {Analysis} from "../services/AnalysisService";
 import {Component} from "react";
 import {ErrorRate} from "../analysis/ErrorRate";
+import {useTrace} from "../analysis/useTrace";
 
 type TranscriptDiffProps = {
     // detailHoverIndex: number|null,
@@ -12,10 +13,11 @@ type TranscriptDiffProps = {
 }
 
 export function TranscriptDiff({alphabet, analysis, labelLeft, labelRight}: TranscriptDiffProps) {
+    const trace = useTrace(analysis);
     return (
         <div id="item" v-if="analysis">
                     <AlignedSteps
-                        steps={analysis.features.steps}
+                        steps={trace?.features ?? []}
                         alphabet={alphabet}
                         labelLeft={labelLeft}
                         labelRight={labelRight}
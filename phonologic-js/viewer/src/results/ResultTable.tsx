@@ -3,6 +3,7 @@ import {ResultTableRow} from "./ResultTableRow";
 // import ResultTableRowError from "./ResultTableRowError";
 import {Analysis, AnalysisCollection, AnalysisException} from "../services/AnalysisService";
 import {Component, useState} from "react";
+import {useVirtualRows} from "./useVirtualRows";
 
 type ResultTableRowErrorProps = {
     analysisException: AnalysisException
@@ -30,6 +31,7 @@ type ResultTableState = {
 export function ResultTable({loading, show, analyses, alphabet, labelLeft, labelRight}: ResultTableProps) {
     const [selectedId, setSelectedId] = useState<string>();
     const [analysis, setAnalysis] = useState<Analysis>();
+    const {bodyRef, rows} = useVirtualRows(analyses?.length ?? 0);
 
     return (
         <div>
@@ -58,8 +60,13 @@ export function ResultTable({loading, show, analyses, alphabet, labelLeft, label
                             key={idx}
                             analysisException={analysisException} />)
                     }
+                    </tbody>
+                    <tbody ref={bodyRef}>
+                    {(rows.before > 0 &&
+                        <tr className="virtual-spacer" style={{height: rows.before}}><td colSpan={6} /></tr>
+                    ) || null}
 
-                    {analyses.map(analysis => {
+                    {analyses.slice(rows.start, rows.end).map(analysis => {
                         return <ResultTableRow
                             // class={{highlight: state.selectedId === analysis.id}}
                             onSelect={() => show(analysis.id)}
@@ -71,6 +78,9 @@ export function ResultTable({loading, show, analyses, alphabet, labelLeft, label
 
                     })}
 
+                    {(rows.after > 0 &&
+                        <tr className="virtual-spacer" style={{height: rows.after}}><td colSpan={6} /></tr>
+                    ) || null}
                     </tbody>
                 </table>
             ) || null}
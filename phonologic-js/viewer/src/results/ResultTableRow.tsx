@@ -4,6 +4,7 @@ import {Analysis} from "../services/AnalysisService";
 import {ErrorRate} from "../analysis/ErrorRate";
 import {Distance} from "../analysis/Distance";
 import {Button} from "react-bootstrap";
+import {useTrace} from "../analysis/useTrace";
 
 type ResultTableRowProps = {
     onSelect: () => void,
@@ -15,6 +16,7 @@ type ResultTableRowProps = {
 
 export function ResultTableRow({onSelect, analysis, alphabet, labelLeft, labelRight}: ResultTableRowProps) {
     let {distance, expectedLength} = analysis.features;
+    const trace = useTrace(analysis);
     return (
         <tr>
             <td className="column-utterance-id">
@@ -22,7 +24,7 @@ export function ResultTableRow({onSelect, analysis, alphabet, labelLeft, labelRi
             </td>
             <td className="column-transcript">
                 <AlignedSteps
-                    steps={analysis.features.steps}
+                    steps={trace?.features ?? []}
                     alphabet={alphabet}
                     labelLeft={labelLeft}
                     labelRight={labelRight}/>
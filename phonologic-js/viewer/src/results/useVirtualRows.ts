@@ -0,0 +1,68 @@
+import {useEffect, useRef, useState} from "react";
+
+type VirtualRows = {
+    start: number,
+    end: number,
+    before: number,
+    after: number,
+};
+
+/** The nearest ancestor that scrolls, or null if it's the window. */
+function scrollParent(element: HTMLElement): HTMLElement|null {
+    for (let parent = element.parentElement; parent; parent = parent.parentElement) {
+        if (/(auto|scroll)/.test(getComputedStyle(parent).overflowY)) {
+            return parent;
+        }
+    }
+    return null;
+}
+
+/**
+ * The range of `count` rows of a table body that are in view, give or take `overscan` rows, so only those need to be
+ * rendered. `before` and `after` are the heights of the rows left out, for spacers that keep the scrollbar honest.
+ * Rows are assumed to be as tall as the first one rendered.
+ */
+export function useVirtualRows(count: number, estimatedHeight: number = 80, overscan: number = 10) {
+    const bodyRef = useRef<HTMLTableSectionElement>(null);
+    const [rowHeight, setRowHeight] = useState(estimatedHeight);
+    const [range, setRange] = useState({start: 0, end: 0});
+
+    useEffect(() => {
+        const body = bodyRef.current;
+        if (!body) {
+            return;
+        }
+        const scroller = scrollParent(body);
+        const target = scroller || window;
+        const update = () => {
+            const row = Array.from(body.rows).find(row => !row.classList.contains("virtual-spacer"));
+            const height = row?.offsetHeight || rowHeight;
+            const viewportTop = scroller ? scroller.getBoundingClientRect().top : 0;
+            const viewportHeight = scroller ? scroller.clientHeight : window.innerHeight;
+            const scrolledPast = Math.max(0, viewportTop - body.getBoundingClientRect().top);
+            const start = Math.max(0, Math.floor(scrolledPast / height) - overscan);
+            const end = Math.min(count, Math.ceil((scrolledPast + viewportHeight) / height) + overscan);
+            setRowHeight(height);
+            setRange(range => range.start === start && range.end === end ? range : {start, end});
+        };
+        update();
+        target.addEventListener("scroll", update, {passive: true});
+        window.addEventListener("resize", update);
+        return () => {
+            target.removeEventListener("scroll", update);
+            window.removeEventListener("resize", update);
+        };
+    }, [count, rowHeight, overscan]);
+
+    const start = Math.min(range.start, count);
+    const end = Math.min(range.end, count);
+    return {
+        bodyRef,
+        rows: {
+            start,
+            end,
+            before: start * rowHeight,
+            after: (count - end) * rowHeight,
+        } as VirtualRows,
+    };
+}
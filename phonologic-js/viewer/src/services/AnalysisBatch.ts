@@ -0,0 +1,39 @@
+/** One side (phoneme or feature costs) of `PhlAnalyzer.analyzeBatch`, one entry per pair in the totals. */
+export interface BatchColumns {
+    cost: Float64Array
+    length: Float64Array
+    errorRate: Float64Array
+    stepOffsets: Uint32Array
+    stepAction: Uint8Array
+    stepLeft: Int32Array
+    stepRight: Int32Array
+    stepCost: Float64Array
+}
+
+export interface AnalysisBatch {
+    symbols: string[]
+    actions: string[]
+    phonemes: BatchColumns
+    features: BatchColumns
+    failed: Uint32Array
+    errors: string[]
+}
+
+export interface BatchRequest {
+    id: number
+    system: string
+    left: string[]
+    right: string[]
+    withSteps: boolean
+}
+
+export type BatchResponse =
+    | { id: number, batch: AnalysisBatch }
+    | { id: number, error: string };
+
+/** The buffers of a batch, so posting it moves them instead of copying. */
+export const transferables = (batch: AnalysisBatch): ArrayBuffer[] =>
+    [batch.phonemes, batch.features]
+        .flatMap(columns => Object.values(columns) as ArrayBufferView[])
+        .concat([batch.failed])
+        .map(array => array.buffer as ArrayBuffer);
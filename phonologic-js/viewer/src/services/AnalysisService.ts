@@ -1,8 +1,20 @@
 import type {TranscriptPair} from "./TranscriptService";
 import init, {FeatureDelta, PhlAnalyzer} from "@phonologic/wasm";
+import type {AnalysisBatch, BatchColumns} from "./AnalysisBatch";
+import {AnalysisWorkerPool} from "./AnalysisWorkerPool";
+import {LruCache} from "./LruCache";
 
 const cleanse = (obj: any) => JSON.parse(JSON.stringify(obj));
 
+/** Pairs sent to a worker at a time */
+const BATCH_SIZE = 1000;
+
+/** Traces kept after their rows scroll out of view or their details are closed */
+const TRACE_CACHE_SIZE = 500;
+
+/** Feature differences kept, one per pair of symbols */
+const DELTA_CACHE_SIZE = 2000;
+
 export interface AnalysisStep {
     left: string
     right: string
@@ -13,10 +25,15 @@ export interface AnalysisStep {
 export interface AnalysisDetails {
     distance: number
     expectedLength: number
-    steps: Array<AnalysisStep>
     errorRate: number
 }
 
+/** The aligned steps behind an analysis, computed when something needs to show them. */
+export interface AnalysisTrace {
+    features: Array<AnalysisStep>
+    phonemes: Array<AnalysisStep>
+}
+
 export interface Analysis {
     id: string
     transcriptPair: TranscriptPair
@@ -92,66 +109,39 @@ export class AnalysisService {
         return this._analyzer;
     }
 
+    private static traces = new LruCache<string, AnalysisTrace>(TRACE_CACHE_SIZE);
+    private static deltas = new LruCache<string, FeatureDelta[]>(DELTA_CACHE_SIZE);
+
     static async getDeltas(left: string, right: string) {
         if (!left || !right) {
             return [];
         }
         let analyzer = await this.getAnalyzer();
-        let result = cleanse(analyzer.featureDeltas(left, right));
-        return result.deltas as FeatureDelta[];
+        return this.deltas.getOrSet(`${left}\t${right}`, () => {
+            let result = cleanse(analyzer.featureDeltas(left, right));
+            return result.deltas as FeatureDelta[];
+        });
     }
 
-    static async getAll(transcriptPairs: TranscriptPair[]): Promise<Analysis[]> {
-        await this.getAnalyzer();
-        let analysisResults = await Promise.all(
-            transcriptPairs.map(
-                async tp => {
-                    try {
-                        return await AnalysisService.getAnalysis(tp);
-                    }
-                    catch (e: any) {
-                        return {id: tp.id, message: e.message} as AnalysisException;
-                    }
-                }
-            )
-        );
-        // split analyses from exceptions
-        const [analyses, exceptions] = analysisResults.reduce(([a, e], item) => {
-            return "message" in item
-                ?  [a, [...e, item as AnalysisException]]
-                : [[...a, item as Analysis], e];
-        }, [[], []] as [Analysis[], AnalysisException[]]);
-        return new AnalysisCollection(analyses, exceptions);
+    /** The trace of an analysis if it's already been computed, without waiting for one. */
+    static cachedTrace(analysis: Analysis): AnalysisTrace|null {
+        return this.traces.get(this.traceKey(analysis)) ?? null;
     }
 
-    private static async getAnalysis(transcriptPair: TranscriptPair): Promise<Analysis> {
-        // const wasm-bak = import('./wasm');
-        // const phl: any = await wasm-bak;
+    static async getTrace(analysis: Analysis): Promise<AnalysisTrace> {
         const analyzer = await this.getAnalyzer("hayes-ipa-arpabet");
-        let [leftTranscript, rightTranscript] = transcriptPair.transcripts;
-        let phonemes = cleanse(analyzer.phonemeDiff(leftTranscript, rightTranscript));
-        let features = cleanse(analyzer.featureDiff(leftTranscript, rightTranscript));
-        return this.adaptPhlAnalysis(transcriptPair.id, phonemes, features, transcriptPair);
-    }
-
-    private static adaptPhlAnalysis(id: string, phonemes: any, features: any, transcripts: TranscriptPair) {
-        return {
-            id: id,
-            transcriptPair: transcripts,
-            features: this.adaptDiff(features),
-            phonemes: this.adaptDiff(phonemes),
-            fer: features.errorRate,
-            per: phonemes.errorRate,
-        } as Analysis;
+        return this.traces.getOrSet(this.traceKey(analysis), () => {
+            let [leftTranscript, rightTranscript] = analysis.transcriptPair.transcripts;
+            let {phonemes, features} = cleanse(analyzer.analyze(leftTranscript, rightTranscript));
+            return {
+                features: features.steps.map(this.adaptStep),
+                phonemes: phonemes.steps.map(this.adaptStep),
+            };
+        });
     }
 
-    private static adaptDiff(diff: any) {
-        return {
-            distance: diff.cost,
-            expectedLength: diff.length,
-            steps: diff.steps.map(this.adaptStep),
-            errorRate: diff.errorRate,
-        } as AnalysisDetails
+    private static traceKey(analysis: Analysis) {
+        return analysis.transcriptPair.transcripts.join("\t");
     }
 
     private static adaptStep(step: any) {
@@ -160,7 +150,75 @@ export class AnalysisService {
             right: step.right,
             cost: step.cost,
             action: step.action,
-            deltas: [] // todo
         } as AnalysisStep
     }
+
+    private static _pool: AnalysisWorkerPool|null = null;
+    private static getPool = () => {
+        if (!this._pool) {
+            this._pool = new AnalysisWorkerPool();
+        }
+        return this._pool;
+    }
+
+    /** Scores every pair without tracing its steps; `getTrace` fills those in for the pairs that are shown. */
+    static async getAll(transcriptPairs: TranscriptPair[]): Promise<Analysis[]> {
+        let batches = [];
+        for (let start = 0; start < transcriptPairs.length; start += BATCH_SIZE) {
+            batches.push(this.getBatch(transcriptPairs.slice(start, start + BATCH_SIZE)));
+        }
+        const results = await Promise.all(batches);
+        const analyses = results.flatMap(([analyses]) => analyses);
+        const exceptions = results.flatMap(([, exceptions]) => exceptions);
+        return new AnalysisCollection(analyses, exceptions);
+    }
+
+    /** Scores the pairs on a worker, or on this thread where workers aren't available. */
+    private static async getBatch(transcriptPairs: TranscriptPair[]): Promise<[Analysis[], AnalysisException[]]> {
+        const system = "hayes-ipa-arpabet";
+        const left = transcriptPairs.map(tp => tp.transcripts[0]);
+        const right = transcriptPairs.map(tp => tp.transcripts[1]);
+        let batch: AnalysisBatch;
+        try {
+            batch = AnalysisWorkerPool.isSupported()
+                ? await this.getPool().run(system, left, right, false)
+                : (await this.getAnalyzer(system)).analyzeBatch(left, right, false) as AnalysisBatch;
+        }
+        catch (e: any) {
+            return [[], transcriptPairs.map(tp => ({id: tp.id, message: e.message}) as AnalysisException)];
+        }
+        return this.adaptBatch(transcriptPairs, batch);
+    }
+
+    private static adaptBatch(transcriptPairs: TranscriptPair[], batch: AnalysisBatch): [Analysis[], AnalysisException[]] {
+        const failed = new Map(Array.from(batch.failed, (index, k) => [index, batch.errors[k]]));
+        let analyses: Analysis[] = [];
+        let exceptions: AnalysisException[] = [];
+        transcriptPairs.forEach((tp, i) => {
+            const message = failed.get(i);
+            if (message !== undefined) {
+                exceptions.push({id: tp.id, message} as AnalysisException);
+                return;
+            }
+            const features = this.adaptColumns(batch.features, i);
+            const phonemes = this.adaptColumns(batch.phonemes, i);
+            analyses.push({
+                id: tp.id,
+                transcriptPair: tp,
+                features: features,
+                phonemes: phonemes,
+                fer: features.errorRate,
+                per: phonemes.errorRate,
+            } as Analysis);
+        });
+        return [analyses, exceptions];
+    }
+
+    private static adaptColumns(columns: BatchColumns, i: number) {
+        return {
+            distance: columns.cost[i],
+            expectedLength: columns.length[i],
+            errorRate: columns.errorRate[i],
+        } as AnalysisDetails
+    }
 }
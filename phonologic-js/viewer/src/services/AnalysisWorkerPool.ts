@@ -0,0 +1,77 @@
+import type {AnalysisBatch, BatchRequest, BatchResponse} from "./AnalysisBatch";
+
+interface Pending {
+    resolve: (batch: AnalysisBatch) => void
+    reject: (error: Error) => void
+}
+
+/** A few workers, each with its own analyzer, that score batches of pairs off the main thread. */
+export class AnalysisWorkerPool {
+    private workers: Worker[];
+    private load: number[];
+    private pending = new Map<number, [Pending, number]>();
+    private nextId = 0;
+
+    constructor(size: number = AnalysisWorkerPool.defaultSize()) {
+        this.workers = Array.from({length: size}, (_, index) => {
+            const worker = new Worker(new URL("./analysis.worker.ts", import.meta.url), {type: "module"});
+            worker.onmessage = ({data}: MessageEvent<BatchResponse>) => this.settle(data);
+            worker.onerror = event => this.failWorker(index, new Error(event.message));
+            return worker;
+        });
+        this.load = this.workers.map(() => 0);
+    }
+
+    static isSupported() {
+        return typeof Worker !== "undefined";
+    }
+
+    static defaultSize() {
+        return Math.max(1, Math.min(navigator.hardwareConcurrency || 2, 4));
+    }
+
+    /** Scores `left[i]` against `right[i]` on the least busy worker, tracing the steps only if `withSteps` is set. */
+    run(system: string, left: string[], right: string[], withSteps: boolean = true): Promise<AnalysisBatch> {
+        const index = this.load.indexOf(Math.min(...this.load));
+        const id = this.nextId++;
+        this.load[index]++;
+        return new Promise((resolve, reject) => {
+            this.pending.set(id, [{resolve, reject}, index]);
+            this.workers[index].postMessage({id, system, left, right, withSteps} as BatchRequest);
+        });
+    }
+
+    terminate() {
+        this.workers.forEach(worker => worker.terminate());
+        this.pending.forEach(([pending]) => pending.reject(new Error("Analysis was cancelled")));
+        this.pending.clear();
+    }
+
+    private settle(response: BatchResponse) {
+        const entry = this.pending.get(response.id);
+        if (!entry) {
+            return;
+        }
+        const [pending, index] = entry;
+        this.pending.delete(response.id);
+        this.load[index]--;
+        if ("error" in response) {
+            pending.reject(new Error(response.error));
+        }
+        else {
+            pending.resolve(response.batch);
+        }
+    }
+
+    private failWorker(index: number, error: Error) {
+        this.pending.forEach(([pending, worker], id) => {
+            if (worker === index) {
+                this.pending.delete(id);
+                this.load[index]--;
+                pending.reject(error);
+            }
+        });
+    }
+}
+
+export default AnalysisWorkerPool;
@@ -0,0 +1,45 @@
+/** A map that forgets its least recently used entries once it holds more than `capacity`. */
+export class LruCache<K, V> {
+    private entries = new Map<K, V>();
+
+    constructor(readonly capacity: number) {
+    }
+
+    get size() {
+        return this.entries.size;
+    }
+
+    get(key: K): V|undefined {
+        const value = this.entries.get(key);
+        if (value !== undefined) {
+            // Maps iterate in insertion order, so re-inserting marks the entry as the most recent
+            this.entries.delete(key);
+            this.entries.set(key, value);
+        }
+        return value;
+    }
+
+    set(key: K, value: V) {
+        this.entries.delete(key);
+        this.entries.set(key, value);
+        while (this.entries.size > this.capacity) {
+            this.entries.delete(this.entries.keys().next().value as K);
+        }
+    }
+
+    /** The cached value, or the one `compute` makes, which is cached for next time. */
+    getOrSet(key: K, compute: () => V): V {
+        let value = this.get(key);
+        if (value === undefined) {
+            value = compute();
+            this.set(key, value);
+        }
+        return value;
+    }
+
+    clear() {
+        this.entries.clear();
+    }
+}
+
+export default LruCache;
@@ -0,0 +1,28 @@
+import init, {PhlAnalyzer} from "@phonologic/wasm";
+import {transferables} from "./AnalysisBatch";
+import type {AnalysisBatch, BatchRequest, BatchResponse} from "./AnalysisBatch";
+
+const analyzers = new Map<string, PhlAnalyzer>();
+
+const getAnalyzer = async (system: string) => {
+    let analyzer = analyzers.get(system);
+    if (!analyzer) {
+        await init();
+        analyzer = new PhlAnalyzer(system);
+        analyzers.set(system, analyzer);
+    }
+    return analyzer;
+}
+
+const respond = (response: BatchResponse, transfer: Transferable[] = []) => postMessage(response, {transfer});
+
+onmessage = async ({data}: MessageEvent<BatchRequest>) => {
+    try {
+        const analyzer = await getAnalyzer(data.system);
+        const batch = analyzer.analyzeBatch(data.left, data.right, data.withSteps) as AnalysisBatch;
+        respond({id: data.id, batch}, transferables(batch));
+    }
+    catch (e: any) {
+        respond({id: data.id, error: e?.message ?? String(e)});
+    }
+};
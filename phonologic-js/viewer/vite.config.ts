@@ -8,6 +8,9 @@ export default defineConfig({
         react(),
         dts({insertTypesEntry: true, bundleTypes: true, copyDtsFiles: true}),
     ],
+    worker: {
+        format: 'es',
+    },
     build: {
         lib: {
             entry: resolve(__dirname, 'src/index.tsx'),
@@ -0,0 +1,177 @@
+"""
+Benchmarks for the Python bindings, on the same synthetic corpora as the criterion benchmarks in `phonologic/benches`.
+
+    python phonologic-python/benches/bench_bindings.py --save baseline.json
+    # ...make changes, rebuild with `maturin develop --release`...
+    python phonologic-python/benches/bench_bindings.py --baseline baseline.json
+
+With `--baseline`, exits with status 1 if anything got slower than `--threshold` times its baseline.
+"""
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+import phonologic_python
+
+EXAMPLE_FILE = Path(__file__).resolve().parents[2] / "docs" / "example_file.tsv"
+EXAMPLE_SYSTEM = "hayes-arpabet"
+SYSTEMS = ["hayes", "hayes-arpabet", "hayes-ipa-arpabet"]
+MASK = (1 << 64) - 1
+
+
+class Rng:
+    """xorshift64*, matching `phonologic/benches/corpus` so both sides generate the same corpus from a seed."""
+
+    def __init__(self, seed):
+        self.state = max(seed, 1)
+
+    def next(self):
+        self.state ^= self.state >> 12
+        self.state ^= (self.state << 25) & MASK
+        self.state ^= self.state >> 27
+        return (self.state * 0x2545F4914F6CDD1D) & MASK
+
+    def below(self, n):
+        return self.next() % n
+
+    def chance(self, probability):
+        return (self.next() >> 11) / (1 << 53) < probability
+
+
+class Corpus:
+    def __init__(self, path=EXAMPLE_FILE):
+        self.references = []
+        inventory = set()
+        with open(path, encoding="utf-8") as f:
+            next(f)
+            for line in f:
+                columns = line.rstrip("\n").split("\t")
+                if len(columns) < 3:
+                    continue
+                reference = columns[1].split()
+                inventory.update(reference, columns[2].split())
+                if reference:
+                    self.references.append(reference)
+        self.inventory = sorted(inventory)
+
+    def reference(self, rng, length):
+        reference = []
+        following = rng.below(len(self.references))
+        while len(reference) < length:
+            reference.extend(self.references[following][:length - len(reference)])
+            following = (following + 1) % len(self.references)
+        return reference
+
+    def hypothesis(self, rng, reference, error_rate):
+        hypothesis = []
+        for symbol in reference:
+            if not rng.chance(error_rate):
+                hypothesis.append(symbol)
+                continue
+            kind = rng.below(3)
+            if kind == 0:
+                hypothesis.append(self.random_symbol(rng))
+            elif kind == 2:
+                hypothesis.extend([symbol, self.random_symbol(rng)])
+        return hypothesis
+
+    def pairs(self, seed, count, length, error_rate):
+        rng = Rng(seed)
+        pairs = []
+        for _ in range(count):
+            reference = self.reference(rng, length)
+            hypothesis = self.hypothesis(rng, reference, error_rate)
+            pairs.append((" ".join(reference), " ".join(hypothesis)))
+        return pairs
+
+    def random_symbol(self, rng):
+        return self.inventory[rng.below(len(self.inventory))]
+
+
+def best_time(fn, repeat):
+    """The fastest of `repeat` runs, each long enough to be measured, in seconds per call."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def benchmarks(args):
+    corpus = Corpus()
+    pairs = corpus.pairs(args.seed, args.pairs, args.length, args.error_rate)
+    analyzer = phonologic_python.PhlAnalyzer(args.system)
+
+    for name in SYSTEMS:
+        # Analyzers share their system once it's loaded, so this is the cost of a cached lookup
+        yield f"PhlAnalyzer/{name}", lambda name=name: phonologic_python.PhlAnalyzer(name)
+
+    for length in [4, 16, 64, 256]:
+        left, right = corpus.pairs(length, 1, length, args.error_rate)[0]
+        yield f"feature_diff/{length}", lambda left=left, right=right: analyzer.feature_diff(left, right)
+        yield f"phoneme_diff/{length}", lambda left=left, right=right: analyzer.phoneme_diff(left, right)
+        yield f"feature_distance/{length}", lambda left=left, right=right: analyzer.feature_distance(left, right)
+
+    yield "analyze/loop", lambda: [analyzer.analyze(left, right) for left, right in pairs]
+    yield "analyze_many", lambda: analyzer.analyze_many(pairs)
+    yield "feature_diff_many", lambda: analyzer.feature_diff_many(pairs)
+    yield "feature_distance_many", lambda: analyzer.feature_distance_many(pairs)
+    yield "feature_diff_arrays", lambda: analyzer.feature_diff_arrays(pairs)
+    yield "feature_diff_arrays/steps", lambda: analyzer.feature_diff_arrays(pairs, steps=True)
+    yield "feature_error_counts", lambda: analyzer.feature_error_counts(pairs)
+
+
+def write_corpus(path, pairs):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("utterance_id\ttranscript\tasr_transcript\n")
+        for i, (reference, hypothesis) in enumerate(pairs):
+            f.write(f"synthetic-{i:06d}\t{reference}\t{hypothesis}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--system", default=EXAMPLE_SYSTEM)
+    parser.add_argument("--pairs", type=int, default=1000, help="pairs in the corpus for the batch benchmarks")
+    parser.add_argument("--length", type=int, default=16, help="reference length of each pair, in symbols")
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--save", help="write the results as JSON, to compare against later")
+    parser.add_argument("--baseline", help="compare against results written with --save")
+    parser.add_argument("--threshold", type=float, default=1.10, help="slowdown that counts as a regression")
+    parser.add_argument("--write-corpus", help="write the corpus as a TSV for `phonologic eval` or the viewer instead")
+    args = parser.parse_args()
+
+    if args.write_corpus:
+        write_corpus(args.write_corpus, Corpus().pairs(args.seed, args.pairs, args.length, args.error_rate))
+        return 0
+
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else {}
+    results = {}
+    regressions = []
+    for name, fn in benchmarks(args):
+        if args.filter not in name:
+            continue
+        seconds = best_time(fn, args.repeat)
+        results[name] = seconds
+        line = f"{name:<32} {seconds * 1e6:>14.2f} µs"
+        if name in baseline:
+            ratio = seconds / baseline[name]
+            line += f"  {ratio:>6.2f}x baseline"
+            if ratio > args.threshold:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line, flush=True)
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2))
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than {args.threshold}x baseline: {', '.join(regressions)}",
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,47 +1,271 @@
 extern crate phonologic;
 
+use numpy::{IntoPyArray, PyArray2};
+use pyo3::exceptions::PyValueError;
 use pyo3::prelude::*;
+use pyo3::types::PyDict;
 use pyo3;
+use std::any::type_name;
+use std::borrow::Cow;
+use std::collections::HashMap;
+use std::sync::Arc;
 
+use phonologic::distance::columnar::{analyze_columns, AnalysisColumns};
+use phonologic::distance::cost_table;
+use phonologic::distance::error_counts::{count_errors, ErrorCounts};
 use phonologic::distance::feature_distance::FeatureCostCalculator;
-use phonologic::distance::levenshtein::{Action, ComputeCost, LevenshteinStep};
+use phonologic::distance::feature_index::FeatureIndex;
+use phonologic::distance::incremental::IncrementalAligner;
+use phonologic::distance::levenshtein::{
+    Action, ComputeCost, Cost, LevenshteinStep, SpaceBounded, DEFAULT_MAX_TABLE_CELLS,
+};
+use phonologic::distance::memo::{MemoCache, MemoStats, Memoized};
 use phonologic::distance::phoneme_distance::PhonemeCostCalculator;
 use phonologic::distance::phoneme_tokenizer::PhonemeTokenizer;
+use phonologic::distance::stats::{Recorded, Stats, StatsSnapshot, Timer};
+use phonologic::distance::utterance::{self, Transcript};
 use phonologic::errors::PhlDistanceError;
+use phonologic::helpers::parallel::par_map;
 use phonologic::phl::parsing;
+use phonologic::phl::registry::{self, SharedSystem};
+use phonologic::phl::symbols::{SymbolId, SymbolTable};
 use phonologic::phl::systems::PhonologicalFeatureSystem;
 use crate::AnalysisAction::*;
 
 #[pymodule]
 fn phonologic_python(_py: Python, m: &PyModule) -> PyResult<()> {
     m.add_class::<PhlAnalyzer>()?;
+    m.add_class::<Analysis>()?;
+    m.add_class::<Distance>()?;
+    m.add_class::<CombinedAnalysis>()?;
+    m.add_class::<AlternativeScores>()?;
+    m.add_class::<StreamingAnalysis>()?;
+    m.add_class::<AnalysisStep>()?;
+    m.add_class::<AnalysisAction>()?;
+    m.add_class::<FeatureDelta>()?;
+    m.add_class::<FeatureValue>()?;
+    m.add_class::<FeatureDeltaCollection>()?;
+    m.add_class::<Utterance>()?;
+    m.add_class::<CostWeights>()?;
     Ok(())
 }
 
+fn distance_error(e: PhlDistanceError) -> PyErr {
+    PyValueError::new_err(format!("{e:?}"))
+}
+
+fn stats_dict(py: Python<'_>, stats: StatsSnapshot) -> PyResult<&PyDict> {
+    let dict = PyDict::new(py);
+    dict.set_item("pairs", stats.pairs)?;
+    dict.set_item("tokens", stats.tokens)?;
+    dict.set_item("cells", stats.cells)?;
+    dict.set_item("cost_calls", stats.cost_calls)?;
+    dict.set_item("unknown_symbol_errors", stats.unknown_symbol_errors)?;
+    dict.set_item("tokenize_seconds", stats.tokenize_seconds)?;
+    dict.set_item("fill_seconds", stats.fill_seconds)?;
+    dict.set_item("backtrace_seconds", stats.backtrace_seconds)?;
+    dict.set_item("compile_seconds", stats.compile_seconds)?;
+    Ok(dict)
+}
+
+fn cache_stats_dict(py: Python<'_>, stats: MemoStats) -> PyResult<&PyDict> {
+    let dict = PyDict::new(py);
+    dict.set_item("hits", stats.hits)?;
+    dict.set_item("misses", stats.misses)?;
+    dict.set_item("evictions", stats.evictions)?;
+    dict.set_item("size", stats.len)?;
+    dict.set_item("capacity", stats.capacity)?;
+    Ok(dict)
+}
+
+/// Hands the columns to Python as NumPy arrays, which take over the buffers without copying them.
+fn columns_dict(py: Python<'_>, columns: AnalysisColumns) -> PyResult<&PyDict> {
+    let dict = PyDict::new(py);
+    dict.set_item("cost", columns.cost.into_pyarray(py))?;
+    dict.set_item("length", columns.length.into_pyarray(py))?;
+    dict.set_item("error_rate", columns.error_rate.into_pyarray(py))?;
+    dict.set_item("step_offsets", columns.step_offsets.into_pyarray(py))?;
+    dict.set_item("step_pair", columns.step_pair.into_pyarray(py))?;
+    dict.set_item("step_action", columns.step_action.into_pyarray(py))?;
+    dict.set_item("step_left", columns.step_left.into_pyarray(py))?;
+    dict.set_item("step_right", columns.step_right.into_pyarray(py))?;
+    dict.set_item("step_cost", columns.step_cost.into_pyarray(py))?;
+    dict.set_item("symbols", columns.symbols)?;
+    dict.set_item("actions", ["EQ", "DEL", "INS", "SUB"])?;
+    Ok(dict)
+}
+
 #[pyclass]
 #[derive(Clone)]
 pub struct Analysis {
+    #[pyo3(get)]
     pub steps: Vec<AnalysisStep>,
+    #[pyo3(get)]
     pub cost: f64,
+    #[pyo3(get)]
     pub length: f64,
+    #[pyo3(get)]
     pub error_rate: f64,
 }
 
+impl Analysis {
+    fn from_steps(levenshtein_steps: Vec<LevenshteinStep<SymbolId>>, symbols: &SymbolTable, length: f64) -> Self {
+        let steps: Vec<_> = levenshtein_steps
+            .into_iter()
+            .map(|step| AnalysisStep::from(&step, symbols, length))
+            .collect();
+        let cost = steps.iter().map(|step| step.cost).sum();
+        let error_rate = if length != 0.0 { cost / length as f64 } else { 0.0 };
+        Analysis { steps, cost, length, error_rate }
+    }
+}
+
+/// Phoneme and feature analyses of the same pair.
+#[pyclass]
+#[derive(Clone)]
+pub struct CombinedAnalysis {
+    #[pyo3(get)]
+    pub phonemes: Analysis,
+    #[pyo3(get)]
+    pub features: Analysis,
+}
+
+/// The totals of an `Analysis`, for when the alignment itself isn't needed.
+#[pyclass]
+#[derive(Clone)]
+pub struct Distance {
+    #[pyo3(get)]
+    pub cost: f64,
+    #[pyo3(get)]
+    pub length: f64,
+    #[pyo3(get)]
+    pub error_rate: f64,
+}
+
+impl Distance {
+    fn new(cost: f64, length: f64) -> Self {
+        let error_rate = if length != 0.0 { cost / length } else { 0.0 };
+        Distance { cost, length, error_rate }
+    }
+}
+
+/// Scores of several alternatives against the same transcript, in the order they were given, with the alignment of
+/// the one with the lowest cost (the first, on a tie).
+#[pyclass]
+#[derive(Clone)]
+pub struct AlternativeScores {
+    #[pyo3(get)]
+    pub distances: Vec<Distance>,
+    #[pyo3(get)]
+    pub best: Option<usize>,
+    #[pyo3(get)]
+    pub best_analysis: Option<Analysis>,
+}
+
+/// Which costs an alignment is scored with
+#[derive(Copy, Clone)]
+enum CostKind {
+    Feature,
+    Phoneme,
+}
+
+/// Scores a hypothesis as it grows, e.g. from a streaming recognizer, against a fixed reference. Each `push` costs
+/// time proportional to the reference, not to everything pushed so far.
+#[pyclass]
+pub struct StreamingAnalysis {
+    system: Arc<PhonologicalFeatureSystem>,
+    tokenizer: Arc<PhonemeTokenizer>,
+    kind: CostKind,
+    length: f64,
+    aligner: IncrementalAligner<SymbolId>,
+    stats: Arc<Stats>,
+}
+
+impl StreamingAnalysis {
+    fn new(analyzer: &PhlAnalyzer, kind: CostKind, reference: &TranscriptArg) -> Self {
+        let system = analyzer.system.clone();
+        let stats = analyzer.stats.clone();
+        let reference = stats.time(Timer::Tokenize, || reference.tokens(&analyzer.tokenizer).into_owned());
+        stats.add_pairs(1);
+        let (length, aligner) = match kind {
+            CostKind::Feature => (
+                (reference.len() * system.num_features) as f64,
+                IncrementalAligner::new(&FeatureCostCalculator::new(&system), reference),
+            ),
+            CostKind::Phoneme => (
+                reference.len() as f64,
+                IncrementalAligner::new(&PhonemeCostCalculator::new(&system), reference),
+            ),
+        };
+        Self { system, tokenizer: analyzer.tokenizer.clone(), kind, length, aligner, stats }
+    }
+}
+
+#[pymethods]
+impl StreamingAnalysis {
+    /// Adds the phonemes of `phonemes` to the end of the hypothesis and returns the distance so far. Phonemes can't
+    /// be split across calls.
+    pub fn push(&mut self, phonemes: TranscriptArg) -> PyResult<Distance> {
+        let symbols = self.stats.time(Timer::Tokenize, || phonemes.tokens(&self.tokenizer));
+        for &symbol in symbols.iter() {
+            let cost = self.stats.time(Timer::Fill, || match self.kind {
+                CostKind::Feature => {
+                    self.aligner.push(&self.stats.recording(&FeatureCostCalculator::new(&self.system)), symbol)
+                }
+                CostKind::Phoneme => {
+                    self.aligner.push(&self.stats.recording(&PhonemeCostCalculator::new(&self.system)), symbol)
+                }
+            });
+            // Each symbol fills one column of the table
+            self.stats.add_cells(self.aligner.reference().len() + 1);
+            cost.map_err(distance_error)?;
+        }
+        self.distance()
+    }
+
+    pub fn distance(&self) -> PyResult<Distance> {
+        let cost = self.aligner.cost().map_err(distance_error)?;
+        Ok(Distance::new(cost.0, self.length))
+    }
+
+    /// The full alignment of the hypothesis so far. Unlike `push`, this goes over the whole hypothesis.
+    pub fn analysis(&self) -> PyResult<Analysis> {
+        let (features, phonemes) = (FeatureCostCalculator::new(&self.system), PhonemeCostCalculator::new(&self.system));
+        let steps = match self.kind {
+            CostKind::Feature => self.aligner.diff_steps(&self.stats.recording(&features)),
+            CostKind::Phoneme => self.aligner.diff_steps(&self.stats.recording(&phonemes)),
+        }.map_err(distance_error)?;
+        let symbols = self.system.symbols();
+        Ok(self.stats.time(Timer::Compile, || Analysis::from_steps(steps, symbols, self.length)))
+    }
+
+    #[getter]
+    pub fn hypothesis(&self) -> Vec<String> {
+        self.aligner.hypothesis().iter().map(|&id| self.system.symbols().resolve(id).to_string()).collect()
+    }
+}
+
 #[pyclass]
 #[derive(Clone)]
 pub struct AnalysisStep {
+    #[pyo3(get)]
     pub action: AnalysisAction,
+    #[pyo3(get)]
     pub left: String,
+    #[pyo3(get)]
     pub right: String,
+    #[pyo3(get)]
     pub cost: f64,
+    #[pyo3(get)]
     pub length: f64,
 }
 
 impl AnalysisStep {
-    fn from(levenshtein_step: &LevenshteinStep<parsing::Symbol>, length: f64) -> Self {
+    fn from(levenshtein_step: &LevenshteinStep<SymbolId>, symbols: &SymbolTable, length: f64) -> Self {
         let action = levenshtein_step.action.into();
-        let left = levenshtein_step.expected.clone().unwrap_or(parsing::Symbol::new("")).to_string();
-        let right = levenshtein_step.actual.clone().unwrap_or(parsing::Symbol::new("")).to_string();
+        let resolve = |id: Option<SymbolId>| id.map(|id| symbols.resolve(id).to_string()).unwrap_or_default();
+        let left = resolve(levenshtein_step.expected);
+        let right = resolve(levenshtein_step.actual);
         let cost = levenshtein_step.cost.0;
         AnalysisStep { action, left, right, cost, length }
     }
@@ -70,9 +294,13 @@ impl From<Action> for AnalysisAction {
 #[pyclass]
 #[derive(Clone, Debug)]
 pub struct FeatureDelta {
+    #[pyo3(get)]
     pub name: String,
+    #[pyo3(get)]
     pub left: FeatureValue,
+    #[pyo3(get)]
     pub right: FeatureValue,
+    #[pyo3(get)]
     pub cost: f64,
 }
 
@@ -102,79 +330,779 @@ impl From<parsing::FeatureValue> for FeatureValue {
 #[pyclass]
 #[derive(Clone, Debug)]
 pub struct FeatureDeltaCollection {
+    #[pyo3(get)]
     pub deltas: Vec<FeatureDelta>
 }
 
+/// Customized costs for `PhlAnalyzer`: weights of features by name (1 for any not named), multipliers of
+/// substitutions, deletions and insertions, and symbols that cost nothing besides `<sil>`, `<unk>` and `<spn>`.
+/// They're compiled into the analyzer's cost tables, so scoring with them is as fast as without.
+#[pyclass]
+#[derive(Clone)]
+pub struct CostWeights {
+    #[pyo3(get)]
+    pub features: HashMap<String, f64>,
+    #[pyo3(get)]
+    pub substitution: f64,
+    #[pyo3(get)]
+    pub deletion: f64,
+    #[pyo3(get)]
+    pub insertion: f64,
+    #[pyo3(get)]
+    pub zero_cost_symbols: Vec<String>,
+}
+
+#[pymethods]
+impl CostWeights {
+    #[new]
+    #[args(features = "None", substitution = "1.0", deletion = "1.0", insertion = "1.0", zero_cost_symbols = "None")]
+    pub fn new(
+        features: Option<HashMap<String, f64>>,
+        substitution: f64,
+        deletion: f64,
+        insertion: f64,
+        zero_cost_symbols: Option<Vec<String>>,
+    ) -> Self {
+        Self {
+            features: features.unwrap_or_default(),
+            substitution,
+            deletion,
+            insertion,
+            zero_cost_symbols: zero_cost_symbols.unwrap_or_default(),
+        }
+    }
+}
+
+impl From<CostWeights> for cost_table::CostWeights {
+    fn from(weights: CostWeights) -> Self {
+        let CostWeights { features, substitution, deletion, insertion, zero_cost_symbols } = weights;
+        Self { features, substitution, deletion, insertion, zero_cost_symbols }
+    }
+}
+
+/// A transcript tokenized and checked against a system once, by `PhlAnalyzer.tokenize`. The analyzer's methods take
+/// one anywhere they take a transcript, and skip tokenizing it again.
+#[pyclass]
+#[derive(Clone)]
+pub struct Utterance {
+    text: Arc<str>,
+    utterance: utterance::Utterance,
+    system: Arc<PhonologicalFeatureSystem>,
+    tokenizer: Arc<PhonemeTokenizer>,
+}
+
+#[pymethods]
+impl Utterance {
+    #[getter]
+    pub fn text(&self) -> String {
+        self.text.to_string()
+    }
+
+    #[getter]
+    pub fn symbols(&self) -> Vec<String> {
+        self.utterance.tokens().iter().map(|&id| self.system.symbols().resolve(id).to_string()).collect()
+    }
+
+    /// The symbols the system has no features for, which feature costs would fail on, as (position, symbol) tuples.
+    #[getter]
+    pub fn unknown(&self) -> Vec<(usize, String)> {
+        self.utterance.unknown().iter().map(|unknown| (unknown.position, unknown.symbol.to_string())).collect()
+    }
+
+    #[getter]
+    pub fn is_valid(&self) -> bool {
+        self.utterance.is_valid()
+    }
+
+    fn __len__(&self) -> usize {
+        self.utterance.tokens().len()
+    }
+}
+
+/// A transcript as it was passed in: text, or an `Utterance`
+#[derive(FromPyObject, Clone)]
+pub enum TranscriptArg {
+    Utterance(Utterance),
+    Text(String),
+}
+
+impl TranscriptArg {
+    fn text(&self) -> &str {
+        match self {
+            TranscriptArg::Utterance(u) => &u.text,
+            TranscriptArg::Text(text) => text,
+        }
+    }
+}
+
+impl Transcript for TranscriptArg {
+    fn tokens<'a>(&'a self, tokenizer: &PhonemeTokenizer) -> Cow<'a, Vec<SymbolId>> {
+        match self {
+            TranscriptArg::Utterance(u) if std::ptr::eq(tokenizer, &*u.tokenizer) => {
+                Cow::Borrowed(u.utterance.tokens())
+            }
+            // Tokens of another system don't mean anything here
+            TranscriptArg::Utterance(u) => u.text.tokens(tokenizer),
+            TranscriptArg::Text(text) => text.tokens(tokenizer),
+        }
+    }
+}
+
 #[pyclass]
 pub struct PhlAnalyzer {
-    system: PhonologicalFeatureSystem,
-    tokenizer: PhonemeTokenizer
+    system: Arc<PhonologicalFeatureSystem>,
+    tokenizer: Arc<PhonemeTokenizer>,
+    index: Arc<FeatureIndex>,
+    stats: Arc<Stats>,
+    memo: Option<Arc<MemoCache>>,
+    max_table_cells: usize,
+}
+
+/// What to search around: a phoneme, or a vector of feature values in `feature_matrix` column order
+#[derive(FromPyObject)]
+pub enum PhonemeQuery {
+    Symbol(String),
+    Features(Vec<f64>),
 }
 
 impl PhlAnalyzer {
-    pub fn analysis<C: ComputeCost<parsing::Symbol>, LFn: Fn(&Vec<parsing::Symbol>) -> f64>(
+    pub fn analysis<C: ComputeCost<SymbolId>, LFn: Fn(&Vec<SymbolId>) -> f64>(
         &self,
         calculator: &C,
-        left: &str,
-        right: &str,
+        left: &(impl Transcript + ?Sized),
+        right: &(impl Transcript + ?Sized),
         length_fn: LFn
     ) -> Result<Analysis, PhlDistanceError> {
-        let left_tokens = self.tokenizer.tokenize(left);
-        let right_tokens = self.tokenizer.tokenize(right);
+        let (left_tokens, right_tokens) = self.stats.tokenize_pair(&self.tokenizer, left, right);
         let length = length_fn(&left_tokens);
-        let steps = calculator.diff_steps(&left_tokens, &right_tokens);
+        let steps = self.wrapped(&self.stats.recording(calculator)).diff_steps(&left_tokens, &right_tokens);
         let steps = steps?;
         let analysis = self.compile_analysis(steps, length);
         Ok(analysis)
     }
 
+    pub fn analysis_within<C: ComputeCost<SymbolId>, LFn: Fn(&Vec<SymbolId>) -> f64>(
+        &self,
+        calculator: &C,
+        left: &(impl Transcript + ?Sized),
+        right: &(impl Transcript + ?Sized),
+        max_cost: f64,
+        length_fn: LFn
+    ) -> Result<Option<Analysis>, PhlDistanceError> {
+        let (left_tokens, right_tokens) = self.stats.tokenize_pair(&self.tokenizer, left, right);
+        let length = length_fn(&left_tokens);
+        let recorded = self.stats.recording(calculator);
+        let steps = self.wrapped(&recorded).diff_steps_within(&left_tokens, &right_tokens, Cost(max_cost))?;
+        Ok(steps.map(|steps| self.compile_analysis(steps, length)))
+    }
+
+    pub fn distance<C: ComputeCost<SymbolId>, LFn: Fn(&Vec<SymbolId>) -> f64>(
+        &self,
+        calculator: &C,
+        left: &(impl Transcript + ?Sized),
+        right: &(impl Transcript + ?Sized),
+        length_fn: LFn
+    ) -> Result<Distance, PhlDistanceError> {
+        let (left_tokens, right_tokens) = self.stats.tokenize_pair(&self.tokenizer, left, right);
+        let length = length_fn(&left_tokens);
+        let cost = self.wrapped(&self.stats.recording(calculator)).distance_only(&left_tokens, &right_tokens)?;
+        Ok(Distance::new(cost.0, length))
+    }
+
     pub fn compile_analysis(
         &self,
-        levenshtein_steps: Vec<LevenshteinStep<parsing::Symbol>>,
+        levenshtein_steps: Vec<LevenshteinStep<SymbolId>>,
         length: f64
     ) -> Analysis {
-        let steps: Vec<_> = levenshtein_steps
+        #[cfg(feature = "tracing")]
+        let _span = tracing::trace_span!("compile_analysis", steps = levenshtein_steps.len()).entered();
+        self.stats.time(Timer::Compile, || Analysis::from_steps(levenshtein_steps, self.system.symbols(), length))
+    }
+
+    /// `recorded`, answering from this analyzer's cache if it has one, and tracing pairs too big for the full table in
+    /// O(m log n) memory.
+    fn wrapped<'a, C>(&'a self, recorded: &'a Recorded<'a, C>) -> SpaceBounded<Memoized<'a, Recorded<'a, C>>> {
+        let memoized = Memoized::new(self.memo.as_deref(), type_name::<C>(), recorded);
+        SpaceBounded::new(memoized, self.max_table_cells)
+    }
+
+    /// Feature costs for `transcripts`, which skip checking each symbol if every one is a valid `Utterance` of this
+    /// analyzer's system.
+    fn feature_costs<'a>(&self, transcripts: impl IntoIterator<Item = &'a TranscriptArg>) -> FeatureCostCalculator<'_> {
+        let known = |transcript: &TranscriptArg| match transcript {
+            TranscriptArg::Utterance(u) => Arc::ptr_eq(&u.tokenizer, &self.tokenizer) && u.utterance.is_valid(),
+            TranscriptArg::Text(_) => false,
+        };
+        if transcripts.into_iter().all(known) {
+            FeatureCostCalculator::for_known(&self.system)
+        }
+        else {
+            FeatureCostCalculator::new(&self.system)
+        }
+    }
+}
+
+impl PhlAnalyzer {
+    fn try_feature_diff(&self, left: &TranscriptArg, right: &TranscriptArg) -> Result<Analysis, PhlDistanceError> {
+        let calculator = self.feature_costs([left, right]);
+        let length_fn = |tokens: &Vec<SymbolId>| { (tokens.len() * self.system.num_features) as f64};
+        self.analysis(&calculator, left, right, length_fn)
+    }
+
+    fn try_phoneme_diff(&self, left: &TranscriptArg, right: &TranscriptArg) -> Result<Analysis, PhlDistanceError> {
+        let calculator = PhonemeCostCalculator::new(&self.system);
+        let length_fn = |tokens: &Vec<SymbolId>| tokens.len() as f64;
+        self.analysis(&calculator, left, right, length_fn)
+    }
+
+    /// Tokenizes the pair once and aligns it with both phoneme and feature costs.
+    fn try_analyze(&self, left: &TranscriptArg, right: &TranscriptArg) -> Result<CombinedAnalysis, PhlDistanceError> {
+        let (left_tokens, right_tokens) = self.stats.tokenize_pair(&self.tokenizer, left, right);
+        let phonemes = PhonemeCostCalculator::new(&self.system);
+        let features = self.feature_costs([left, right]);
+        let phoneme_steps = self.wrapped(&self.stats.recording(&phonemes)).diff_steps(&left_tokens, &right_tokens)?;
+        let feature_steps = self.wrapped(&self.stats.recording(&features)).diff_steps(&left_tokens, &right_tokens)?;
+        let length = left_tokens.len() as f64;
+        Ok(CombinedAnalysis {
+            phonemes: self.compile_analysis(phoneme_steps, length),
+            features: self.compile_analysis(feature_steps, length * self.system.num_features as f64),
+        })
+    }
+
+    fn try_feature_diff_within(
+        &self,
+        left: &TranscriptArg,
+        right: &TranscriptArg,
+        max_cost: f64,
+    ) -> Result<Option<Analysis>, PhlDistanceError> {
+        let calculator = self.feature_costs([left, right]);
+        let length_fn = |tokens: &Vec<SymbolId>| { (tokens.len() * self.system.num_features) as f64};
+        self.analysis_within(&calculator, left, right, max_cost, length_fn)
+    }
+
+    fn try_phoneme_diff_within(
+        &self,
+        left: &TranscriptArg,
+        right: &TranscriptArg,
+        max_cost: f64,
+    ) -> Result<Option<Analysis>, PhlDistanceError> {
+        let calculator = PhonemeCostCalculator::new(&self.system);
+        let length_fn = |tokens: &Vec<SymbolId>| tokens.len() as f64;
+        self.analysis_within(&calculator, left, right, max_cost, length_fn)
+    }
+
+    fn try_feature_distance(&self, left: &TranscriptArg, right: &TranscriptArg) -> Result<Distance, PhlDistanceError> {
+        let calculator = self.feature_costs([left, right]);
+        let length_fn = |tokens: &Vec<SymbolId>| { (tokens.len() * self.system.num_features) as f64};
+        self.distance(&calculator, left, right, length_fn)
+    }
+
+    fn try_phoneme_distance(&self, left: &TranscriptArg, right: &TranscriptArg) -> Result<Distance, PhlDistanceError> {
+        let calculator = PhonemeCostCalculator::new(&self.system);
+        let length_fn = |tokens: &Vec<SymbolId>| tokens.len() as f64;
+        self.distance(&calculator, left, right, length_fn)
+    }
+
+    fn diff_arrays<'py, C>(
+        &self,
+        py: Python<'py>,
+        calculator: &C,
+        pairs: Vec<(TranscriptArg, TranscriptArg)>,
+        length_fn: impl Fn(&Vec<SymbolId>) -> f64 + Sync,
+        steps: bool,
+    ) -> PyResult<&'py PyDict>
+        where C: ComputeCost<SymbolId> + Sync
+    {
+        let symbols = self.system.symbols();
+        let recorded = self.stats.recording(calculator);
+        let calculator = self.wrapped(&recorded);
+        self.stats.add_pairs(pairs.len());
+        let columns = py.allow_threads(|| {
+            analyze_columns(&self.tokenizer, symbols, &calculator, &pairs, &length_fn, steps)
+        }).map_err(distance_error)?;
+        columns_dict(py, columns)
+    }
+
+    fn error_counts<'py, C>(
+        &self,
+        py: Python<'py>,
+        calculator: &C,
+        pairs: Vec<(TranscriptArg, TranscriptArg)>,
+    ) -> PyResult<&'py PyDict>
+        where C: ComputeCost<SymbolId> + Sync
+    {
+        let recorded = self.stats.recording(calculator);
+        let calculator = self.wrapped(&recorded);
+        self.stats.add_pairs(pairs.len());
+        let counts = py.allow_threads(|| {
+            count_errors(&self.tokenizer, &self.system, &calculator, &pairs)
+        }).map_err(distance_error)?;
+        self.error_counts_dict(py, &counts)
+    }
+
+    fn error_counts_dict<'py>(&self, py: Python<'py>, counts: &ErrorCounts) -> PyResult<&'py PyDict> {
+        let symbols = self.system.symbols();
+        let mut names: Vec<_> = (0..counts.epsilon()).map(|id| symbols.resolve(id as SymbolId).to_string()).collect();
+        names.push(String::new());
+        let dict = PyDict::new(py);
+        dict.set_item("symbols", names)?;
+        dict.set_item("confusions", counts.confusions().to_vec().into_pyarray(py).reshape([counts.size(); 2])?)?;
+        dict.set_item("features", self.system.feature_names())?;
+        dict.set_item("feature_flips", counts.feature_flips(&self.system).into_pyarray(py))?;
+        dict.set_item("unknown", counts.unknown())?;
+        Ok(dict)
+    }
+
+    fn diff_many<R, F>(&self, py: Python<'_>, pairs: Vec<(TranscriptArg, TranscriptArg)>, diff: F) -> PyResult<Vec<R>>
+        where R: Send,
+              F: Fn(&Self, &TranscriptArg, &TranscriptArg) -> Result<R, PhlDistanceError> + Sync
+    {
+        py.allow_threads(|| {
+            par_map(&pairs, |(left, right)| diff(self, left, right))
+                .into_iter()
+                .collect::<Result<Vec<_>, _>>()
+        }).map_err(distance_error)
+    }
+
+    fn score_nbest<C, LFn>(
+        &self,
+        py: Python<'_>,
+        calculator: &C,
+        reference: &TranscriptArg,
+        hypotheses: &[TranscriptArg],
+        length_fn: LFn,
+    ) -> PyResult<AlternativeScores>
+        where C: ComputeCost<SymbolId> + Sync,
+              LFn: Fn(&Vec<SymbolId>) -> f64
+    {
+        let reference_tokens = self.stats.time(Timer::Tokenize, || reference.tokens(&self.tokenizer));
+        let reference: &Vec<SymbolId> = &reference_tokens;
+        let hypotheses = self.tokens_of(hypotheses);
+        self.add_alternatives(reference, &hypotheses);
+        let recorded = self.stats.recording(calculator);
+        let costs = py.allow_threads(|| {
+            recorded.score_nbest(reference, &hypotheses).into_iter().collect::<Result<Vec<_>, _>>()
+        }).map_err(distance_error)?;
+        let length = length_fn(reference);
+        self.alternative_scores(calculator, costs, |i| (reference, &hypotheses[i]), |_| length)
+    }
+
+    fn score_multi_reference<C, LFn>(
+        &self,
+        py: Python<'_>,
+        calculator: &C,
+        references: &[TranscriptArg],
+        hypothesis: &TranscriptArg,
+        length_fn: LFn,
+    ) -> PyResult<AlternativeScores>
+        where C: ComputeCost<SymbolId> + Sync,
+              LFn: Fn(&Vec<SymbolId>) -> f64
+    {
+        let references = self.tokens_of(references);
+        let hypothesis_tokens = self.stats.time(Timer::Tokenize, || hypothesis.tokens(&self.tokenizer));
+        let hypothesis: &Vec<SymbolId> = &hypothesis_tokens;
+        self.add_alternatives(hypothesis, &references);
+        let recorded = self.stats.recording(calculator);
+        let costs = py.allow_threads(|| {
+            recorded.score_multi_reference(&references, hypothesis).into_iter().collect::<Result<Vec<_>, _>>()
+        }).map_err(distance_error)?;
+        self.alternative_scores(calculator, costs, |i| (&references[i], hypothesis), |i| length_fn(&references[i]))
+    }
+
+    /// Counts a pair for each of `alternatives` scored against `shared`, and the tokens of all of them.
+    fn add_alternatives(&self, shared: &Vec<SymbolId>, alternatives: &[Vec<SymbolId>]) {
+        self.stats.add_pairs(alternatives.len());
+        self.stats.add_tokens(shared.len() + alternatives.iter().map(Vec::len).sum::<usize>());
+    }
+
+    /// The tokens of each of `transcripts`, tokenizing only those that aren't `Utterance`s already.
+    fn tokens_of(&self, transcripts: &[TranscriptArg]) -> Vec<Vec<SymbolId>> {
+        self.stats.time(Timer::Tokenize, || {
+            transcripts.iter().map(|transcript| transcript.tokens(&self.tokenizer).into_owned()).collect()
+        })
+    }
+
+    fn alternative_scores<'t, C: ComputeCost<SymbolId>>(
+        &self,
+        calculator: &C,
+        costs: Vec<Cost>,
+        pair: impl Fn(usize) -> (&'t Vec<SymbolId>, &'t Vec<SymbolId>),
+        length: impl Fn(usize) -> f64,
+    ) -> PyResult<AlternativeScores> {
+        let distances = costs.iter().enumerate().map(|(i, cost)| Distance::new(cost.0, length(i))).collect();
+        let best = (0..costs.len()).min_by_key(|&i| costs[i]);
+        let best_analysis = match best {
+            Some(i) => {
+                let (left, right) = pair(i);
+                let steps = self.wrapped(&self.stats.recording(calculator)).diff_steps(left, right);
+                let steps = steps.map_err(distance_error)?;
+                Some(self.compile_analysis(steps, length(i)))
+            }
+            None => None,
+        };
+        Ok(AlternativeScores { distances, best, best_analysis })
+    }
+
+    fn query_vector(&self, query: PhonemeQuery) -> PyResult<Vec<f64>> {
+        match query {
+            PhonemeQuery::Symbol(symbol) => {
+                let vector = match self.tokenizer.tokenize(&symbol)[..] {
+                    [id] => self.system.feature_vector(id),
+                    _ => None,
+                };
+                vector.ok_or_else(|| PyValueError::new_err(format!("Invalid phoneme {symbol}")))
+            }
+            PhonemeQuery::Features(values) if values.len() == self.system.num_features => Ok(values),
+            PhonemeQuery::Features(values) => Err(PyValueError::new_err(format!(
+                "Expected {} feature values, got {}", self.system.num_features, values.len()
+            ))),
+        }
+    }
+
+    fn resolve_ranked(&self, ranked: Vec<(SymbolId, Cost)>) -> Vec<(String, f64)> {
+        ranked
             .into_iter()
-            .map(|step| AnalysisStep::from(&step, length))
-            .collect();
-        let cost = steps.iter().map(|step| step.cost).sum();
-        let error_rate = if length != 0.0 { cost / length as f64 } else { 0.0 };
-        Analysis { steps, cost, length, error_rate }
+            .map(|(id, cost)| (self.system.symbols().resolve(id).to_string(), cost.0))
+            .collect()
     }
 }
 
+#[pymethods]
 impl PhlAnalyzer {
-    pub fn new(system_name: &str) -> Self {
-        let system = PhonologicalFeatureSystem::load(system_name);
-        let system = system.unwrap();
-        let tokenizer = PhonemeTokenizer::build(&system);
-        Self { system, tokenizer }
+    /// With a `cache_size`, remembers the alignments of up to that many pairs, so scoring a pair again (with the same
+    /// costs) skips the alignment. The cache is shared by the workers of the `*_many` and `*_arrays` methods.
+    ///
+    /// Pairs whose alignment table would have more than `max_table_cells` cells (reference length + 1 times hypothesis
+    /// length + 1) are traced to the same steps without the full table, in O(m log n) memory for a reference of
+    /// length n and a hypothesis of length m, taking roughly log₂ n times the fill time.
+    ///
+    /// With `weights`, a `CostWeights`, the system's costs are compiled again with them for this analyzer, and nearest
+    /// phoneme queries rank by the weighted costs.
+    #[new]
+    #[args(cache_size = "0", max_table_cells = "DEFAULT_MAX_TABLE_CELLS", weights = "None")]
+    pub fn new(
+        system_name: &str,
+        cache_size: usize,
+        max_table_cells: usize,
+        weights: Option<CostWeights>,
+    ) -> PyResult<Self> {
+        let weights = weights.map(cost_table::CostWeights::from).unwrap_or_default();
+        let SharedSystem { system, tokenizer, index } = registry::load(system_name)
+            .and_then(|shared| shared.weighted(&weights))
+            .map_err(|e| PyValueError::new_err(format!("{e:?}")))?;
+        let memo = (cache_size > 0).then(|| Arc::new(MemoCache::new(cache_size)));
+        Ok(Self { system, tokenizer, index, stats: Arc::new(Stats::new()), memo, max_table_cells })
+    }
+
+    /// The cache's `hits`, `misses`, `evictions`, `size` and `capacity`, as a dict. All zero without a cache.
+    pub fn cache_stats<'py>(&self, py: Python<'py>) -> PyResult<&'py PyDict> {
+        cache_stats_dict(py, self.memo.as_ref().map(|memo| memo.stats()).unwrap_or_default())
+    }
+
+    pub fn clear_cache(&self) {
+        if let Some(memo) = &self.memo {
+            memo.clear();
+        }
+    }
+
+    /// Starts (or stops) counting the work this analyzer does, for `stats`. Off by default, when it costs nothing.
+    #[args(enabled = "true")]
+    pub fn enable_stats(&self, enabled: bool) {
+        self.stats.set_enabled(enabled);
+    }
+
+    /// What this analyzer has done since stats were enabled or last reset, as a dict: `pairs`, `tokens`, `cells`
+    /// (dynamic programming cells filled), `cost_calls`, `unknown_symbol_errors`, and the seconds spent in each of
+    /// `tokenize`, `fill`, `backtrace` and `compile`. Batch methods count their pairs, but tokenize them in the
+    /// workers, so their tokens and tokenizing time aren't included.
+    pub fn stats<'py>(&self, py: Python<'py>) -> PyResult<&'py PyDict> {
+        stats_dict(py, self.stats.snapshot())
+    }
+
+    pub fn reset_stats(&self) {
+        self.stats.reset();
+    }
+
+    /// Tokenizes `text` and checks its symbols against the system once, for scoring it any number of times. Any method
+    /// that takes a transcript takes the result in its place.
+    pub fn tokenize(&self, text: &str) -> Utterance {
+        Utterance {
+            text: text.into(),
+            utterance: utterance::Utterance::new(&self.tokenizer, &self.system, text),
+            system: self.system.clone(),
+            tokenizer: self.tokenizer.clone(),
+        }
+    }
+
+    pub fn feature_diff(&self, left: TranscriptArg, right: TranscriptArg) -> PyResult<Analysis> {
+        self.try_feature_diff(&left, &right).map_err(distance_error)
+    }
+
+    pub fn phoneme_diff(&self, left: TranscriptArg, right: TranscriptArg) -> PyResult<Analysis> {
+        self.try_phoneme_diff(&left, &right).map_err(distance_error)
+    }
+
+    /// Both `phoneme_diff` and `feature_diff` of a pair, tokenizing it only once.
+    pub fn analyze(&self, left: TranscriptArg, right: TranscriptArg) -> PyResult<CombinedAnalysis> {
+        self.try_analyze(&left, &right).map_err(distance_error)
     }
 
-    pub fn feature_diff(&self, left: &str, right: &str) -> Analysis {
-        let calculator = FeatureCostCalculator::new(&self.system);
-        let length_fn = |tokens: &Vec<parsing::Symbol>| { (tokens.len() * self.system.num_features) as f64};
-        let analysis = self.analysis(&calculator, left, right, length_fn);
-        analysis.unwrap()
+    /// `analyze` for a list of (reference, hypothesis) pairs, across all cores, without holding the GIL.
+    pub fn analyze_many(
+        &self,
+        py: Python<'_>,
+        pairs: Vec<(TranscriptArg, TranscriptArg)>,
+    ) -> PyResult<Vec<CombinedAnalysis>> {
+        self.diff_many(py, pairs, Self::try_analyze)
+    }
+
+    /// Scores a list of (reference, hypothesis) pairs across all cores, without holding the GIL.
+    pub fn feature_diff_many(
+        &self,
+        py: Python<'_>,
+        pairs: Vec<(TranscriptArg, TranscriptArg)>,
+    ) -> PyResult<Vec<Analysis>> {
+        self.diff_many(py, pairs, Self::try_feature_diff)
     }
 
-    pub fn phoneme_diff(&self, left: &str, right: &str) -> Analysis {
+    /// Scores a list of (reference, hypothesis) pairs across all cores, without holding the GIL.
+    pub fn phoneme_diff_many(
+        &self,
+        py: Python<'_>,
+        pairs: Vec<(TranscriptArg, TranscriptArg)>,
+    ) -> PyResult<Vec<Analysis>> {
+        self.diff_many(py, pairs, Self::try_phoneme_diff)
+    }
+
+    /// Scores a list of (reference, hypothesis) pairs into NumPy arrays: `cost`, `length` and `error_rate` per pair.
+    /// With `steps=True`, also the steps of every pair as flat `step_*` columns, where the steps of pair `i` are rows
+    /// `step_offsets[i]:step_offsets[i + 1]`. `step_action` indexes `actions`, and `step_left`/`step_right` index
+    /// `symbols` (-1 for the empty side of an insertion or deletion).
+    #[args(steps = "false")]
+    pub fn feature_diff_arrays<'py>(
+        &self,
+        py: Python<'py>,
+        pairs: Vec<(TranscriptArg, TranscriptArg)>,
+        steps: bool
+    ) -> PyResult<&'py PyDict> {
+        let calculator = self.feature_costs(pairs.iter().flat_map(|(left, right)| [left, right]));
+        let length_fn = |tokens: &Vec<SymbolId>| { (tokens.len() * self.system.num_features) as f64};
+        self.diff_arrays(py, &calculator, pairs, length_fn, steps)
+    }
+
+    /// Like `feature_diff_arrays`, with phoneme costs.
+    #[args(steps = "false")]
+    pub fn phoneme_diff_arrays<'py>(
+        &self,
+        py: Python<'py>,
+        pairs: Vec<(TranscriptArg, TranscriptArg)>,
+        steps: bool
+    ) -> PyResult<&'py PyDict> {
         let calculator = PhonemeCostCalculator::new(&self.system);
-        let length_fn = |tokens: &Vec<parsing::Symbol>| tokens.len() as f64;
-        let analysis = self.analysis(&calculator, left, right, length_fn);
-        analysis.unwrap()
+        let length_fn = |tokens: &Vec<SymbolId>| tokens.len() as f64;
+        self.diff_arrays(py, &calculator, pairs, length_fn, steps)
     }
 
-    pub fn feature_deltas(&self, left: &str, right: &str) -> FeatureDeltaCollection {
-        let left_tokens = self.tokenizer.tokenize(left);
-        let right_tokens = self.tokenizer.tokenize(right);
+    /// Aligns a list of (reference, hypothesis) pairs across all cores and counts the steps, as a dict of NumPy
+    /// arrays. `confusions[i, j]` is how often reference symbol `symbols[i]` was aligned with hypothesis symbol
+    /// `symbols[j]`, where the last symbol, `""`, stands for the missing side of an insertion or deletion.
+    /// `feature_flips[k]` is how often a substitution changed feature `features[k]`, and `unknown` the number of steps
+    /// left out because a symbol isn't in the system.
+    pub fn feature_error_counts<'py>(
+        &self,
+        py: Python<'py>,
+        pairs: Vec<(TranscriptArg, TranscriptArg)>,
+    ) -> PyResult<&'py PyDict> {
+        let calculator = self.feature_costs(pairs.iter().flat_map(|(left, right)| [left, right]));
+        self.error_counts(py, &calculator, pairs)
+    }
+
+    /// Like `feature_error_counts`, with the alignments found with phoneme costs.
+    pub fn phoneme_error_counts<'py>(
+        &self,
+        py: Python<'py>,
+        pairs: Vec<(TranscriptArg, TranscriptArg)>,
+    ) -> PyResult<&'py PyDict> {
+        let calculator = PhonemeCostCalculator::new(&self.system);
+        self.error_counts(py, &calculator, pairs)
+    }
+
+    /// The system's phonemes as a (symbols, features, matrix) tuple, with one row of feature values per symbol.
+    /// With `dtype="float32"`, values are -1, -0.5, 0, 0.5 or 1 (NaN if undefined); with `dtype="int8"` they are
+    /// doubled to -2..2 (-128 if undefined).
+    #[args(dtype = "\"float32\"")]
+    pub fn feature_matrix(&self, py: Python<'_>, dtype: &str) -> PyResult<(Vec<String>, Vec<String>, PyObject)> {
+        let matrix = self.system.feature_matrix();
+        let shape = [matrix.symbols.len(), matrix.features.len()];
+        let values = match dtype {
+            "float32" => matrix.values.clone().into_pyarray(py).reshape(shape)?.into_py(py),
+            "int8" => matrix.half_steps().into_pyarray(py).reshape(shape)?.into_py(py),
+            _ => return Err(PyValueError::new_err(format!("Unsupported dtype {dtype:?}, use float32 or int8"))),
+        };
+        Ok((matrix.symbols, matrix.features, values))
+    }
+
+    /// The feature distance between every pair of phonemes, as a (symbols, matrix) tuple. Row and column order
+    /// match `feature_matrix`.
+    pub fn distance_matrix<'py>(&self, py: Python<'py>) -> PyResult<(Vec<String>, &'py PyArray2<f64>)> {
+        let symbols: Vec<_> = self.system.inventory()
+            .into_iter()
+            .map(|id| self.system.symbols().resolve(id).to_string())
+            .collect();
+        let n = symbols.len();
+        let distances = self.system.distance_matrix().into_pyarray(py).reshape([n, n])?;
+        Ok((symbols, distances))
+    }
+
+    /// Starts scoring a hypothesis that arrives a few phonemes at a time against `reference`, with feature costs.
+    pub fn feature_stream(&self, reference: TranscriptArg) -> StreamingAnalysis {
+        StreamingAnalysis::new(self, CostKind::Feature, &reference)
+    }
+
+    /// Like `feature_stream`, with phoneme costs.
+    pub fn phoneme_stream(&self, reference: TranscriptArg) -> StreamingAnalysis {
+        StreamingAnalysis::new(self, CostKind::Phoneme, &reference)
+    }
+
+    /// Scores each hypothesis of an N-best list against one reference. The reference is tokenized and costed once, and
+    /// hypotheses share the work for the prefixes they have in common.
+    pub fn feature_score_nbest(
+        &self,
+        py: Python<'_>,
+        reference: TranscriptArg,
+        hypotheses: Vec<TranscriptArg>
+    ) -> PyResult<AlternativeScores> {
+        let calculator = self.feature_costs(hypotheses.iter().chain([&reference]));
+        let length_fn = |tokens: &Vec<SymbolId>| { (tokens.len() * self.system.num_features) as f64};
+        self.score_nbest(py, &calculator, &reference, &hypotheses, length_fn)
+    }
+
+    /// Like `feature_score_nbest`, with phoneme costs.
+    pub fn phoneme_score_nbest(
+        &self,
+        py: Python<'_>,
+        reference: TranscriptArg,
+        hypotheses: Vec<TranscriptArg>
+    ) -> PyResult<AlternativeScores> {
+        let calculator = PhonemeCostCalculator::new(&self.system);
+        let length_fn = |tokens: &Vec<SymbolId>| tokens.len() as f64;
+        self.score_nbest(py, &calculator, &reference, &hypotheses, length_fn)
+    }
+
+    /// Scores one hypothesis against each of several acceptable references. The hypothesis is tokenized and costed
+    /// once, and references share the work for the prefixes they have in common.
+    pub fn feature_score_multi_reference(
+        &self,
+        py: Python<'_>,
+        references: Vec<TranscriptArg>,
+        hypothesis: TranscriptArg
+    ) -> PyResult<AlternativeScores> {
+        let calculator = self.feature_costs(references.iter().chain([&hypothesis]));
+        let length_fn = |tokens: &Vec<SymbolId>| { (tokens.len() * self.system.num_features) as f64};
+        self.score_multi_reference(py, &calculator, &references, &hypothesis, length_fn)
+    }
+
+    /// Like `feature_score_multi_reference`, with phoneme costs.
+    pub fn phoneme_score_multi_reference(
+        &self,
+        py: Python<'_>,
+        references: Vec<TranscriptArg>,
+        hypothesis: TranscriptArg
+    ) -> PyResult<AlternativeScores> {
+        let calculator = PhonemeCostCalculator::new(&self.system);
+        let length_fn = |tokens: &Vec<SymbolId>| tokens.len() as f64;
+        self.score_multi_reference(py, &calculator, &references, &hypothesis, length_fn)
+    }
+
+    /// The `k` phonemes closest to a phoneme or feature vector, as (symbol, cost) tuples, closest first. Costs are
+    /// the substitution costs of `feature_diff`.
+    #[args(k = "1")]
+    pub fn nearest_phonemes(&self, query: PhonemeQuery, k: usize) -> PyResult<Vec<(String, f64)>> {
+        let query = self.query_vector(query)?;
+        Ok(self.resolve_ranked(self.index.nearest(&query, k)))
+    }
+
+    /// Every phoneme within `max_cost` of a phoneme or feature vector, as (symbol, cost) tuples, closest first.
+    pub fn phonemes_within(&self, query: PhonemeQuery, max_cost: f64) -> PyResult<Vec<(String, f64)>> {
+        let query = self.query_vector(query)?;
+        Ok(self.resolve_ranked(self.index.within(&query, max_cost)))
+    }
+
+    /// Like `feature_diff`, but returns `None` as soon as the cost is known to exceed `max_cost`.
+    pub fn feature_diff_within(
+        &self,
+        left: TranscriptArg,
+        right: TranscriptArg,
+        max_cost: f64,
+    ) -> PyResult<Option<Analysis>> {
+        self.try_feature_diff_within(&left, &right, max_cost).map_err(distance_error)
+    }
+
+    /// Like `phoneme_diff`, but returns `None` as soon as the cost is known to exceed `max_cost`.
+    pub fn phoneme_diff_within(
+        &self,
+        left: TranscriptArg,
+        right: TranscriptArg,
+        max_cost: f64,
+    ) -> PyResult<Option<Analysis>> {
+        self.try_phoneme_diff_within(&left, &right, max_cost).map_err(distance_error)
+    }
+
+    pub fn feature_diff_within_many(
+        &self,
+        py: Python<'_>,
+        pairs: Vec<(TranscriptArg, TranscriptArg)>,
+        max_cost: f64
+    ) -> PyResult<Vec<Option<Analysis>>> {
+        self.diff_many(py, pairs, |analyzer, left, right| analyzer.try_feature_diff_within(left, right, max_cost))
+    }
+
+    pub fn phoneme_diff_within_many(
+        &self,
+        py: Python<'_>,
+        pairs: Vec<(TranscriptArg, TranscriptArg)>,
+        max_cost: f64
+    ) -> PyResult<Vec<Option<Analysis>>> {
+        self.diff_many(py, pairs, |analyzer, left, right| analyzer.try_phoneme_diff_within(left, right, max_cost))
+    }
+
+    /// Like `feature_diff`, but only computes the totals, in memory linear in the shorter transcription.
+    pub fn feature_distance(&self, left: TranscriptArg, right: TranscriptArg) -> PyResult<Distance> {
+        self.try_feature_distance(&left, &right).map_err(distance_error)
+    }
+
+    /// Like `phoneme_diff`, but only computes the totals, in memory linear in the shorter transcription.
+    pub fn phoneme_distance(&self, left: TranscriptArg, right: TranscriptArg) -> PyResult<Distance> {
+        self.try_phoneme_distance(&left, &right).map_err(distance_error)
+    }
+
+    pub fn feature_distance_many(
+        &self,
+        py: Python<'_>,
+        pairs: Vec<(TranscriptArg, TranscriptArg)>,
+    ) -> PyResult<Vec<Distance>> {
+        self.diff_many(py, pairs, Self::try_feature_distance)
+    }
+
+    pub fn phoneme_distance_many(
+        &self,
+        py: Python<'_>,
+        pairs: Vec<(TranscriptArg, TranscriptArg)>,
+    ) -> PyResult<Vec<Distance>> {
+        self.diff_many(py, pairs, Self::try_phoneme_distance)
+    }
+
+    pub fn feature_deltas(&self, left: TranscriptArg, right: TranscriptArg) -> PyResult<FeatureDeltaCollection> {
+        let (left_tokens, right_tokens) = (left.tokens(&self.tokenizer), right.tokens(&self.tokenizer));
         if left_tokens.len() != 1 || right_tokens.len() != 1 {
-            panic!("Invalid input {left} / {right}")
+            return Err(PyValueError::new_err(format!("Invalid input {} / {}", left.text(), right.text())))
         }
-        let left_token = &left_tokens[0];
-        let right_token = &right_tokens[0];
-        let analysis = self.feature_diff(&left.to_string(), &right.to_string());
-        let deltas = self.system.deltas(left_token, right_token)
+        let no_features = || {
+            PyValueError::new_err(format!("No features to compare in {} / {}", left.text(), right.text()))
+        };
+        let deltas = self.system.deltas(left_tokens[0], right_tokens[0]).ok_or_else(no_features)?;
+        let analysis = self.try_feature_diff(&left, &right).map_err(distance_error)?;
+        let deltas = deltas
             .into_iter()
             .map(|d| FeatureDelta{
                 name: d.name,
@@ -183,6 +1111,122 @@ impl PhlAnalyzer {
                 cost: analysis.cost,
             })
             .collect();
-        FeatureDeltaCollection{ deltas }
+        Ok(FeatureDeltaCollection{ deltas })
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use pyo3::prelude::*;
+    use phonologic::distance::levenshtein::DEFAULT_MAX_TABLE_CELLS;
+    use crate::{AlternativeScores, Analysis, PhlAnalyzer, TranscriptArg};
+
+    fn text(s: &str) -> TranscriptArg {
+        TranscriptArg::Text(s.to_string())
+    }
+
+    fn cells(py: Python<'_>, analyzer: &PhlAnalyzer) -> u64 {
+        analyzer.stats(py).unwrap().get_item("cells").unwrap().extract().unwrap()
+    }
+
+    #[test]
+    fn test_stats() {
+        pyo3::prepare_freethreaded_python();
+        Python::with_gil(|py| {
+            let analyzer = PhlAnalyzer::new("hayes", 0, DEFAULT_MAX_TABLE_CELLS, None).unwrap();
+            analyzer.enable_stats(true);
+            assert!(analyzer.feature_diff_within(text("kæt"), text("bæts"), 1.0).unwrap().is_none());
+            let after_within = cells(py, &analyzer);
+            // Only the band under the bound is filled, not the whole 4 × 5 table
+            assert_eq!(4, after_within);
+
+            let mut stream = analyzer.feature_stream(text("kæt"));
+            stream.push(text("bæ")).unwrap();
+            let after_push = cells(py, &analyzer);
+            assert!(after_push > after_within);
+            stream.analysis().unwrap();
+            assert!(cells(py, &analyzer) > after_push);
+
+            // Each hypothesis fills the columns past the prefix it shares, then the best is traced in full
+            analyzer.reset_stats();
+            let hypotheses = vec![text("bæts"), text("bæt"), text("kæt")];
+            analyzer.feature_score_nbest(py, text("kæt"), hypotheses).unwrap();
+            let stats = analyzer.stats(py).unwrap();
+            assert_eq!(3u64, stats.get_item("pairs").unwrap().extract().unwrap());
+            assert_eq!(3 + 4 + 3 + 3u64, stats.get_item("tokens").unwrap().extract().unwrap());
+            assert_eq!(4 * 4 + 4 + 4 * 3 + 4 * 4, cells(py, &analyzer));
+            assert!(stats.get_item("cost_calls").unwrap().extract::<u64>().unwrap() > 0);
+        });
+    }
+
+    #[test]
+    fn test_nbest_above_max_table_cells() {
+        pyo3::prepare_freethreaded_python();
+        Python::with_gil(|py| {
+            let reference = "kætsændɑɡz".repeat(8);
+            let hypotheses: Vec<_> = [reference.replace("ɑ", "ʌ"), "bæt".repeat(20), reference.replacen("k", "", 3)]
+                .iter()
+                .map(|hypothesis| text(hypothesis))
+                .collect();
+            let bounded = PhlAnalyzer::new("hayes", 8, 64, None).unwrap();
+            let unbounded = PhlAnalyzer::new("hayes", 0, DEFAULT_MAX_TABLE_CELLS, None).unwrap();
+            let steps = |analysis: Analysis| -> Vec<_> {
+                analysis.steps.into_iter().map(|s| (format!("{:?}", s.action), s.left, s.right, s.cost)).collect()
+            };
+
+            let scores = bounded.feature_score_nbest(py, text(&reference), hypotheses.clone()).unwrap();
+            let expected = unbounded.feature_score_nbest(py, text(&reference), hypotheses.clone()).unwrap();
+            assert_eq!(expected.best, scores.best);
+            assert_eq!(steps(expected.best_analysis.unwrap()), steps(scores.best_analysis.unwrap()));
+            // The best pair was traced through the analyzer's cache, too
+            let cache_stats = bounded.cache_stats(py).unwrap();
+            assert_eq!(1, cache_stats.get_item("size").unwrap().extract::<usize>().unwrap());
+
+            let scores = bounded.phoneme_score_multi_reference(py, hypotheses.clone(), text(&reference)).unwrap();
+            let expected = unbounded.phoneme_score_multi_reference(py, hypotheses, text(&reference)).unwrap();
+            assert_eq!(steps(expected.best_analysis.unwrap()), steps(scores.best_analysis.unwrap()));
+        });
     }
-}
\ No newline at end of file
+
+    #[test]
+    fn test_nbest_utterances() {
+        pyo3::prepare_freethreaded_python();
+        Python::with_gil(|py| {
+            let analyzer = PhlAnalyzer::new("hayes", 0, DEFAULT_MAX_TABLE_CELLS, None).unwrap();
+            let other = PhlAnalyzer::new("hayes-ipa-arpabet", 0, DEFAULT_MAX_TABLE_CELLS, None).unwrap();
+            let utterance = |analyzer: &PhlAnalyzer, s: &str| TranscriptArg::Utterance(analyzer.tokenize(s));
+            let distances = |scores: AlternativeScores| -> Vec<_> {
+                scores.distances.into_iter().map(|d| (d.cost, d.length)).collect()
+            };
+            let hypotheses = ["bæts", "kæt", "kɑts"];
+
+            let texts: Vec<_> = hypotheses.iter().map(|h| text(h)).collect();
+            let expected = distances(analyzer.feature_score_nbest(py, text("kæts"), texts).unwrap());
+            let utterances: Vec<_> = hypotheses.iter().map(|h| utterance(&analyzer, h)).collect();
+            let scores = analyzer.feature_score_nbest(py, utterance(&analyzer, "kæts"), utterances).unwrap();
+            assert_eq!(Some(2), scores.best);
+            assert_eq!(expected, distances(scores));
+
+            // Utterances of another system are tokenized again, and mixing them with text is fine
+            let mixed = vec![utterance(&other, "bæts"), text("kæt"), utterance(&analyzer, "kɑts")];
+            let scores = analyzer.feature_score_nbest(py, utterance(&other, "kæts"), mixed).unwrap();
+            assert_eq!(expected, distances(scores));
+
+            // Unknown symbols still fail rather than being looked up unchecked
+            let unknown = vec![utterance(&analyzer, "kæ1")];
+            assert!(analyzer.feature_score_nbest(py, utterance(&analyzer, "kæts"), unknown).is_err());
+        });
+    }
+
+    #[test]
+    fn test_feature_deltas() {
+        pyo3::prepare_freethreaded_python();
+        Python::with_gil(|_| {
+            let analyzer = PhlAnalyzer::new("hayes", 0, DEFAULT_MAX_TABLE_CELLS, None).unwrap();
+            assert!(!analyzer.feature_deltas(text("k"), text("b")).unwrap().deltas.is_empty());
+            // Zero-cost symbols have no features to compare, and more than one symbol isn't a pair of phonemes
+            assert!(analyzer.feature_deltas(text("k"), text("<sil>")).is_err());
+            assert!(analyzer.feature_deltas(text("kæ"), text("b")).is_err());
+        });
+    }
+}
@@ -0,0 +1,65 @@
+use criterion::{black_box, criterion_group, criterion_main, BenchmarkId, Criterion, Throughput};
+use phonologic::distance::feature_distance::FeatureCostCalculator;
+use phonologic::distance::levenshtein::ComputeCost;
+use phonologic::distance::phoneme_distance::PhonemeCostCalculator;
+use phonologic::distance::phoneme_tokenizer::PhonemeTokenizer;
+use phonologic::phl::symbols::SymbolId;
+use phonologic::phl::systems::PhonologicalFeatureSystem;
+
+mod corpus;
+use corpus::{Corpus, EXAMPLE_SYSTEM};
+
+/// Reference lengths in symbols, from a single word up to a long read passage
+const LENGTHS: [usize; 5] = [4, 16, 64, 256, 1024];
+
+/// About what an APR system gets wrong on the example file
+const ERROR_RATE: f64 = 0.2;
+
+fn tokenized_pairs(tokenizer: &PhonemeTokenizer) -> Vec<(usize, Vec<SymbolId>, Vec<SymbolId>)> {
+    let corpus = Corpus::example();
+    LENGTHS.iter()
+        .map(|&length| {
+            let (reference, hypothesis) = corpus.pairs(length as u64, 1, length, ERROR_RATE).remove(0);
+            (length, tokenizer.tokenize(&reference), tokenizer.tokenize(&hypothesis))
+        })
+        .collect()
+}
+
+fn bench_calculator<C>(c: &mut Criterion, name: &str, calculator: &C, tokenizer: &PhonemeTokenizer)
+    where C: ComputeCost<SymbolId>
+{
+    let pairs = tokenized_pairs(tokenizer);
+
+    let mut group = c.benchmark_group(format!("{name}/diff_steps"));
+    for (length, left, right) in &pairs {
+        group.throughput(Throughput::Elements((left.len() * right.len()) as u64));
+        group.bench_with_input(BenchmarkId::from_parameter(length), &(left, right), |b, (left, right)| {
+            b.iter(|| calculator.diff_steps(black_box(left), black_box(right)).unwrap())
+        });
+    }
+    group.finish();
+
+    let mut group = c.benchmark_group(format!("{name}/distance_only"));
+    for (length, left, right) in &pairs {
+        group.throughput(Throughput::Elements((left.len() * right.len()) as u64));
+        group.bench_with_input(BenchmarkId::from_parameter(length), &(left, right), |b, (left, right)| {
+            b.iter(|| calculator.distance_only(black_box(left), black_box(right)).unwrap())
+        });
+    }
+    group.finish();
+}
+
+fn features(c: &mut Criterion) {
+    let system = PhonologicalFeatureSystem::load(EXAMPLE_SYSTEM).unwrap();
+    let tokenizer = PhonemeTokenizer::build(&system);
+    bench_calculator(c, "features", &FeatureCostCalculator::new(&system), &tokenizer);
+}
+
+fn phonemes(c: &mut Criterion) {
+    let system = PhonologicalFeatureSystem::load(EXAMPLE_SYSTEM).unwrap();
+    let tokenizer = PhonemeTokenizer::build(&system);
+    bench_calculator(c, "phonemes", &PhonemeCostCalculator::new(&system), &tokenizer);
+}
+
+criterion_group!(benches, features, phonemes);
+criterion_main!(benches);
@@ -0,0 +1,108 @@
+//! Synthetic corpora for the benchmarks, spliced together from the transcripts in `docs/example_file.tsv` so their
+//! symbols and utterance lengths look like real data. The same seed gives the same corpus on every machine.
+#![allow(dead_code)]
+
+const EXAMPLE_FILE: &str = include_str!("../../../docs/example_file.tsv");
+
+/// The system the example file's ARPAbet transcripts belong to
+pub const EXAMPLE_SYSTEM: &str = "hayes-arpabet";
+
+/// xorshift64*, which is plenty for picking symbols and saves a dependency.
+pub struct Rng(u64);
+
+impl Rng {
+    pub fn new(seed: u64) -> Self {
+        Self(seed.max(1))
+    }
+
+    pub fn next(&mut self) -> u64 {
+        self.0 ^= self.0 >> 12;
+        self.0 ^= self.0 << 25;
+        self.0 ^= self.0 >> 27;
+        self.0.wrapping_mul(0x2545F4914F6CDD1D)
+    }
+
+    pub fn below(&mut self, n: usize) -> usize {
+        (self.next() % n as u64) as usize
+    }
+
+    pub fn chance(&mut self, probability: f64) -> bool {
+        ((self.next() >> 11) as f64 / (1u64 << 53) as f64) < probability
+    }
+}
+
+pub struct Corpus {
+    references: Vec<Vec<&'static str>>,
+    inventory: Vec<&'static str>,
+}
+
+impl Corpus {
+    /// The reference transcripts of the example file, and every symbol used on either side.
+    pub fn example() -> Self {
+        let mut references = vec![];
+        let mut inventory = vec![];
+        for line in EXAMPLE_FILE.lines().skip(1) {
+            let columns: Vec<&str> = line.split('\t').collect();
+            if columns.len() < 3 {
+                continue;
+            }
+            let reference: Vec<&str> = columns[1].split_whitespace().collect();
+            inventory.extend(columns[1].split_whitespace().chain(columns[2].split_whitespace()));
+            if !reference.is_empty() {
+                references.push(reference);
+            }
+        }
+        inventory.sort();
+        inventory.dedup();
+        Self { references, inventory }
+    }
+
+    /// A reference of exactly `length` symbols, made of example references end to end from a random start.
+    pub fn reference(&self, rng: &mut Rng, length: usize) -> Vec<&'static str> {
+        let mut reference = Vec::with_capacity(length);
+        let mut next = rng.below(self.references.len());
+        while reference.len() < length {
+            let remaining = length - reference.len();
+            reference.extend(self.references[next].iter().take(remaining));
+            next = (next + 1) % self.references.len();
+        }
+        reference
+    }
+
+    /// A copy of `reference` where each symbol has an `error_rate` chance of being substituted, deleted or followed
+    /// by an insertion, in equal measure.
+    pub fn hypothesis(&self, rng: &mut Rng, reference: &[&'static str], error_rate: f64) -> Vec<&'static str> {
+        let mut hypothesis = Vec::with_capacity(reference.len() + 1);
+        for &symbol in reference {
+            if !rng.chance(error_rate) {
+                hypothesis.push(symbol);
+                continue;
+            }
+            match rng.below(3) {
+                0 => hypothesis.push(self.random_symbol(rng)),
+                1 => {}
+                _ => {
+                    hypothesis.push(symbol);
+                    hypothesis.push(self.random_symbol(rng));
+                }
+            }
+        }
+        hypothesis
+    }
+
+    /// `count` (reference, hypothesis) pairs of `length` reference symbols each, as space-separated transcripts.
+    pub fn pairs(&self, seed: u64, count: usize, length: usize, error_rate: f64) -> Vec<(String, String)> {
+        let mut rng = Rng::new(seed);
+        (0..count)
+            .map(|_| {
+                let reference = self.reference(&mut rng, length);
+                let hypothesis = self.hypothesis(&mut rng, &reference, error_rate);
+                (reference.join(" "), hypothesis.join(" "))
+            })
+            .collect()
+    }
+
+    fn random_symbol(&self, rng: &mut Rng) -> &'static str {
+        self.inventory[rng.below(self.inventory.len())]
+    }
+}
@@ -0,0 +1,30 @@
+use criterion::{black_box, criterion_group, criterion_main, BenchmarkId, Criterion};
+use phonologic::phl::systems::PhonologicalFeatureSystem;
+
+const SYSTEMS: [&str; 3] = ["hayes", "hayes-arpabet", "hayes-ipa-arpabet"];
+
+/// Built-in systems, which are compiled into the binary.
+fn load(c: &mut Criterion) {
+    let mut group = c.benchmark_group("systems/load");
+    for name in SYSTEMS {
+        group.bench_with_input(BenchmarkId::from_parameter(name), name, |b, name| {
+            b.iter(|| PhonologicalFeatureSystem::load(black_box(name)).unwrap())
+        });
+    }
+    group.finish();
+}
+
+/// The same systems from their `.phl` sources, as a custom system would be loaded.
+fn parse(c: &mut Criterion) {
+    let mut group = c.benchmark_group("systems/parse");
+    for name in SYSTEMS {
+        let path = format!("{}/assets/systems/{name}.phl", env!("CARGO_MANIFEST_DIR"));
+        group.bench_with_input(BenchmarkId::from_parameter(name), &path, |b, path| {
+            b.iter(|| PhonologicalFeatureSystem::load(black_box(path)).unwrap())
+        });
+    }
+    group.finish();
+}
+
+criterion_group!(benches, load, parse);
+criterion_main!(benches);
@@ -0,0 +1,37 @@
+use criterion::{black_box, criterion_group, criterion_main, BenchmarkId, Criterion, Throughput};
+use phonologic::distance::phoneme_tokenizer::PhonemeTokenizer;
+use phonologic::phl::systems::PhonologicalFeatureSystem;
+
+mod corpus;
+use corpus::{Corpus, EXAMPLE_SYSTEM};
+
+const SYSTEMS: [&str; 3] = ["hayes", "hayes-arpabet", "hayes-ipa-arpabet"];
+
+fn build(c: &mut Criterion) {
+    let mut group = c.benchmark_group("tokenizer/build");
+    for name in SYSTEMS {
+        let system = PhonologicalFeatureSystem::load(name).unwrap();
+        group.bench_with_input(BenchmarkId::from_parameter(name), &system, |b, system| {
+            b.iter(|| PhonemeTokenizer::build(black_box(system)))
+        });
+    }
+    group.finish();
+}
+
+fn tokenize(c: &mut Criterion) {
+    let system = PhonologicalFeatureSystem::load(EXAMPLE_SYSTEM).unwrap();
+    let tokenizer = PhonemeTokenizer::build(&system);
+    let corpus = Corpus::example();
+    let mut group = c.benchmark_group("tokenizer/tokenize");
+    for length in [8, 32, 128, 512] {
+        let (reference, _) = corpus.pairs(length as u64, 1, length, 0.0).remove(0);
+        group.throughput(Throughput::Elements(length as u64));
+        group.bench_with_input(BenchmarkId::from_parameter(length), &reference, |b, reference| {
+            b.iter(|| tokenizer.tokenize(black_box(reference)))
+        });
+    }
+    group.finish();
+}
+
+criterion_group!(benches, build, tokenize);
+criterion_main!(benches);
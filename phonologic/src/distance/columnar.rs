@@ -0,0 +1,170 @@
+use std::collections::HashMap;
+use crate::distance::levenshtein::{ComputeCost, LevenshteinStep};
+use crate::distance::phoneme_tokenizer::PhonemeTokenizer;
+use crate::distance::utterance::Transcript;
+use crate::errors::PhlDistanceError;
+use crate::helpers::parallel::par_map;
+use crate::phl::symbols::{SymbolId, SymbolTable};
+
+/// Symbol id standing for the empty side of an insertion or deletion
+pub const EPSILON: i32 = -1;
+
+/// Analyses of a batch of pairs as flat columns, ready to hand to array libraries without building an object per
+/// step.
+///
+/// The steps of pair `i` are rows `step_offsets[i]..step_offsets[i + 1]` of the `step_*` columns; these are empty
+/// unless steps were requested. Symbols are indices into `symbols`, or `EPSILON`. Symbols outside the system are
+/// numbered after the system's own, in the order they first appear.
+#[derive(Clone, Debug, Default, PartialEq)]
+pub struct AnalysisColumns {
+    pub cost: Vec<f64>,
+    pub length: Vec<f64>,
+    pub error_rate: Vec<f64>,
+    pub step_offsets: Vec<u64>,
+    pub step_pair: Vec<u32>,
+    pub step_action: Vec<u8>,
+    pub step_left: Vec<i32>,
+    pub step_right: Vec<i32>,
+    pub step_cost: Vec<f64>,
+    pub symbols: Vec<String>,
+}
+
+pub struct AnalysisColumnsBuilder<'a> {
+    symbols: &'a SymbolTable,
+    unknown: HashMap<SymbolId, i32>,
+    columns: AnalysisColumns,
+}
+
+impl<'a> AnalysisColumnsBuilder<'a> {
+    pub fn new(symbols: &'a SymbolTable) -> Self {
+        let columns = AnalysisColumns {
+            step_offsets: vec![0],
+            symbols: (0..symbols.len()).map(|id| symbols.resolve(id as SymbolId).to_string()).collect(),
+            ..Default::default()
+        };
+        Self { symbols, unknown: HashMap::new(), columns }
+    }
+
+    /// Adds a pair scored without its steps.
+    pub fn push_cost(&mut self, cost: f64, length: f64) {
+        let columns = &mut self.columns;
+        columns.cost.push(cost);
+        columns.length.push(length);
+        columns.error_rate.push(if length != 0.0 { cost / length } else { 0.0 });
+        columns.step_offsets.push(columns.step_pair.len() as u64);
+    }
+
+    pub fn push_steps(&mut self, steps: &Vec<LevenshteinStep<SymbolId>>, length: f64) {
+        let pair = self.columns.cost.len() as u32;
+        for step in steps {
+            let left = self.column_id(step.expected);
+            let right = self.column_id(step.actual);
+            let columns = &mut self.columns;
+            columns.step_pair.push(pair);
+            columns.step_action.push(step.action.code());
+            columns.step_left.push(left);
+            columns.step_right.push(right);
+            columns.step_cost.push(step.cost.0);
+        }
+        let cost = steps.iter().map(|step| step.cost.0).sum();
+        self.push_cost(cost, length);
+    }
+
+    pub fn finish(self) -> AnalysisColumns {
+        self.columns
+    }
+
+    fn column_id(&mut self, id: Option<SymbolId>) -> i32 {
+        let id = match id {
+            None => return EPSILON,
+            Some(id) if self.symbols.is_known(id) => return id as i32,
+            Some(id) => id,
+        };
+        let names = &mut self.columns.symbols;
+        *self.unknown.entry(id).or_insert_with(|| {
+            names.push(self.symbols.resolve(id).to_string());
+            (names.len() - 1) as i32
+        })
+    }
+}
+
+enum Scored {
+    Steps(Vec<LevenshteinStep<SymbolId>>),
+    Cost(f64),
+}
+
+/// Tokenizes and scores every pair across all cores, collecting the results as columns. Steps are only traced if
+/// `with_steps` is set; otherwise only the costs are computed. The first pair that can't be scored fails the batch.
+pub fn analyze_columns<S, C, LFn>(
+    tokenizer: &PhonemeTokenizer,
+    symbols: &SymbolTable,
+    calculator: &C,
+    pairs: &[(S, S)],
+    length_fn: LFn,
+    with_steps: bool,
+) -> Result<AnalysisColumns, PhlDistanceError>
+    where S: Transcript + Sync,
+          C: ComputeCost<SymbolId> + Sync,
+          LFn: Fn(&Vec<SymbolId>) -> f64 + Sync
+{
+    let results = par_map(pairs, |(left, right)| {
+        let left_tokens = left.tokens(tokenizer);
+        let right_tokens = right.tokens(tokenizer);
+        let length = length_fn(&left_tokens);
+        let scored = if with_steps {
+            Scored::Steps(calculator.diff_steps(&left_tokens, &right_tokens)?)
+        }
+        else {
+            Scored::Cost(calculator.distance_only(&left_tokens, &right_tokens)?.0)
+        };
+        Ok((scored, length))
+    });
+
+    let mut builder = AnalysisColumnsBuilder::new(symbols);
+    for result in results {
+        match result? {
+            (Scored::Steps(steps), length) => builder.push_steps(&steps, length),
+            (Scored::Cost(cost), length) => builder.push_cost(cost, length),
+        }
+    }
+    Ok(builder.finish())
+}
+
+#[cfg(test)]
+mod tests {
+    use crate::distance::columnar::{analyze_columns, EPSILON};
+    use crate::distance::levenshtein::Action;
+    use crate::distance::phoneme_distance::PhonemeCostCalculator;
+    use crate::distance::phoneme_tokenizer::PhonemeTokenizer;
+    use crate::phl::symbols::SymbolId;
+    use crate::phl::systems::PhonologicalFeatureSystem;
+
+    #[test]
+    fn test_analyze_columns() {
+        let system = PhonologicalFeatureSystem::load("hayes").unwrap();
+        let tokenizer = PhonemeTokenizer::build(&system);
+        let calculator = PhonemeCostCalculator::new(&system);
+        let length_fn = |tokens: &Vec<SymbolId>| tokens.len() as f64;
+        let pairs = [("kæt", "bæ1"), ("", ""), ("kæt", "kæ")];
+
+        let columns = analyze_columns(&tokenizer, system.symbols(), &calculator, &pairs, length_fn, true).unwrap();
+        assert_eq!(vec![2.0, 0.0, 1.0], columns.cost);
+        assert_eq!(vec![3.0, 0.0, 3.0], columns.length);
+        assert_eq!(vec![2.0 / 3.0, 0.0, 1.0 / 3.0], columns.error_rate);
+        assert_eq!(vec![0, 3, 3, 6], columns.step_offsets);
+        assert_eq!(vec![0, 0, 0, 2, 2, 2], columns.step_pair);
+
+        let symbol = |id: i32| columns.symbols[id as usize].as_str();
+        assert_eq!(Action::SUB.code(), columns.step_action[0]);
+        assert_eq!(("k", "b"), (symbol(columns.step_left[0]), symbol(columns.step_right[0])));
+        assert_eq!(("t", "1"), (symbol(columns.step_left[2]), symbol(columns.step_right[2])));
+        assert_eq!(system.symbols().len() + 1, columns.symbols.len());
+        assert_eq!(Action::DEL.code(), columns.step_action[5]);
+        assert_eq!(EPSILON, columns.step_right[5]);
+
+        let costs = analyze_columns(&tokenizer, system.symbols(), &calculator, &pairs, length_fn, false).unwrap();
+        assert_eq!(columns.cost, costs.cost);
+        assert_eq!(vec![0, 0, 0, 0], costs.step_offsets);
+        assert!(costs.step_pair.is_empty());
+    }
+}
@@ -0,0 +1,215 @@
+use std::collections::{HashMap, HashSet};
+use crate::distance::feature_distance::feature_cost;
+use crate::distance::levenshtein::Cost;
+use crate::errors::PhlParseError;
+use crate::errors::PhlParseError::{InvalidFeatureNameError, InvalidFeatureValueError};
+use crate::phl::parsing::Symbol;
+use crate::phl::symbols::{SymbolId, SymbolTable};
+use crate::phl::systems::PhonologicalFeatureEntry;
+
+/// Customized costs for a system: each feature's share of a feature cost, multipliers of substitutions, deletions and
+/// insertions, and symbols to treat like `<sil>`, `<unk>` and `<spn>`. They're compiled into the system's cost table,
+/// so the aligner does no more work with them than without.
+#[derive(Clone, Debug, PartialEq)]
+pub struct CostWeights {
+    /// Weights of features by name; any feature not named weighs 1
+    pub features: HashMap<String, f64>,
+    pub substitution: f64,
+    pub deletion: f64,
+    pub insertion: f64,
+    /// Symbols that cost nothing to delete, insert or substitute for each other, besides `<sil>`, `<unk>` and
+    /// `<spn>`
+    pub zero_cost_symbols: Vec<String>,
+}
+
+impl Default for CostWeights {
+    fn default() -> Self {
+        Self {
+            features: HashMap::new(),
+            substitution: 1.0,
+            deletion: 1.0,
+            insertion: 1.0,
+            zero_cost_symbols: vec![],
+        }
+    }
+}
+
+impl CostWeights {
+    /// The weight of each of `feature_names`, in order. Every weight must be a finite number of at least 0, and
+    /// every feature named must be one of `feature_names`.
+    pub fn feature_vector(&self, feature_names: &[&str]) -> Result<Vec<f64>, PhlParseError> {
+        for (name, &weight) in self.features.iter() {
+            if !feature_names.contains(&name.as_str()) {
+                return Err(InvalidFeatureNameError(format!("No feature named {name} to weight")));
+            }
+            check_weight(name, weight)?;
+        }
+        check_weight("substitution", self.substitution)?;
+        check_weight("deletion", self.deletion)?;
+        check_weight("insertion", self.insertion)?;
+        Ok(feature_names.iter().map(|&name| self.features.get(name).copied().unwrap_or(1.0)).collect())
+    }
+}
+
+fn check_weight(name: &str, weight: f64) -> Result<(), PhlParseError> {
+    if weight.is_finite() && weight >= 0.0 {
+        Ok(())
+    }
+    else {
+        Err(InvalidFeatureValueError(format!("Weight of {name} must be a finite number of at least 0, not {weight}")))
+    }
+}
+
+/// Feature costs for every symbol of a system, compiled once so the aligner only has to index into them.
+/// Symbols are addressed by their id in the system's `SymbolTable`; zero-cost symbols are folded into the table.
+pub struct FeatureCostTable {
+    size: usize,
+    zero_cost: Vec<bool>,
+    sub: Vec<Cost>,
+    del: Vec<Cost>,
+    ins: Vec<Cost>,
+}
+
+impl FeatureCostTable {
+    pub fn compile(
+        entries: &Vec<PhonologicalFeatureEntry>,
+        symbols: &SymbolTable,
+        zero_cost_symbols: &HashSet<Symbol>,
+        feature_weights: &[f64],
+        weights: &CostWeights,
+    ) -> Self {
+        let size = symbols.len();
+        let zero_cost: Vec<_> = (0..size)
+            .map(|id| zero_cost_symbols.contains(symbols.get(id as SymbolId).unwrap()))
+            .collect();
+        // Feature costs are symmetric, so each pair is only summed once
+        let mut sub = vec![Cost::ZERO; size * size];
+        for expected in 0..size {
+            for actual in expected..size {
+                let cost = match (zero_cost[expected], zero_cost[actual]) {
+                    (true, true) => Cost::ZERO,
+                    (true, false) | (false, true) => Cost::INFINITY,
+                    (false, false) => entries[expected].features
+                        .iter()
+                        .zip(entries[actual].features.iter())
+                        .zip(feature_weights)
+                        .map(|((a, b), &weight)| feature_cost(Some(&a.value), Some(&b.value)) * weight)
+                        .sum::<Cost>() * weights.substitution,
+                };
+                sub[expected * size + actual] = cost;
+                sub[actual * size + expected] = cost;
+            }
+        }
+        let indel: Vec<_> = (0..size)
+            .map(|id| if zero_cost[id] { Cost::ZERO } else {
+                entries[id].features
+                    .iter()
+                    .zip(feature_weights)
+                    .map(|(a, &weight)| feature_cost(Some(&a.value), None) * weight)
+                    .sum::<Cost>()
+            })
+            .collect();
+        let del = indel.iter().map(|&cost| cost * weights.deletion).collect();
+        let ins = indel.iter().map(|&cost| cost * weights.insertion).collect();
+        Self { size, zero_cost, sub, del, ins }
+    }
+
+    pub fn size(&self) -> usize {
+        self.size
+    }
+
+    #[inline]
+    pub fn contains(&self, id: SymbolId) -> bool {
+        (id as usize) < self.size
+    }
+
+    #[inline]
+    pub fn is_zero_cost(&self, id: SymbolId) -> bool {
+        self.contains(id) && self.zero_cost[id as usize]
+    }
+
+    #[inline]
+    pub fn sub(&self, expected: SymbolId, actual: SymbolId) -> Cost {
+        self.sub[expected as usize * self.size + actual as usize]
+    }
+
+    #[inline]
+    pub fn del(&self, expected: SymbolId) -> Cost {
+        self.del[expected as usize]
+    }
+
+    #[inline]
+    pub fn ins(&self, actual: SymbolId) -> Cost {
+        self.ins[actual as usize]
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use std::collections::HashMap;
+    use crate::distance::cost_table::CostWeights;
+    use crate::distance::feature_distance::FeatureCostCalculator;
+    use crate::distance::levenshtein::{ComputeCost, Cost};
+    use crate::distance::phoneme_distance::PhonemeCostCalculator;
+    use crate::distance::phoneme_tokenizer::PhonemeTokenizer;
+    use crate::errors::PhlParseError::{InvalidFeatureNameError, InvalidFeatureValueError};
+    use crate::phl::systems::PhonologicalFeatureSystem;
+
+    #[test]
+    fn test_compiled_costs() {
+        let system = PhonologicalFeatureSystem::load("hayes").unwrap();
+        let id = |s: &str| system.symbol_id(s).unwrap();
+        let costs = &system.costs;
+
+        assert_eq!(costs.size(), system.entries.len() + 3);
+        assert_eq!(costs.sub(id("f"), id("v")), Cost(1.0));
+        assert_eq!(costs.sub(id("s"), id("θ")), Cost(2.0));
+        assert_eq!(costs.sub(id("e͡ɪ"), id("a͡ɪ")), Cost(1.75));
+        assert_eq!(costs.sub(id("k"), id("k")), Cost::ZERO);
+        assert_eq!(costs.del(id("k")), Cost(23.0));
+        assert_eq!(costs.ins(id("k")), Cost(23.0));
+
+        assert!(costs.is_zero_cost(id("<spn>")));
+        assert_eq!(costs.sub(id("<spn>"), id("<sil>")), Cost::ZERO);
+        assert_eq!(costs.sub(id("<spn>"), id("k")), Cost::INFINITY);
+        assert_eq!(costs.del(id("<spn>")), Cost::ZERO);
+    }
+
+    #[test]
+    fn test_weighted_costs() {
+        let system = PhonologicalFeatureSystem::load("hayes").unwrap();
+        let weights = CostWeights {
+            features: HashMap::from([("voice".to_string(), 0.5)]),
+            substitution: 2.0,
+            insertion: 0.5,
+            zero_cost_symbols: vec!["ʔ".to_string(), "<noise>".to_string()],
+            ..Default::default()
+        };
+        let weighted = system.weighted(&weights).unwrap();
+        let id = |s: &str| weighted.symbol_id(s).unwrap();
+        let costs = &weighted.costs;
+
+        assert_eq!(costs.sub(id("f"), id("v")), Cost(1.0));
+        assert_eq!(costs.sub(id("s"), id("θ")), Cost(4.0));
+        // Deleting k loses its -voice as well
+        assert_eq!(costs.del(id("k")), Cost(22.5));
+        assert_eq!(costs.ins(id("k")), Cost(11.25));
+        assert!(costs.is_zero_cost(id("ʔ")));
+        assert!(costs.is_zero_cost(id("<noise>")));
+        assert_eq!(costs.sub(id("<noise>"), id("<sil>")), Cost::ZERO);
+        assert_eq!(costs.sub(id("ʔ"), id("k")), Cost::INFINITY);
+        assert_eq!(&weights, weighted.weights());
+
+        let tokenizer = PhonemeTokenizer::build(&weighted);
+        let steps = FeatureCostCalculator::new(&weighted)
+            .diff_steps(&tokenizer.tokenize("kæt"), &tokenizer.tokenize("kæ<noise>tʔ"))
+            .unwrap();
+        assert_eq!(Cost::ZERO, steps.iter().map(|step| step.cost).sum());
+        assert_eq!(Cost(0.5), PhonemeCostCalculator::new(&weighted).cost_ins(Some(&id("k"))).unwrap());
+
+        let unknown = CostWeights { features: HashMap::from([("loudness".to_string(), 1.0)]), ..Default::default() };
+        assert!(matches!(system.weighted(&unknown), Err(InvalidFeatureNameError(_))));
+        let negative = CostWeights { deletion: -1.0, ..Default::default() };
+        assert!(matches!(system.weighted(&negative), Err(InvalidFeatureValueError(_))));
+    }
+}
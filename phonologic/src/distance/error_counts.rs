@@ -0,0 +1,174 @@
+use crate::distance::levenshtein::{ComputeCost, LevenshteinStep};
+use crate::distance::phoneme_tokenizer::PhonemeTokenizer;
+use crate::distance::utterance::Transcript;
+use crate::errors::PhlDistanceError;
+use crate::helpers::parallel::{available_workers, par_map_chunks};
+use crate::phl::symbols::SymbolId;
+use crate::phl::systems::PhonologicalFeatureSystem;
+
+/// Corpus-wide counts of which reference symbol was aligned with which hypothesis symbol.
+///
+/// The confusion matrix is dense and row-major, reference symbols by hypothesis symbols, indexed by symbol id with
+/// one extra row and column, `epsilon()`, for the empty side of an insertion or deletion. Counts from separate
+/// batches or threads add up with `merge`.
+#[derive(Clone, Debug, PartialEq)]
+pub struct ErrorCounts {
+    size: usize,
+    confusions: Vec<u64>,
+    unknown: u64,
+}
+
+impl ErrorCounts {
+    pub fn new(system: &PhonologicalFeatureSystem) -> Self {
+        let size = system.symbols().len() + 1;
+        Self { size, confusions: vec![0; size * size], unknown: 0 }
+    }
+
+    /// Counts every step of an alignment, including the ones where nothing changed.
+    pub fn add_steps(&mut self, steps: &[LevenshteinStep<SymbolId>]) {
+        for step in steps {
+            match (self.index(step.expected), self.index(step.actual)) {
+                (Some(expected), Some(actual)) => self.confusions[expected * self.size + actual] += 1,
+                _ => self.unknown += 1,
+            }
+        }
+    }
+
+    pub fn merge(&mut self, other: &ErrorCounts) {
+        assert_eq!(self.size, other.size, "can't merge counts from different systems");
+        for (count, other) in self.confusions.iter_mut().zip(other.confusions.iter()) {
+            *count += other;
+        }
+        self.unknown += other.unknown;
+    }
+
+    /// The row and column of the confusion matrix standing for no symbol.
+    pub fn epsilon(&self) -> usize {
+        self.size - 1
+    }
+
+    /// The number of rows and columns of the confusion matrix.
+    pub fn size(&self) -> usize {
+        self.size
+    }
+
+    pub fn confusions(&self) -> &[u64] {
+        &self.confusions
+    }
+
+    /// Steps that weren't counted because one of their symbols isn't in the system.
+    pub fn unknown(&self) -> u64 {
+        self.unknown
+    }
+
+    /// For each of the system's features, how many substitutions changed it: the features `deltas` would list,
+    /// summed over every counted pair of different symbols.
+    pub fn feature_flips(&self, system: &PhonologicalFeatureSystem) -> Vec<u64> {
+        let mut flips = vec![0; system.num_features];
+        for expected in 0..self.epsilon() {
+            for actual in 0..self.epsilon() {
+                let count = self.confusions[expected * self.size + actual];
+                if count == 0 || expected == actual {
+                    continue;
+                }
+                let (a, b) = match (system.entry(expected as SymbolId), system.entry(actual as SymbolId)) {
+                    (Some(a), Some(b)) => (a, b),
+                    _ => continue,
+                };
+                for (feature, (a_feat, b_feat)) in a.features.iter().zip(b.features.iter()).enumerate() {
+                    if a_feat != b_feat {
+                        flips[feature] += count;
+                    }
+                }
+            }
+        }
+        flips
+    }
+
+    fn index(&self, id: Option<SymbolId>) -> Option<usize> {
+        match id {
+            None => Some(self.epsilon()),
+            Some(id) if (id as usize) < self.epsilon() => Some(id as usize),
+            Some(_) => None,
+        }
+    }
+}
+
+/// Aligns every pair across all cores and counts the steps. Each worker keeps its own counts, which are merged at
+/// the end. The first pair that can't be aligned fails the batch.
+pub fn count_errors<S, C>(
+    tokenizer: &PhonemeTokenizer,
+    system: &PhonologicalFeatureSystem,
+    calculator: &C,
+    pairs: &[(S, S)],
+) -> Result<ErrorCounts, PhlDistanceError>
+    where S: Transcript + Sync,
+          C: ComputeCost<SymbolId> + Sync
+{
+    // The counts are too big to keep one per small chunk, so only hand out a few chunks per worker
+    let chunk_size = (pairs.len() / (4 * available_workers())).max(64);
+    let chunk_counts = par_map_chunks(pairs, chunk_size, |chunk| {
+        let mut counts = ErrorCounts::new(system);
+        for (left, right) in chunk {
+            let left_tokens = left.tokens(tokenizer);
+            let right_tokens = right.tokens(tokenizer);
+            counts.add_steps(&calculator.diff_steps(&left_tokens, &right_tokens)?);
+        }
+        Ok(counts)
+    });
+
+    let mut counts = ErrorCounts::new(system);
+    for chunk in chunk_counts {
+        counts.merge(&chunk?);
+    }
+    Ok(counts)
+}
+
+#[cfg(test)]
+mod tests {
+    use crate::distance::error_counts::{count_errors, ErrorCounts};
+    use crate::distance::feature_distance::FeatureCostCalculator;
+    use crate::distance::levenshtein::ComputeCost;
+    use crate::distance::phoneme_distance::PhonemeCostCalculator;
+    use crate::distance::phoneme_tokenizer::PhonemeTokenizer;
+    use crate::phl::symbols::SymbolId;
+    use crate::phl::systems::PhonologicalFeatureSystem;
+
+    #[test]
+    fn test_count_errors() {
+        let system = PhonologicalFeatureSystem::load("hayes").unwrap();
+        let tokenizer = PhonemeTokenizer::build(&system);
+        let calculator = FeatureCostCalculator::new(&system);
+        let mut pairs = vec![("kæt", "bæt"); 100];
+        pairs.extend([("kæt", "kæ"), ("æt", "kæt")]);
+        let counts = count_errors(&tokenizer, &system, &calculator, &pairs).unwrap();
+
+        let id = |s: &str| system.symbol_id(s).unwrap() as usize;
+        let confusion = |a: usize, b: usize| counts.confusions()[a * counts.size() + b];
+        assert_eq!(100, confusion(id("k"), id("b")));
+        assert_eq!(102, confusion(id("æ"), id("æ")));
+        assert_eq!(1, confusion(id("t"), counts.epsilon()));
+        assert_eq!(1, confusion(counts.epsilon(), id("k")));
+        assert_eq!(0, counts.unknown());
+
+        let flips = counts.feature_flips(&system);
+        let deltas = system.deltas(id("k") as SymbolId, id("b") as SymbolId).unwrap();
+        assert!(system.deltas(id("k") as SymbolId, id("<sil>") as SymbolId).is_none());
+        assert_eq!(deltas.len() * 100, flips.iter().sum::<u64>() as usize);
+        for delta in deltas {
+            let feature = system.feature_names().iter().position(|&name| name == delta.name).unwrap();
+            assert_eq!(100, flips[feature]);
+        }
+
+        let mut merged = ErrorCounts::new(&system);
+        merged.merge(&counts);
+        merged.merge(&counts);
+        assert_eq!(200, merged.confusions()[id("k") * merged.size() + id("b")]);
+
+        let phonemes = PhonemeCostCalculator::new(&system);
+        let mut unknown = ErrorCounts::new(&system);
+        unknown.add_steps(&phonemes.diff_steps(&tokenizer.tokenize("kæt"), &tokenizer.tokenize("kæ1")).unwrap());
+        assert_eq!(1, unknown.unknown());
+        assert!(count_errors(&tokenizer, &system, &calculator, &[("kæt", "kæ1")]).is_err());
+    }
+}
@@ -1,101 +1,74 @@
 use crate::distance::levenshtein::{ComputeCost, Cost};
 use crate::phl::systems::PhonologicalFeatureSystem;
-use crate::phl::parsing::{FeatureValue, Symbol};
+use crate::phl::parsing::FeatureValue;
+use crate::phl::symbols::SymbolId;
 use crate::errors::PhlDistanceError;
 use crate::errors::PhlDistanceError::PhonemeNotFoundError;
 
 #[derive()]
 pub struct FeatureCostCalculator<'a> {
-    pub(crate) system: &'a PhonologicalFeatureSystem
+    pub(crate) system: &'a PhonologicalFeatureSystem,
+    checked: bool,
 }
 
 impl<'a> FeatureCostCalculator<'a> {
     pub fn new(system: &'a PhonologicalFeatureSystem) -> Self {
-        FeatureCostCalculator{ system }
+        FeatureCostCalculator{ system, checked: true }
     }
 
-    pub(crate) fn is_zero_cost(&self, s: Option<&Symbol>) -> bool {
-        s.is_some() && self.system.is_zero_cost(s.unwrap())
+    /// Feature costs for tokens already known to be in the system, such as those of a valid `Utterance`, which are
+    /// looked up without checking. An unknown token gets a wrong cost or panics, rather than failing.
+    pub fn for_known(system: &'a PhonologicalFeatureSystem) -> Self {
+        FeatureCostCalculator{ system, checked: false }
     }
 
-    fn err_if_not_found(&self, symbols: Vec<&Symbol>) -> Result<(), PhlDistanceError> {
-        let not_found: Vec<_> = symbols
+    fn not_found(&self, ids: Vec<SymbolId>) -> PhlDistanceError {
+        let not_found: Vec<_> = ids
             .into_iter()
-            .filter(|s| self.system.get_for_symbol(*s).is_none())
+            .filter(|&id| !self.system.costs.contains(id))
+            .map(|id| self.system.symbols.resolve(id))
             .collect();
-
-        if not_found.len() == 0 { Ok(()) } else {
-            Err(PhonemeNotFoundError(format!("{not_found:?}")))
-        }
+        PhonemeNotFoundError(format!("{not_found:?}"))
     }
 }
 
-impl<'a> ComputeCost<Symbol> for FeatureCostCalculator<'a> {
+impl<'a> ComputeCost<SymbolId> for FeatureCostCalculator<'a> {
 
-    fn cost_sub(&self, expected: Option<&Symbol>, actual: Option<&Symbol>) -> Result<Cost, PhlDistanceError> {
-        if expected.is_none() || actual.is_none() {
-            return Ok(Cost::INFINITY);
-        }
-        if self.is_zero_cost(expected) && self.is_zero_cost(actual) {
-            Ok(Cost::ZERO)
+    fn cost_sub(&self, expected: Option<&SymbolId>, actual: Option<&SymbolId>) -> Result<Cost, PhlDistanceError> {
+        let (expected, actual) = match (expected, actual) {
+            (Some(&e), Some(&a)) => (e, a),
+            _ => return Ok(Cost::INFINITY),
+        };
+        let costs = &self.system.costs;
+        if !self.checked || (costs.contains(expected) && costs.contains(actual)) {
+            Ok(costs.sub(expected, actual))
         }
-        else if self.is_zero_cost(expected) || self.is_zero_cost(actual) {
+        else if costs.is_zero_cost(expected) || costs.is_zero_cost(actual) {
             Ok(Cost::INFINITY)
         }
         else {
-            let (expected, actual) = (expected.unwrap(), actual.unwrap());
-            self.err_if_not_found(vec![expected, actual])?;
-            let expected_features = &self.system.get_for_symbol(expected).unwrap().features;
-            let actual_features = &self.system.get_for_symbol(actual).unwrap().features;
-            let sum = expected_features
-                .iter()
-                .zip(actual_features.iter())
-                .map(|(a, b)| feature_cost(Some(&a.value), Some(&b.value)))
-                .sum::<Cost>();
-            Ok(sum)
+            Err(self.not_found(vec![expected, actual]))
         }
     }
 
-    fn cost_del(&self, a: Option<&Symbol>) -> Result<Cost, PhlDistanceError> {
-        if self.is_zero_cost(a) {
-            Ok(Cost::ZERO)
-        }
-        else if a.is_none() {
-            Ok(Cost::INFINITY)
-        }
-        else {
-            let a = a.unwrap();
-            self.err_if_not_found(vec![a])?;
-            let a_features = &self.system.get_for_symbol(a).unwrap().features;
-            let sum = a_features
-                .iter()
-                .map(|a| feature_cost(Some(&a.value), None))
-                .sum::<Cost>();
-            Ok(sum)
+    fn cost_del(&self, a: Option<&SymbolId>) -> Result<Cost, PhlDistanceError> {
+        match a {
+            None => Ok(Cost::INFINITY),
+            Some(&a) if !self.checked || self.system.costs.contains(a) => Ok(self.system.costs.del(a)),
+            Some(&a) => Err(self.not_found(vec![a])),
         }
     }
 
-    fn cost_ins(&self, b: Option<&Symbol>) -> Result<Cost, PhlDistanceError> {
-        if self.is_zero_cost(b) {
-            Ok(Cost::ZERO)
-        }
-        else if b.is_none() {
-            Ok(Cost::INFINITY)
-        }
-        else {
-            let b = b.unwrap();
-            self.err_if_not_found(vec![b])?;
-            let a_features = &self.system.get_for_symbol(b).unwrap().features;
-            let sum = a_features
-                .iter()
-                .map(|a| feature_cost(Some(&a.value), None).0)
-                .sum::<f64>();
-            Ok(Cost(sum))
+    fn cost_ins(&self, b: Option<&SymbolId>) -> Result<Cost, PhlDistanceError> {
+        match b {
+            None => Ok(Cost::INFINITY),
+            Some(&b) if !self.checked || self.system.costs.contains(b) => Ok(self.system.costs.ins(b)),
+            Some(&b) => Err(self.not_found(vec![b])),
         }
     }
 }
 
-fn feature_cost(left: Option<&FeatureValue>, right: Option<&FeatureValue>) -> Cost {
+pub(crate) fn feature_cost(left: Option<&FeatureValue>, right: Option<&FeatureValue>) -> Cost {
     let left_value = match left { None => 0.0, Some(v) => v.value };
     let right_value = match right { None => 0.0, Some(v) => v.value};
     if left.is_some() && right.is_some() {
@@ -203,7 +176,7 @@ mod tests {
             let left_tokens = tokenizer.tokenize(a);
             let right_tokens = tokenizer.tokenize(b);
 
-            let calculator = FeatureCostCalculator{ system };
+            let calculator = FeatureCostCalculator::new(system);
             let actual = calculator.diff_steps(&left_tokens, &right_tokens).unwrap();
 
 
@@ -231,6 +204,16 @@ mod tests {
         }
     }
 
+    #[test]
+    fn test_unknown_symbol() {
+        let system = PhonologicalFeatureSystem::load("hayes").unwrap();
+        let tokenizer = PhonemeTokenizer::build(&system);
+        let calculator = FeatureCostCalculator::new(&system);
+
+        let result = calculator.diff_steps(&tokenizer.tokenize("k1t"), &tokenizer.tokenize("kæt"));
+        assert!(result.is_err());
+    }
+
     fn load_analyzers(system_names: HashSet<&str>) -> HashMap<&str, PhonologicalFeatureSystem>{
         system_names
             .clone()
@@ -0,0 +1,203 @@
+use std::collections::BinaryHeap;
+use crate::distance::levenshtein::Cost;
+use crate::phl::symbols::SymbolId;
+use crate::phl::systems::PhonologicalFeatureSystem;
+
+/// Answers "which phonemes are closest to this one" over a system's inventory without scanning all of it, using a
+/// vantage-point tree over the feature vectors.
+///
+/// Distances are the substitution cost `FeatureCostCalculator::cost_sub` charges: half the absolute difference of
+/// each feature, times the feature's weight, summed and times the substitution weight. With weights of at least 0 that
+/// is a metric, which is what lets whole subtrees be skipped. Results are ranked by cost, then by symbol id. Queries
+/// are full feature vectors in `feature_names()` order, e.g. from `PhonologicalFeatureSystem::feature_vector`;
+/// features left undefined (NaN) don't compare meaningfully.
+pub struct FeatureIndex {
+    num_features: usize,
+    feature_weights: Vec<f64>,
+    substitution: f64,
+    ids: Vec<SymbolId>,
+    vectors: Vec<f64>,
+    nodes: Vec<VantagePoint>,
+}
+
+struct VantagePoint {
+    /// Row of the point in `ids` and `vectors`
+    row: usize,
+    /// Points no further than this from the vantage point are under `inside`, the rest under `outside`
+    radius: f64,
+    inside: Option<usize>,
+    outside: Option<usize>,
+}
+
+impl FeatureIndex {
+    /// An index ranking by the costs of `system`, weighted as it is.
+    pub fn build(system: &PhonologicalFeatureSystem) -> Self {
+        let ids = system.inventory();
+        let vectors = ids.iter().flat_map(|&id| system.feature_vector(id).unwrap()).collect();
+        // The weights were checked when the system was compiled
+        let feature_weights = system.weights().feature_vector(&system.feature_names()).unwrap();
+        let substitution = system.weights().substitution;
+        let num_features = system.num_features;
+        let mut index = Self { num_features, feature_weights, substitution, ids, vectors, nodes: vec![] };
+        let mut rows: Vec<usize> = (0..index.ids.len()).collect();
+        index.build_node(&mut rows);
+        index
+    }
+
+    pub fn len(&self) -> usize {
+        self.ids.len()
+    }
+
+    /// The `k` phonemes closest to `query`, closest first.
+    pub fn nearest(&self, query: &[f64], k: usize) -> Vec<(SymbolId, Cost)> {
+        if k == 0 {
+            return vec![];
+        }
+        let mut best = BinaryHeap::with_capacity(k + 1);
+        self.search_nearest(self.root(), query, k, &mut best);
+        best.into_sorted_vec().into_iter().map(|(cost, id)| (id, cost)).collect()
+    }
+
+    /// Every phoneme within `max_cost` of `query`, closest first.
+    pub fn within(&self, query: &[f64], max_cost: f64) -> Vec<(SymbolId, Cost)> {
+        let mut found = vec![];
+        self.search_within(self.root(), query, max_cost, &mut found);
+        found.sort();
+        found.into_iter().map(|(cost, id)| (id, cost)).collect()
+    }
+
+    fn root(&self) -> Option<usize> {
+        if self.nodes.is_empty() { None } else { Some(0) }
+    }
+
+    fn vector(&self, row: usize) -> &[f64] {
+        &self.vectors[row * self.num_features..(row + 1) * self.num_features]
+    }
+
+    fn distance(&self, query: &[f64], row: usize) -> f64 {
+        query
+            .iter()
+            .zip(self.vector(row))
+            .zip(&self.feature_weights)
+            .map(|((a, b), weight)| f64::abs(a - b) / 2.0 * weight)
+            .sum::<f64>() * self.substitution
+    }
+
+    /// Makes the first row the vantage point and splits the others at their median distance from it.
+    fn build_node(&mut self, rows: &mut [usize]) -> Option<usize> {
+        let (&mut row, rest) = rows.split_first_mut()?;
+        let idx = self.nodes.len();
+        self.nodes.push(VantagePoint { row, radius: 0.0, inside: None, outside: None });
+        if rest.is_empty() {
+            return Some(idx);
+        }
+
+        let vantage = self.vector(row).to_vec();
+        let mut by_distance: Vec<(Cost, usize)> = rest.iter().map(|&r| (Cost(self.distance(&vantage, r)), r)).collect();
+        let median = by_distance.len() / 2;
+        by_distance.select_nth_unstable(median);
+        let radius = by_distance[median].0.0;
+        for (slot, (_, r)) in rest.iter_mut().zip(by_distance) {
+            *slot = r;
+        }
+
+        let (inside, outside) = rest.split_at_mut(median + 1);
+        let inside = self.build_node(inside);
+        let outside = self.build_node(outside);
+        self.nodes[idx] = VantagePoint { row, radius, inside, outside };
+        Some(idx)
+    }
+
+    fn search_nearest(&self, node: Option<usize>, query: &[f64], k: usize, best: &mut BinaryHeap<(Cost, SymbolId)>) {
+        let node = match node { Some(idx) => &self.nodes[idx], None => return };
+        let candidate = (Cost(self.distance(query, node.row)), self.ids[node.row]);
+        if best.len() < k {
+            best.push(candidate);
+        }
+        else if candidate < *best.peek().unwrap() {
+            best.pop();
+            best.push(candidate);
+        }
+
+        // Everything inside is at least `d - radius` away from the query, everything outside `radius - d`, and a
+        // subtree is only worth visiting if that could still beat the k-th best so far
+        let d = candidate.0.0;
+        let worst = |best: &BinaryHeap<(Cost, SymbolId)>| {
+            if best.len() < k { f64::INFINITY } else { best.peek().unwrap().0.0 }
+        };
+        if d <= node.radius {
+            if d - node.radius <= worst(best) { self.search_nearest(node.inside, query, k, best) }
+            if node.radius - d <= worst(best) { self.search_nearest(node.outside, query, k, best) }
+        }
+        else {
+            if node.radius - d <= worst(best) { self.search_nearest(node.outside, query, k, best) }
+            if d - node.radius <= worst(best) { self.search_nearest(node.inside, query, k, best) }
+        }
+    }
+
+    fn search_within(&self, node: Option<usize>, query: &[f64], max_cost: f64, found: &mut Vec<(Cost, SymbolId)>) {
+        let node = match node { Some(idx) => &self.nodes[idx], None => return };
+        let d = self.distance(query, node.row);
+        if d <= max_cost {
+            found.push((Cost(d), self.ids[node.row]));
+        }
+        if d - node.radius <= max_cost {
+            self.search_within(node.inside, query, max_cost, found);
+        }
+        if node.radius - d <= max_cost {
+            self.search_within(node.outside, query, max_cost, found);
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use std::collections::HashMap;
+    use crate::distance::cost_table::CostWeights;
+    use crate::distance::feature_index::FeatureIndex;
+    use crate::distance::levenshtein::Cost;
+    use crate::phl::systems::PhonologicalFeatureSystem;
+
+    #[test]
+    fn test_feature_index() {
+        let unweighted = PhonologicalFeatureSystem::load("hayes").unwrap();
+        let weights = CostWeights {
+            features: HashMap::from([("voice".to_string(), 0.25)]),
+            substitution: 2.0,
+            ..Default::default()
+        };
+        let weighted = unweighted.weighted(&weights).unwrap();
+
+        for system in [&unweighted, &weighted] {
+            let index = FeatureIndex::build(system);
+            let inventory = system.inventory();
+            assert_eq!(inventory.len(), index.len());
+
+            for &query_id in inventory.iter().step_by(7) {
+                let query = system.feature_vector(query_id).unwrap();
+                let mut expected: Vec<_> = inventory
+                    .iter()
+                    .map(|&id| (system.costs.sub(query_id, id), id))
+                    .collect();
+                expected.sort();
+                let expected: Vec<_> = expected.into_iter().map(|(cost, id)| (id, cost)).collect();
+
+                let nearest = index.nearest(&query, 5);
+                assert_eq!(expected[..5], nearest[..]);
+                assert_eq!(Cost::ZERO, nearest[0].1);
+
+                let radius = 3.0;
+                let within: Vec<_> = expected.iter().cloned().filter(|(_, cost)| cost.0 <= radius).collect();
+                assert_eq!(within, index.within(&query, radius));
+            }
+            assert_eq!(inventory.len(), index.nearest(&system.feature_vector(inventory[0]).unwrap(), 1000).len());
+            assert!(index.nearest(&system.feature_vector(inventory[0]).unwrap(), 0).is_empty());
+        }
+
+        // With voicing down-weighted, d moves ahead of t̪ as the closest phoneme to t
+        let id = |s: &str| unweighted.symbol_id(s).unwrap();
+        let t = unweighted.feature_vector(id("t")).unwrap();
+        assert_eq!(vec![(id("t"), Cost(0.0)), (id("t̪"), Cost(1.0))], FeatureIndex::build(&unweighted).nearest(&t, 2));
+        assert_eq!(vec![(id("t"), Cost(0.0)), (id("d"), Cost(0.5))], FeatureIndex::build(&weighted).nearest(&t, 2));
+    }
+}
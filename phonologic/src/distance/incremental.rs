@@ -0,0 +1,95 @@
+use crate::distance::levenshtein::{fill_column, item, ComputeCost, Cost, LevenshteinStep, Levenshteinable, TableColumn};
+use crate::errors::PhlDistanceError;
+
+/// Aligns a hypothesis that arrives a symbol at a time, such as the output of a streaming recognizer, against a fixed
+/// reference.
+///
+/// Only the last column of the table is kept, so each new symbol costs O(reference length) time and the memory doesn't
+/// grow with the hypothesis beyond the symbols themselves. The full alignment is only traced when `diff_steps` is
+/// called. The same calculator has to be passed to every call.
+pub struct IncrementalAligner<T: Levenshteinable> {
+    reference: Vec<T>,
+    hypothesis: Vec<T>,
+    del_costs: Vec<Result<Cost, PhlDistanceError>>,
+    column: TableColumn,
+    next_column: TableColumn,
+}
+
+impl<T: Levenshteinable> IncrementalAligner<T> {
+    pub fn new<C: ComputeCost<T> + ?Sized>(calculator: &C, reference: Vec<T>) -> Self {
+        let del_costs: Vec<_> = (0..=reference.len()).map(|i| calculator.cost_del(item(&reference, i))).collect();
+        let rows = reference.len() + 1;
+        let mut column = TableColumn::new(rows);
+        fill_column(calculator, &reference, &del_costs, 0, None, &TableColumn::new(rows), &mut column);
+        Self { reference, hypothesis: vec![], del_costs, column, next_column: TableColumn::new(rows) }
+    }
+
+    /// Extends the hypothesis by one symbol, returning the cost of aligning everything so far.
+    pub fn push<C: ComputeCost<T> + ?Sized>(&mut self, calculator: &C, symbol: T) -> Result<Cost, PhlDistanceError> {
+        self.hypothesis.push(symbol);
+        let j = self.hypothesis.len();
+        let b_j = item(&self.hypothesis, j);
+        fill_column(calculator, &self.reference, &self.del_costs, j, b_j, &self.column, &mut self.next_column);
+        std::mem::swap(&mut self.column, &mut self.next_column);
+        self.cost()
+    }
+
+    /// The cost of aligning the reference with the hypothesis so far, the same as `distance_only` would find.
+    pub fn cost(&self) -> Result<Cost, PhlDistanceError> {
+        self.column.total()
+    }
+
+    pub fn reference(&self) -> &Vec<T> {
+        &self.reference
+    }
+
+    pub fn hypothesis(&self) -> &Vec<T> {
+        &self.hypothesis
+    }
+
+    /// The full alignment of the hypothesis so far. This rebuilds the whole table, so it's meant for when the
+    /// hypothesis is final or the steps are actually needed, not for every symbol.
+    pub fn diff_steps<C: ComputeCost<T> + ?Sized>(
+        &self,
+        calculator: &C,
+    ) -> Result<Vec<LevenshteinStep<T>>, PhlDistanceError> {
+        calculator.diff_steps(&self.reference, &self.hypothesis)
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use crate::distance::feature_distance::FeatureCostCalculator;
+    use crate::distance::incremental::IncrementalAligner;
+    use crate::distance::levenshtein::{ComputeCost, Cost};
+    use crate::distance::phoneme_tokenizer::PhonemeTokenizer;
+    use crate::phl::systems::PhonologicalFeatureSystem;
+
+    #[test]
+    fn test_incremental_aligner() {
+        let system = PhonologicalFeatureSystem::load("hayes").unwrap();
+        let tokenizer = PhonemeTokenizer::build(&system);
+        let calculator = FeatureCostCalculator::new(&system);
+
+        let reference = tokenizer.tokenize("kæts");
+        let mut aligner = IncrementalAligner::new(&calculator, reference.clone());
+        assert_eq!(calculator.distance_only(&reference, &vec![]).unwrap(), aligner.cost().unwrap());
+
+        let hypothesis = tokenizer.tokenize("kɑt1s");
+        for (j, &symbol) in hypothesis.iter().enumerate() {
+            let cost = aligner.push(&calculator, symbol);
+            let expected = calculator.distance_only(&reference, &hypothesis[..=j].to_vec());
+            assert_eq!(format!("{expected:?}"), format!("{cost:?}"));
+        }
+        assert!(aligner.diff_steps(&calculator).is_err());
+        assert_eq!(&hypothesis, aligner.hypothesis());
+
+        let mut aligner = IncrementalAligner::new(&calculator, reference.clone());
+        for &symbol in reference.iter() {
+            aligner.push(&calculator, symbol).unwrap();
+        }
+        assert_eq!(Cost::ZERO, aligner.cost().unwrap());
+        let steps = aligner.diff_steps(&calculator).unwrap();
+        assert_eq!(calculator.diff_steps(&reference, &reference).unwrap().len(), steps.len());
+    }
+}
@@ -1,4 +1,4 @@
-use std::ops::Add;
+use std::ops::{Add, Mul};
 use std::cmp::Ordering;
 use std::fmt::{Debug, Display, Formatter};
 use std::iter::Sum;
@@ -21,50 +21,566 @@ pub trait ComputeCost<T: Levenshteinable> {
     }
 
     fn diff_steps(&self, a: &Vec<T>, b: &Vec<T>) -> Result<Vec<LevenshteinStep<T>>, PhlDistanceError> {
-        let mut table = LevenshteinTable::new(a.len(), b.len());
+        fill_table(self, a, b)?.backtrace(self, a, b)
+    }
+
+    /// The same steps as `diff_steps`, without the full table: memory is O(m log n) instead of O(nm), for `a` of
+    /// length n and `b` of length m. Rows are filled again as the trace is narrowed down, so it takes about log n
+    /// times as long.
+    fn diff_steps_linear(&self, a: &Vec<T>, b: &Vec<T>) -> Result<Vec<LevenshteinStep<T>>, PhlDistanceError> {
+        linear_trace(self, a, b, TRACE_BLOCK_CELLS)
+    }
+
+    /// The total cost `diff_steps` would find, without building the trace. Only two rows (or columns, whichever
+    /// side is shorter) of the table are kept, so memory is O(min(n, m)).
+    fn distance_only(&self, a: &Vec<T>, b: &Vec<T>) -> Result<Cost, PhlDistanceError> {
+        #[cfg(feature = "tracing")]
+        let _span = tracing::trace_span!("distance_only", a = a.len(), b = b.len()).entered();
+        if b.len() <= a.len() {
+            distance_by_rows(self, a, b)
+        }
+        else {
+            distance_by_columns(self, a, b)
+        }
+    }
+
+    /// The total cost if it is at most `max_cost`, or `None` if the alignment exceeds it.
+    ///
+    /// Cells costing more than `max_cost` are pruned, so only the band of cells that can still lead to an accepted
+    /// alignment is filled, and the search stops at the first row with nothing left in the band. Pairs that exceed
+    /// the bound are rejected without checking whether every cost could be computed; if any cost failed along the
+    /// way, an accepted pair is rescored in full so that it fails the same way `distance_only` would.
+    fn distance_within(&self, a: &Vec<T>, b: &Vec<T>, max_cost: Cost) -> Result<Option<Cost>, PhlDistanceError> {
+        fill_band(self, a, b, max_cost).map(|(cost, _)| cost)
+    }
+
+    /// The alignment `diff_steps` would find, or `None` if its total cost exceeds `max_cost`. The bound is checked
+    /// first with `distance_within`, so only accepted pairs pay for a full trace.
+    fn diff_steps_within(
+        &self,
+        a: &Vec<T>,
+        b: &Vec<T>,
+        max_cost: Cost,
+    ) -> Result<Option<Vec<LevenshteinStep<T>>>, PhlDistanceError> {
+        match self.distance_within(a, b, max_cost)? {
+            Some(_) => self.diff_steps(a, b).map(Some),
+            None => Ok(None),
+        }
+    }
+}
+
+/// The cost `distance_within` finds, along with the number of cells filled to find it.
+pub(crate) fn fill_band<T: Levenshteinable, C: ComputeCost<T> + ?Sized>(
+    calculator: &C,
+    a: &Vec<T>,
+    b: &Vec<T>,
+    max_cost: Cost,
+) -> Result<(Option<Cost>, usize), PhlDistanceError> {
+    let ins_costs: Vec<_> = (0..=b.len()).map(|j| calculator.cost_ins(item(b, j))).collect();
+    let mut failed = ins_costs.iter().any(|c| c.is_err());
+    let mut prev_row = vec![Cost::INFINITY; b.len() + 1];
+    let mut row = vec![Cost::INFINITY; b.len() + 1];
+    // The range of columns in the previous row still within the bound
+    let (mut lo, mut hi) = (0, 0);
+    let mut cells = 0;
+
+    for i in 0..=a.len() {
+        let a_i = item(a, i);
+        let del_cost = calculator.cost_del(a_i);
+        failed |= del_cost.is_err();
+        let in_band = |j: usize| lo <= j && j <= hi;
+        let start = if i == 0 { 0 } else { lo };
+        let mut live: Option<(usize, usize)> = None;
+
+        for j in start..=b.len() {
+            cells += 1;
+            let cost = if i == 0 && j == 0 { Cost::ZERO } else {
+                let from_above = if i == 0 { Cost::ZERO } else if in_band(j) { prev_row[j] } else { Cost::INFINITY };
+                let from_left = if j == 0 { Cost::ZERO } else if j > start { row[j - 1] } else { Cost::INFINITY };
+                let from_diagonal = if i == 0 || j == 0 { Cost::ZERO }
+                    else if in_band(j - 1) { prev_row[j - 1] }
+                    else { Cost::INFINITY };
+                let prev = (from_above, from_left, from_diagonal);
+                let (cost, cell_failed) = bounded_cell(calculator, a_i, item(b, j), &del_cost, &ins_costs[j], prev);
+                failed |= cell_failed;
+                cost
+            };
+            if cost <= max_cost {
+                row[j] = cost;
+                live = Some((live.map_or(j, |(lo, _)| lo), j));
+            }
+            else {
+                row[j] = Cost::INFINITY;
+                // Past the previous row's band a cell can only be reached from its left, which is now pruned
+                if i == 0 || j > hi {
+                    break;
+                }
+            }
+        }
+
+        match live {
+            Some(range) => (lo, hi) = range,
+            None => return Ok((None, cells)),
+        }
+        std::mem::swap(&mut prev_row, &mut row);
+    }
+
+    if hi != b.len() {
+        return Ok((None, cells));
+    }
+    if failed {
+        let cost = calculator.distance_only(a, b)?;
+        return Ok((Some(cost), cells + (a.len() + 1) * (b.len() + 1)));
+    }
+    Ok((Some(prev_row[b.len()]), cells))
+}
+
+/// The full table of `diff_steps`, ready to trace back.
+pub(crate) fn fill_table<T: Levenshteinable, C: ComputeCost<T> + ?Sized>(
+    calculator: &C,
+    a: &Vec<T>,
+    b: &Vec<T>,
+) -> Result<LevenshteinTable, PhlDistanceError> {
+    #[cfg(feature = "tracing")]
+    let _span = tracing::trace_span!("fill_table", a = a.len(), b = b.len()).entered();
+    let mut table = LevenshteinTable::new(a.len(), b.len());
+    let ins_costs: Vec<_> = (0..=b.len()).map(|j| calculator.cost_ins(item(b, j))).collect();
+
+    for i in 0..=a.len() {
+        let a_i = item(a, i);
+        let del_cost = calculator.cost_del(a_i);
+        for j in 0..=b.len() {
+            if i == 0 && j == 0 { continue }
+            let b_j = item(b, j);
+            let prev = (
+                table.prev_cost(Action::DEL, i, j),
+                table.prev_cost(Action::INS, i, j),
+                table.prev_cost(Action::SUB, i, j),
+            );
+            let (action, cost) = best_action(calculator, a_i, b_j, &del_cost, &ins_costs[j], prev)?;
+            let total_cost = table.prev_cost(action, i, j) + cost;
+            table.insert(i, j, action, total_cost);
+        }
+    }
+    Ok(table)
+}
+
+/// Tables up to this many cells are traced directly by `linear_trace`, keeping one byte per cell.
+const TRACE_BLOCK_CELLS: usize = 1 << 16;
+
+/// Pairs with more cells than this are traced with `diff_steps_linear` by `SpaceBounded`, unless told otherwise.
+/// The full table takes 9 bytes per cell.
+pub const DEFAULT_MAX_TABLE_CELLS: usize = 1 << 24;
+
+/// The steps of `diff_steps`, found divide and conquer style.
+///
+/// The trace from the last cell reaches the middle row at the same column whether the rows below it start from the
+/// full table's costs or from that middle row's, and the costs up to that column only depend on the cells to its
+/// left. So the rows below the middle are traced first, from the middle row's costs, and the rows above it are then
+/// traced up to the column where that part of the trace came in. The costs are the ones `fill_table` would find,
+/// and rows are always filled in full, top to bottom, before anything narrower, so a failing cost fails the same way.
+fn linear_trace<T: Levenshteinable, C: ComputeCost<T> + ?Sized>(
+    calculator: &C,
+    a: &Vec<T>,
+    b: &Vec<T>,
+    block_cells: usize,
+) -> Result<Vec<LevenshteinStep<T>>, PhlDistanceError> {
+    #[cfg(feature = "tracing")]
+    let _span = tracing::trace_span!("linear_trace", a = a.len(), b = b.len()).entered();
+    let ins_costs: Vec<_> = (0..=b.len()).map(|j| calculator.cost_ins(item(b, j))).collect();
+    let mut top_row = vec![Cost::ZERO; b.len() + 1];
+    let mut top_actions = vec![0; b.len() + 1];
+    fill_trace_row(calculator, 0, None, b, &ins_costs, &[], &mut top_row, Some(&mut top_actions))?;
+
+    let mut steps = Vec::with_capacity(a.len() + b.len());
+    let trace = TraceRows { calculator, a, b, ins_costs: &ins_costs, block_cells };
+    if let Some(mut j) = trace.trace(0, a.len(), &top_row, &mut steps)? {
+        while j > 0 && Action::from_code(top_actions[j]) == Action::INS {
+            steps.push(make_step(calculator, Action::INS, None, item(b, j))?);
+            j -= 1;
+        }
+    }
+    steps.reverse();
+    Ok(steps)
+}
+
+struct TraceRows<'a, T, C: ?Sized> {
+    calculator: &'a C,
+    a: &'a Vec<T>,
+    b: &'a Vec<T>,
+    ins_costs: &'a [Result<Cost, PhlDistanceError>],
+    block_cells: usize,
+}
+
+impl<'a, T: Levenshteinable, C: ComputeCost<T> + ?Sized> TraceRows<'a, T, C> {
+    /// Traces back from the last cell of row `last` (the one under the last cell of `top_row`) as far as row `first`,
+    /// whose costs are `top_row`, pushing the steps taken. Returns the column the trace came into row `first` at, or
+    /// `None` if it stopped at an unreachable cell first, as `backtrace` does.
+    fn trace(
+        &self,
+        first: usize,
+        last: usize,
+        top_row: &[Cost],
+        steps: &mut Vec<LevenshteinStep<T>>,
+    ) -> Result<Option<usize>, PhlDistanceError> {
+        let width = top_row.len();
+        if last - first <= 1 || (last - first) * width <= self.block_cells {
+            return self.trace_block(first, last, top_row, steps);
+        }
+        let middle = first + (last - first) / 2;
+        let middle_row = self.fill_rows(first, middle, top_row)?;
+        match self.trace(middle, last, &middle_row, steps)? {
+            Some(column) => self.trace(first, middle, &top_row[..=column], steps),
+            None => Ok(None),
+        }
+    }
 
-        let begin_with_none = |items: &Vec<T>| {
-            [None].into_iter().chain(items.clone().into_iter().map(Some))
+    /// The costs of row `last`, from those of row `first`.
+    fn fill_rows(&self, first: usize, last: usize, top_row: &[Cost]) -> Result<Vec<Cost>, PhlDistanceError> {
+        let mut prev_row = top_row.to_vec();
+        let mut row = vec![Cost::ZERO; top_row.len()];
+        for i in first + 1..=last {
+            fill_trace_row(self.calculator, i, item(self.a, i), self.b, self.ins_costs, &prev_row, &mut row, None)?;
+            std::mem::swap(&mut prev_row, &mut row);
+        }
+        Ok(prev_row)
+    }
+
+    /// `trace`, keeping the actions of every row in between.
+    fn trace_block(
+        &self,
+        first: usize,
+        last: usize,
+        top_row: &[Cost],
+        steps: &mut Vec<LevenshteinStep<T>>,
+    ) -> Result<Option<usize>, PhlDistanceError> {
+        let width = top_row.len();
+        let mut actions = vec![0; (last - first) * width];
+        let mut prev_row = top_row.to_vec();
+        let mut row = vec![Cost::ZERO; width];
+        for (i, row_actions) in (first + 1..=last).zip(actions.chunks_mut(width)) {
+            let a_i = item(self.a, i);
+            fill_trace_row(self.calculator, i, a_i, self.b, self.ins_costs, &prev_row, &mut row, Some(row_actions))?;
+            std::mem::swap(&mut prev_row, &mut row);
+        }
+
+        let (mut i, mut j) = (last, width - 1);
+        while i > first {
+            let action = Action::from_code(actions[(i - first - 1) * width + j]);
+            if j == 0 && action != Action::DEL {
+                return Ok(None);
+            }
+            steps.push(make_step(self.calculator, action, item(self.a, i), item(self.b, j))?);
+            (i, j) = LevenshteinTable::prev_idx(action, (i, j));
+        }
+        Ok(Some(j))
+    }
+}
+
+/// Fills row `i` of the table from row `i - 1`, as far across as `row` goes, keeping the actions if asked to.
+#[inline]
+fn fill_trace_row<T: Levenshteinable, C: ComputeCost<T> + ?Sized>(
+    calculator: &C,
+    i: usize,
+    a_i: Option<&T>,
+    b: &Vec<T>,
+    ins_costs: &[Result<Cost, PhlDistanceError>],
+    prev_row: &[Cost],
+    row: &mut [Cost],
+    mut actions: Option<&mut [u8]>,
+) -> Result<(), PhlDistanceError> {
+    let del_cost = calculator.cost_del(a_i);
+    for j in 0..row.len() {
+        if i == 0 && j == 0 {
+            row[0] = Cost::ZERO;
+            continue
+        }
+        let from_above = if i == 0 { Cost::ZERO } else { prev_row[j] };
+        let from_left = if j == 0 { Cost::ZERO } else { row[j - 1] };
+        let from_diagonal = if i == 0 || j == 0 { Cost::ZERO } else { prev_row[j - 1] };
+        let prev = (from_above, from_left, from_diagonal);
+        let (action, cost) = best_action(calculator, a_i, item(b, j), &del_cost, &ins_costs[j], prev)?;
+        row[j] = cost + match action {
+            Action::DEL => from_above,
+            Action::INS => from_left,
+            Action::EQ | Action::SUB => from_diagonal,
+        };
+        if let Some(actions) = actions.as_deref_mut() {
+            actions[j] = action.code();
+        }
+    }
+    Ok(())
+}
+
+/// The item at a 1-based table position, where position 0 is the empty prefix.
+#[inline]
+pub(crate) fn item<T>(items: &Vec<T>, position: usize) -> Option<&T> {
+    if position == 0 { None } else { items.get(position - 1) }
+}
+
+/// Picks the cheapest way into a cell. Actions are tried in the order DEL, INS, EQ, SUB and the first one wins a tie;
+/// an action whose cost can't be computed counts as infinite, and is reported if the cell can't be reached otherwise.
+#[inline]
+fn best_action<T: Levenshteinable, C: ComputeCost<T> + ?Sized>(
+    calculator: &C,
+    a_i: Option<&T>,
+    b_j: Option<&T>,
+    del_cost: &Result<Cost, PhlDistanceError>,
+    ins_cost: &Result<Cost, PhlDistanceError>,
+    (from_above, from_left, from_diagonal): (Cost, Cost, Cost),
+) -> Result<(Action, Cost), PhlDistanceError> {
+    let eq_cost = calculator.cost_eq(a_i, b_j);
+    let sub_cost = calculator.cost_sub(a_i, b_j);
+    let candidates = [
+        (Action::DEL, del_cost, from_above),
+        (Action::INS, ins_cost, from_left),
+        (Action::EQ, &eq_cost, from_diagonal),
+        (Action::SUB, &sub_cost, from_diagonal),
+    ];
+
+    let mut best = 0;
+    let mut best_total = Cost::INFINITY;
+    for (idx, (_, result, prev)) in candidates.iter().enumerate() {
+        let total = match result {
+            Ok(cost) => *cost + *prev,
+            Err(_) => Cost::INFINITY,
         };
-        let expected: Vec<_> = begin_with_none(a).collect();
-        let actual: Vec<_>  = begin_with_none(b).collect();
-        for (i, a_i) in expected.clone().into_iter().enumerate() {
-            for (j, b_j) in actual.clone().into_iter().enumerate() {
-                let (i, j) = (i as i64, j as i64);
-                if i == 0 && j == 0 { continue }
-
-                let (action, cost) = [Action::DEL, Action::INS, Action::EQ, Action::SUB]
-                    .into_iter()
-                    .map(|action| match action {
-                        Action::DEL => (action, self.cost_del(a_i.as_ref())),
-                        Action::INS => (action, self.cost_ins(b_j.as_ref())),
-                        Action::SUB => (action, self.cost_sub(a_i.as_ref(), b_j.as_ref())),
-                        Action::EQ => (action, self.cost_eq(a_i.as_ref(), b_j.as_ref()))
-                    })
-                    .min_by_key(|(action, result)| match result {
-                        Ok(cost) => *cost + table.prev_cost(*action, (i, j)),
-                        Err(_) => Cost::INFINITY
-                    })
-                    .unwrap();
-
-                let cost = cost?;
-
-                let result = match action {
-                    Action::DEL => LevenshteinStep {action, cost, expected: a_i.clone(), actual: None},
-                    Action::INS => LevenshteinStep {action, cost, expected: None, actual: b_j.clone()},
-                    Action::SUB => LevenshteinStep {action, cost, expected: a_i.clone(), actual: b_j.clone()},
-                    Action::EQ => LevenshteinStep {action, cost, expected: a_i.clone(), actual: b_j.clone()},
-                };
-
-                let total_cost = table.prev_cost(action, (i, j)) + cost;
-                table.insert((i, j), (total_cost, result));
+        if idx == 0 || best_total.cmp(&total) == Ordering::Greater {
+            best = idx;
+            best_total = total;
+        }
+    }
+    // A cell nothing finite can reach is only there because a cost failed, so report that failure.
+    let failed = candidates.iter().find_map(|(_, result, _)| result.as_ref().err());
+    let (action, result, _) = candidates[best];
+    match (result, failed) {
+        (Err(e), _) => Err(e.clone()),
+        (Ok(_), Some(e)) if best_total == Cost::INFINITY => Err(e.clone()),
+        (Ok(cost), _) => Ok((action, *cost)),
+    }
+}
+
+/// Cumulative cost of one cell, given the cumulative costs of its neighbours above, to the left and diagonally.
+#[inline]
+fn rolling_cell<T: Levenshteinable, C: ComputeCost<T> + ?Sized>(
+    calculator: &C,
+    a_i: Option<&T>,
+    b_j: Option<&T>,
+    del_cost: &Result<Cost, PhlDistanceError>,
+    ins_cost: &Result<Cost, PhlDistanceError>,
+    prev: (Cost, Cost, Cost),
+) -> Result<Cost, PhlDistanceError> {
+    let (action, cost) = best_action(calculator, a_i, b_j, del_cost, ins_cost, prev)?;
+    let (from_above, from_left, from_diagonal) = prev;
+    Ok(cost + match action {
+        Action::DEL => from_above,
+        Action::INS => from_left,
+        Action::EQ | Action::SUB => from_diagonal,
+    })
+}
+
+/// The cheapest total into a cell, counting costs that fail as infinite. Also says whether any of them failed.
+#[inline]
+fn bounded_cell<T: Levenshteinable, C: ComputeCost<T> + ?Sized>(
+    calculator: &C,
+    a_i: Option<&T>,
+    b_j: Option<&T>,
+    del_cost: &Result<Cost, PhlDistanceError>,
+    ins_cost: &Result<Cost, PhlDistanceError>,
+    (from_above, from_left, from_diagonal): (Cost, Cost, Cost),
+) -> (Cost, bool) {
+    let eq_cost = calculator.cost_eq(a_i, b_j);
+    let sub_cost = calculator.cost_sub(a_i, b_j);
+    let candidates = [
+        (del_cost, from_above),
+        (ins_cost, from_left),
+        (&eq_cost, from_diagonal),
+        (&sub_cost, from_diagonal),
+    ];
+    let mut best = Cost::INFINITY;
+    let mut failed = false;
+    for (result, prev) in candidates {
+        match result {
+            Ok(cost) => best = best.min(*cost + prev),
+            Err(_) => failed = true,
+        }
+    }
+    (best, failed)
+}
+
+fn distance_by_rows<T: Levenshteinable, C: ComputeCost<T> + ?Sized>(
+    calculator: &C,
+    a: &Vec<T>,
+    b: &Vec<T>,
+) -> Result<Cost, PhlDistanceError> {
+    let ins_costs: Vec<_> = (0..=b.len()).map(|j| calculator.cost_ins(item(b, j))).collect();
+    let mut prev_row = vec![Cost::ZERO; b.len() + 1];
+    let mut row = vec![Cost::ZERO; b.len() + 1];
+
+    for i in 0..=a.len() {
+        fill_row(calculator, i, item(a, i), b, &ins_costs, &prev_row, &mut row)?;
+        std::mem::swap(&mut prev_row, &mut row);
+    }
+    Ok(prev_row[b.len()])
+}
+
+/// Fills row `i` of the table from row `i - 1`, stopping at the first cost that fails.
+#[inline]
+pub(crate) fn fill_row<T: Levenshteinable, C: ComputeCost<T> + ?Sized>(
+    calculator: &C,
+    i: usize,
+    a_i: Option<&T>,
+    b: &Vec<T>,
+    ins_costs: &[Result<Cost, PhlDistanceError>],
+    prev_row: &[Cost],
+    row: &mut [Cost],
+) -> Result<(), PhlDistanceError> {
+    let del_cost = calculator.cost_del(a_i);
+    for j in 0..=b.len() {
+        if i == 0 && j == 0 {
+            row[0] = Cost::ZERO;
+            continue
+        }
+        let from_above = if i == 0 { Cost::ZERO } else { prev_row[j] };
+        let from_left = if j == 0 { Cost::ZERO } else { row[j - 1] };
+        let from_diagonal = if i == 0 || j == 0 { Cost::ZERO } else { prev_row[j - 1] };
+        let prev = (from_above, from_left, from_diagonal);
+        row[j] = rolling_cell(calculator, a_i, item(b, j), &del_cost, &ins_costs[j], prev)?;
+    }
+    Ok(())
+}
+
+/// Same table as `distance_by_rows`, filled a column at a time.
+fn distance_by_columns<T: Levenshteinable, C: ComputeCost<T> + ?Sized>(
+    calculator: &C,
+    a: &Vec<T>,
+    b: &Vec<T>,
+) -> Result<Cost, PhlDistanceError> {
+    let del_costs: Vec<_> = (0..=a.len()).map(|i| calculator.cost_del(item(a, i))).collect();
+    let mut prev_column = TableColumn::new(a.len() + 1);
+    let mut column = TableColumn::new(a.len() + 1);
+
+    for j in 0..=b.len() {
+        fill_column(calculator, a, &del_costs, j, item(b, j), &prev_column, &mut column);
+        std::mem::swap(&mut prev_column, &mut column);
+    }
+    prev_column.total()
+}
+
+/// One column of the table, filled as far down as it could be.
+///
+/// To report the same error the row-major fill would, a failure at row `i` only stops the rows from `i` down; the
+/// rows above it still have to be checked, in this column and every one after it.
+pub(crate) struct TableColumn {
+    costs: Vec<Cost>,
+    rows: usize,
+    error: Option<PhlDistanceError>,
+}
+
+impl TableColumn {
+    pub(crate) fn new(rows: usize) -> Self {
+        Self { costs: vec![Cost::ZERO; rows], rows, error: None }
+    }
+
+    /// The cost in the bottom row, or the error that stopped the column short of it.
+    pub(crate) fn total(&self) -> Result<Cost, PhlDistanceError> {
+        match &self.error {
+            Some(e) => Err(e.clone()),
+            None => Ok(self.costs[self.costs.len() - 1]),
+        }
+    }
+}
+
+/// Fills column `j` of the table from column `j - 1`. For the first column, `prev_column` is only used for its size.
+#[inline]
+pub(crate) fn fill_column<T: Levenshteinable, C: ComputeCost<T> + ?Sized>(
+    calculator: &C,
+    a: &Vec<T>,
+    del_costs: &[Result<Cost, PhlDistanceError>],
+    j: usize,
+    b_j: Option<&T>,
+    prev_column: &TableColumn,
+    column: &mut TableColumn,
+) {
+    let ins_cost = calculator.cost_ins(b_j);
+    column.rows = prev_column.rows;
+    column.error = prev_column.error.clone();
+    for i in 0..prev_column.rows {
+        if i == 0 && j == 0 {
+            column.costs[0] = Cost::ZERO;
+            continue
+        }
+        let from_above = if i == 0 { Cost::ZERO } else { column.costs[i - 1] };
+        let from_left = if j == 0 { Cost::ZERO } else { prev_column.costs[i] };
+        let from_diagonal = if i == 0 || j == 0 { Cost::ZERO } else { prev_column.costs[i - 1] };
+        let prev = (from_above, from_left, from_diagonal);
+        match rolling_cell(calculator, item(a, i), b_j, &del_costs[i], &ins_cost, prev) {
+            Ok(cost) => column.costs[i] = cost,
+            Err(e) => {
+                column.rows = i;
+                column.error = Some(e);
+                break;
             }
         }
-        Ok(table.backtrace())
     }
 }
 
+/// A calculator that aligns pairs with more than `max_cells` cells in their table with `diff_steps_linear`, so
+/// long transcripts can still be traced.
+pub struct SpaceBounded<C> {
+    calculator: C,
+    max_cells: usize,
+}
+
+impl<C> SpaceBounded<C> {
+    pub fn new(calculator: C, max_cells: usize) -> Self {
+        Self { calculator, max_cells }
+    }
+}
+
+impl<T: Levenshteinable, C: ComputeCost<T>> ComputeCost<T> for SpaceBounded<C> {
+    fn cost_sub(&self, a: Option<&T>, b: Option<&T>) -> Result<Cost, PhlDistanceError> {
+        self.calculator.cost_sub(a, b)
+    }
+
+    fn cost_del(&self, a: Option<&T>) -> Result<Cost, PhlDistanceError> {
+        self.calculator.cost_del(a)
+    }
+
+    fn cost_ins(&self, b: Option<&T>) -> Result<Cost, PhlDistanceError> {
+        self.calculator.cost_ins(b)
+    }
+
+    fn cost_eq(&self, a: Option<&T>, b: Option<&T>) -> Result<Cost, PhlDistanceError> {
+        self.calculator.cost_eq(a, b)
+    }
+
+    fn diff_steps(&self, a: &Vec<T>, b: &Vec<T>) -> Result<Vec<LevenshteinStep<T>>, PhlDistanceError> {
+        if (a.len() + 1).saturating_mul(b.len() + 1) > self.max_cells {
+            self.calculator.diff_steps_linear(a, b)
+        }
+        else {
+            self.calculator.diff_steps(a, b)
+        }
+    }
+
+    fn diff_steps_linear(&self, a: &Vec<T>, b: &Vec<T>) -> Result<Vec<LevenshteinStep<T>>, PhlDistanceError> {
+        self.calculator.diff_steps_linear(a, b)
+    }
+
+    fn distance_only(&self, a: &Vec<T>, b: &Vec<T>) -> Result<Cost, PhlDistanceError> {
+        self.calculator.distance_only(a, b)
+    }
+
+    fn distance_within(&self, a: &Vec<T>, b: &Vec<T>, max_cost: Cost) -> Result<Option<Cost>, PhlDistanceError> {
+        self.calculator.distance_within(a, b, max_cost)
+    }
+}
+
+/// Unit costs, for testing the aligner on its own
+#[cfg(test)]
 pub(crate) struct DefaultCalculator;
+#[cfg(test)]
 impl<T: Levenshteinable> ComputeCost<T> for DefaultCalculator {
     fn cost_sub(&self, a: Option<&T>, b: Option<&T>) -> Result<Cost, PhlDistanceError> {
         Ok(
@@ -91,6 +607,21 @@ pub enum Action {
     SUB,
 }
 
+impl Action {
+    const ALL: [Action; 4] = [Action::EQ, Action::DEL, Action::INS, Action::SUB];
+
+    /// A compact code for the action: 0 = EQ, 1 = DEL, 2 = INS, 3 = SUB.
+    #[inline]
+    pub fn code(self) -> u8 {
+        self as u8
+    }
+
+    #[inline]
+    fn from_code(code: u8) -> Action {
+        Self::ALL[code as usize]
+    }
+}
+
 impl Display for Action {
     fn fmt(&self, f: &mut Formatter<'_>) -> std::fmt::Result {
         // let cls = self.class_name();
@@ -118,6 +649,13 @@ impl Add for Cost {
     }
 }
 
+impl Mul<f64> for Cost {
+    type Output = Cost;
+    fn mul(self, weight: f64) -> Self {
+        Self(self.0 * weight)
+    }
+}
+
 impl Sum for Cost {
     fn sum<I: Iterator<Item=Self>>(iter: I) -> Self {
         Cost(iter.map(|c| c.0).sum())
@@ -165,27 +703,22 @@ impl<T: Levenshteinable> PartialEq for LevenshteinStep<T> {
     }
 }
 
-struct LevenshteinTable<T: Levenshteinable> {
-    cost_table: Vec<Vec<Option<Cost>>>,
-    step_table: Vec<Vec<Option<LevenshteinStep<T>>>>
+/// Cumulative costs in one flat buffer plus a byte-sized backpointer per cell. Steps are only rebuilt along the
+/// winning path, once the table is complete.
+pub(crate) struct LevenshteinTable {
+    width: usize,
+    costs: Vec<Cost>,
+    actions: Vec<u8>,
 }
 
-impl<T: Levenshteinable> LevenshteinTable<T> {
+impl LevenshteinTable {
     fn new(a_size: usize, b_size: usize) -> Self {
-        let cost_table = vec![vec![None; b_size + 1]; a_size + 1];
-        let step_table = vec![vec![None; b_size + 1]; a_size + 1];
-        Self { cost_table, step_table }
+        let width = b_size + 1;
+        let cells = (a_size + 1) * width;
+        Self { width, costs: vec![Cost::ZERO; cells], actions: vec![0; cells] }
     }
 
-    fn get_cost(&self, (i, j): (i64, i64)) -> Option<Cost> {
-        self.cost_table.get(i as usize)?.get(j as usize)?.clone()
-    }
-
-    fn get_step(&self, (i, j): (i64, i64)) -> Option<LevenshteinStep<T>> {
-        self.step_table.get(i as usize)?.get(j as usize)?.clone()
-    }
-
-    fn prev_idx(&self, action: Action, (i, j): (i64, i64)) -> (i64, i64){
+    fn prev_idx(action: Action, (i, j): (usize, usize)) -> (usize, usize) {
         match action {
             Action::EQ => (i - 1, j - 1),
             Action::SUB => (i - 1, j - 1),
@@ -194,75 +727,158 @@ impl<T: Levenshteinable> LevenshteinTable<T> {
         }
     }
 
-    fn prev_cost(&self, action: Action, (i, j): (i64, i64)) -> Cost {
-        self.get_cost(self.prev_idx(action, (i, j))).unwrap_or(Cost::ZERO)
+    /// The cumulative cost the action would build on. Stepping off the edge of the table costs nothing.
+    #[inline]
+    fn prev_cost(&self, action: Action, i: usize, j: usize) -> Cost {
+        let off_table = match action {
+            Action::EQ | Action::SUB => i == 0 || j == 0,
+            Action::DEL => i == 0,
+            Action::INS => j == 0,
+        };
+        if off_table {
+            return Cost::ZERO;
+        }
+        let (i, j) = Self::prev_idx(action, (i, j));
+        self.costs[i * self.width + j]
+    }
+
+    #[inline]
+    fn insert(&mut self, i: usize, j: usize, action: Action, cost: Cost) {
+        let idx = i * self.width + j;
+        self.costs[idx] = cost;
+        self.actions[idx] = action.code();
+    }
+
+    pub(crate) fn backtrace<T: Levenshteinable, C: ComputeCost<T> + ?Sized>(
+        &self,
+        calculator: &C,
+        a: &Vec<T>,
+        b: &Vec<T>,
+    ) -> Result<Vec<LevenshteinStep<T>>, PhlDistanceError> {
+        #[cfg(feature = "tracing")]
+        let _span = tracing::trace_span!("backtrace", a = a.len(), b = b.len()).entered();
+        let (mut i, mut j) = (a.len(), b.len());
+        let mut steps = Vec::with_capacity(i + j);
+        while i > 0 || j > 0 {
+            let action = Action::from_code(self.actions[i * self.width + j]);
+            if (i == 0 && action != Action::INS) || (j == 0 && action != Action::DEL) {
+                // Only an unreachable (infinite) cell points off the table
+                break;
+            }
+            let (a_i, b_j) = (item(a, i), item(b, j));
+            steps.push(make_step(calculator, action, a_i, b_j)?);
+            (i, j) = Self::prev_idx(action, (i, j));
+        }
+        steps.reverse();
+        Ok(steps)
     }
+}
 
-    fn insert(&mut self, (i, j): (i64, i64), (cost, step): (Cost, LevenshteinStep<T>)) where T: Levenshteinable {
-        self.cost_table[i as usize][j as usize] = Some(cost);
-        self.step_table[i as usize][j as usize] = Some(step);
+/// Rebuilds the step taken into a cell, recomputing its cost from the calculator.
+fn make_step<T: Levenshteinable, C: ComputeCost<T> + ?Sized>(
+    calculator: &C,
+    action: Action,
+    a_i: Option<&T>,
+    b_j: Option<&T>,
+) -> Result<LevenshteinStep<T>, PhlDistanceError> {
+    Ok(match action {
+        Action::DEL => LevenshteinStep { action, cost: calculator.cost_del(a_i)?, expected: a_i.cloned(), actual: None },
+        Action::INS => LevenshteinStep { action, cost: calculator.cost_ins(b_j)?, expected: None, actual: b_j.cloned() },
+        Action::SUB => LevenshteinStep { action, cost: calculator.cost_sub(a_i, b_j)?, expected: a_i.cloned(), actual: b_j.cloned() },
+        Action::EQ => LevenshteinStep { action, cost: calculator.cost_eq(a_i, b_j)?, expected: a_i.cloned(), actual: b_j.cloned() },
+    })
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use string_join::Join;
+
+    #[test]
+    fn test_backtrace() {
+        let test_cases: Vec<(&str, &str, f64, Vec<&str>)> = vec![
+            ("", "", 0.0, vec![]),
+            ("A", "A", 0.0, vec!["EQ"]),
+            ("AA", "AA", 0.0, vec!["EQ", "EQ"]),
+            ("A", "B", 1.0, vec!["SUB"]),
+            ("AA", "BB", 2.0, vec!["SUB", "SUB"]),
+            ("AB", "A", 1.0, vec!["EQ", "DEL"]),
+            ("A", "AB", 1.0, vec!["EQ", "INS"]),
+            ("ABC", "BB", 2.0, vec!["SUB", "EQ", "DEL"]),
+            ("BB", "ABC", 2.0, vec!["SUB", "EQ", "INS"]),
+            ("AAA", "AA", 1.0, vec!["EQ", "EQ", "DEL"]),
+            ("AA", "AAA", 1.0, vec!["EQ", "EQ", "INS"]),
+        ];
+
+        for (a, b, expect_cost, actions) in test_cases {
+            let a: Vec<char> = a.chars().collect();
+            let b: Vec<char> = b.chars().collect();
+            let steps = DefaultCalculator.diff_steps(&a, &b).unwrap();
+            let actual_actions = " ".join(steps.iter().map(|x| format!("{:?}", x.action)));
+            let expect_actions = " ".join(actions);
+            let actual_cost: f64 = steps.iter().map(|s| s.cost.0).sum();
+            assert_eq!(expect_actions, actual_actions);
+            assert_eq!(expect_cost, actual_cost);
+            assert_eq!(Cost(expect_cost), DefaultCalculator.distance_only(&a, &b).unwrap());
+        }
     }
 
-    // fn get_best_cost(&self) {
-    //     let (action, cost) = [Action::DEL, Action::INS, Action::EQ, Action::SUB]
-    //         .into_iter()
-    //         .map(|action| match action {
-    //             Action::DEL => (action, self.cost_del(a_i_ref)),
-    //             Action::INS => (action, self.cost_ins(b_j_ref)),
-    //             Action::SUB => (action, self.cost_sub(a_i_ref, b_j_ref)),
-    //             Action::EQ => (action, self.cost_eq(a_i_ref, b_j_ref))
-    //         })
-    //         .min_by_key(|(action, step_cost)| Ok(*step_cost? + table.prev_cost(*action, (i, j))))
-    //         .unwrap();
-    // }
+    #[test]
+    fn test_distance_only() {
+        let words = ["", "A", "kitten", "sitting", "saturday", "sunday", "ABCABCABC", "CBA"];
+        for a in words {
+            for b in words {
+                let a: Vec<char> = a.chars().collect();
+                let b: Vec<char> = b.chars().collect();
+                let steps = DefaultCalculator.diff_steps(&a, &b).unwrap();
+                let expected: Cost = steps.iter().map(|s| s.cost).sum();
+                assert_eq!(expected, DefaultCalculator.distance_only(&a, &b).unwrap());
+            }
+        }
+    }
 
-    fn backtrace(&self) -> Vec<LevenshteinStep<T>> {
-        let (mut i, mut j) = self.size();
-        if (i, j) == (0, 0) {
-            return vec![];
+    #[test]
+    fn test_distance_within() {
+        let words = ["", "A", "kitten", "sitting", "saturday", "sunday", "ABCABCABC", "CBA"];
+        for a in words {
+            for b in words {
+                let a: Vec<char> = a.chars().collect();
+                let b: Vec<char> = b.chars().collect();
+                let expected = DefaultCalculator.distance_only(&a, &b).unwrap();
+                for max_cost in 0..10 {
+                    let max_cost = Cost(max_cost as f64);
+                    let actual = DefaultCalculator.distance_within(&a, &b, max_cost).unwrap();
+                    if expected <= max_cost {
+                        assert_eq!(Some(expected), actual);
+                        assert!(DefaultCalculator.diff_steps_within(&a, &b, max_cost).unwrap().is_some());
+                    }
+                    else {
+                        assert_eq!(None, actual);
+                        assert!(DefaultCalculator.diff_steps_within(&a, &b, max_cost).unwrap().is_none());
+                    }
+                }
+            }
         }
-        let mut steps = vec![];
-        while i > 0 || j > 0 {
-            let current = self.get_step((i, j)).unwrap();
-            steps.insert(0, current.clone());
-            (i, j) = self.prev_idx(current.action, (i, j));
+    }
+
+    #[test]
+    fn test_diff_steps_linear() {
+        let words = ["", "A", "kitten", "sitting", "saturday", "sunday", "ABCABCABC", "CBA", "ABABABABABABABABABAB"];
+        let actions = |steps: Vec<LevenshteinStep<char>>| -> Vec<_> {
+            steps.into_iter().map(|s| (s.action, s.expected, s.actual, s.cost)).collect()
+        };
+        for a in words {
+            for b in words {
+                let a: Vec<char> = a.chars().collect();
+                let b: Vec<char> = b.chars().collect();
+                let expected = actions(DefaultCalculator.diff_steps(&a, &b).unwrap());
+                assert_eq!(expected, actions(DefaultCalculator.diff_steps_linear(&a, &b).unwrap()));
+                for block_cells in [0, 3, 20] {
+                    assert_eq!(expected, actions(linear_trace(&DefaultCalculator, &a, &b, block_cells).unwrap()));
+                }
+                let bounded = SpaceBounded::new(DefaultCalculator, 10);
+                assert_eq!(expected, actions(bounded.diff_steps(&a, &b).unwrap()));
+            }
         }
-        return steps;
-    }
-
-    fn size(&self) -> (i64, i64) {
-        (self.step_table.len() as i64 - 1, self.step_table[0].len() as i64 - 1)
-    }
-}
-
-// #[cfg(test)]
-// mod tests {
-//     use super::*;
-//     use string_join::Join;
-//     #[test]
-//     fn test_backtrace() {
-//         let test_cases: Vec<(&str, &str, f64, Vec<&str>)> = vec![
-//             ("", "", 0.0, vec![]),
-//             ("A", "A", 0.0, vec!["EQ"]),
-//             ("AA", "AA", 0.0, vec!["EQ", "EQ"]),
-//             ("A", "B", 1.0, vec!["SUB"]),
-//             ("AA", "BB", 2.0, vec!["SUB", "SUB"]),
-//             ("AB", "A", 1.0, vec!["EQ", "DEL"]),
-//             ("A", "AB", 1.0, vec!["EQ", "INS"]),
-//             ("ABC", "BB", 2.0, vec!["SUB", "EQ", "DEL"]),
-//             ("BB", "ABC", 2.0, vec!["SUB", "EQ", "INS"]),
-//             ("AAA", "AA", 1.0, vec!["EQ", "EQ", "DEL"]),
-//             ("AA", "AAA", 1.0, vec!["EQ", "EQ", "INS"]),
-//         ];
-//
-//         for (a, b, expect_cost, actions) in test_cases {
-//             // let steps = levenshtein_str(a, b);
-//             let steps = edit_distance(a.chars().collect(), b.chars().collect()).unwrap();
-//             let actual_actions = " ".join(steps.iter().map(|x| format!("{:?}", x.action)));
-//             let expect_actions = " ".join(actions);
-//             let actual_cost = steps.iter().map(|s| s.cost.0).sum();
-//             assert_eq!(expect_actions, actual_actions);
-//             assert_eq!(expect_cost, actual_cost);
-//         }
-//     }
-// }
\ No newline at end of file
+    }
+}
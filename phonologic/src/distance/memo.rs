@@ -0,0 +1,312 @@
+use std::collections::hash_map::DefaultHasher;
+use std::collections::{BTreeMap, HashMap};
+use std::hash::{Hash, Hasher};
+use std::sync::{Arc, Mutex};
+use crate::distance::levenshtein::{ComputeCost, Cost, LevenshteinStep};
+use crate::errors::PhlDistanceError;
+use crate::phl::symbols::SymbolId;
+
+/// Locks are per shard, so workers looking up different pairs rarely wait on each other
+const SHARDS: usize = 16;
+
+#[derive(Clone, Debug, PartialEq, Eq, Hash)]
+struct MemoKey {
+    metric: &'static str,
+    left: Vec<SymbolId>,
+    right: Vec<SymbolId>,
+}
+
+#[derive(Clone, Debug)]
+enum Memo {
+    Cost(Cost),
+    Steps(Arc<Vec<LevenshteinStep<SymbolId>>>),
+}
+
+/// Hit, miss and eviction counts of a `MemoCache`
+#[derive(Clone, Copy, Debug, Default, PartialEq, Eq)]
+pub struct MemoStats {
+    pub hits: u64,
+    pub misses: u64,
+    pub evictions: u64,
+    pub len: usize,
+    pub capacity: usize,
+}
+
+/// Alignments of tokenized pairs, remembered so a pair seen before skips the dynamic programming. Entries are keyed by
+/// the name of the costs and both sides' tokens, hold either the steps or just the cost, and are dropped least
+/// recently used first once the cache is full. One cache belongs with one system, since the key doesn't include it.
+///
+/// The cache can be shared between threads; each of its shards is an LRU list behind its own lock.
+pub struct MemoCache {
+    shards: Vec<Mutex<Shard>>,
+    capacity: usize,
+}
+
+#[derive(Default)]
+struct Shard {
+    entries: HashMap<MemoKey, (Memo, u64)>,
+    /// Keys by when they were last used, oldest first
+    recency: BTreeMap<u64, MemoKey>,
+    clock: u64,
+    capacity: usize,
+    hits: u64,
+    misses: u64,
+    evictions: u64,
+}
+
+impl MemoCache {
+    /// A cache holding up to `capacity` pairs. Small caches get fewer shards, so none is left without room.
+    pub fn new(capacity: usize) -> Self {
+        let count = capacity.clamp(1, SHARDS);
+        let shards = (0..count)
+            .map(|i| capacity / count + usize::from(i < capacity % count))
+            .map(|shard_capacity| Mutex::new(Shard { capacity: shard_capacity, ..Default::default() }))
+            .collect();
+        Self { shards, capacity }
+    }
+
+    pub fn stats(&self) -> MemoStats {
+        let mut stats = MemoStats { capacity: self.capacity, ..Default::default() };
+        for shard in &self.shards {
+            let shard = shard.lock().unwrap_or_else(|e| e.into_inner());
+            stats.hits += shard.hits;
+            stats.misses += shard.misses;
+            stats.evictions += shard.evictions;
+            stats.len += shard.entries.len();
+        }
+        stats
+    }
+
+    /// Forgets every pair and resets the counts.
+    pub fn clear(&self) {
+        for shard in &self.shards {
+            let mut shard = shard.lock().unwrap_or_else(|e| e.into_inner());
+            *shard = Shard { capacity: shard.capacity, ..Default::default() };
+        }
+    }
+
+    /// `calculator`, answering from this cache where it can. Pairs are remembered under `metric`, which should name
+    /// the costs `calculator` aligns with.
+    pub fn memoizing<'a, C>(&'a self, metric: &'static str, calculator: &'a C) -> Memoized<'a, C> {
+        Memoized::new(Some(self), metric, calculator)
+    }
+
+    fn shard(&self, key: &MemoKey) -> &Mutex<Shard> {
+        let mut hasher = DefaultHasher::new();
+        key.hash(&mut hasher);
+        &self.shards[hasher.finish() as usize % self.shards.len()]
+    }
+
+    /// The entry for `key`, if there is one that can answer; only steps can if `steps` are needed.
+    fn get(&self, key: &MemoKey, steps: bool) -> Option<Memo> {
+        self.shard(key).lock().unwrap_or_else(|e| e.into_inner()).get(key, steps)
+    }
+
+    fn insert(&self, key: MemoKey, memo: Memo) {
+        self.shard(&key).lock().unwrap_or_else(|e| e.into_inner()).insert(key, memo)
+    }
+}
+
+impl Shard {
+    fn get(&mut self, key: &MemoKey, steps: bool) -> Option<Memo> {
+        self.clock += 1;
+        match self.entries.get_mut(key) {
+            Some((Memo::Cost(_), _)) if steps => {
+                self.misses += 1;
+                None
+            }
+            Some((memo, last_used)) => {
+                let key = self.recency.remove(last_used).unwrap();
+                *last_used = self.clock;
+                self.recency.insert(self.clock, key);
+                self.hits += 1;
+                Some(memo.clone())
+            }
+            None => {
+                self.misses += 1;
+                None
+            }
+        }
+    }
+
+    fn insert(&mut self, key: MemoKey, memo: Memo) {
+        if self.capacity == 0 {
+            return;
+        }
+        self.clock += 1;
+        if let Some((_, last_used)) = self.entries.insert(key.clone(), (memo, self.clock)) {
+            self.recency.remove(&last_used);
+        }
+        self.recency.insert(self.clock, key);
+        while self.entries.len() > self.capacity {
+            let (_, oldest) = self.recency.pop_first().unwrap();
+            self.entries.remove(&oldest);
+            self.evictions += 1;
+        }
+    }
+}
+
+/// A calculator whose `diff_steps` and `distance_only` answer from a `MemoCache` when they can, and otherwise align
+/// with the wrapped calculator and remember the result. A cost can be answered from remembered steps; steps asked for
+/// after only the cost was remembered are aligned again, and replace it. Failed alignments aren't remembered.
+pub struct Memoized<'a, C> {
+    calculator: &'a C,
+    cache: Option<&'a MemoCache>,
+    metric: &'static str,
+}
+
+impl<'a, C> Memoized<'a, C> {
+    /// `calculator`, memoized under `metric` if there is a `cache`.
+    pub fn new(cache: Option<&'a MemoCache>, metric: &'static str, calculator: &'a C) -> Self {
+        Self { calculator, cache, metric }
+    }
+
+    fn key(&self, left: &Vec<SymbolId>, right: &Vec<SymbolId>) -> MemoKey {
+        MemoKey { metric: self.metric, left: left.clone(), right: right.clone() }
+    }
+
+    /// The remembered steps of a pair, or the ones `align` finds, which are remembered for next time.
+    fn steps(
+        &self,
+        a: &Vec<SymbolId>,
+        b: &Vec<SymbolId>,
+        align: impl FnOnce() -> Result<Vec<LevenshteinStep<SymbolId>>, PhlDistanceError>,
+    ) -> Result<Vec<LevenshteinStep<SymbolId>>, PhlDistanceError> {
+        let cache = match self.cache {
+            Some(cache) => cache,
+            None => return align(),
+        };
+        let key = self.key(a, b);
+        if let Some(Memo::Steps(steps)) = cache.get(&key, true) {
+            return Ok(steps.to_vec());
+        }
+        let steps = align()?;
+        cache.insert(key, Memo::Steps(Arc::new(steps.clone())));
+        Ok(steps)
+    }
+}
+
+impl<'a, C: ComputeCost<SymbolId>> ComputeCost<SymbolId> for Memoized<'a, C> {
+    fn cost_sub(&self, a: Option<&SymbolId>, b: Option<&SymbolId>) -> Result<Cost, PhlDistanceError> {
+        self.calculator.cost_sub(a, b)
+    }
+
+    fn cost_del(&self, a: Option<&SymbolId>) -> Result<Cost, PhlDistanceError> {
+        self.calculator.cost_del(a)
+    }
+
+    fn cost_ins(&self, b: Option<&SymbolId>) -> Result<Cost, PhlDistanceError> {
+        self.calculator.cost_ins(b)
+    }
+
+    fn cost_eq(&self, a: Option<&SymbolId>, b: Option<&SymbolId>) -> Result<Cost, PhlDistanceError> {
+        self.calculator.cost_eq(a, b)
+    }
+
+    fn diff_steps(
+        &self,
+        a: &Vec<SymbolId>,
+        b: &Vec<SymbolId>,
+    ) -> Result<Vec<LevenshteinStep<SymbolId>>, PhlDistanceError> {
+        self.steps(a, b, || self.calculator.diff_steps(a, b))
+    }
+
+    fn diff_steps_linear(
+        &self,
+        a: &Vec<SymbolId>,
+        b: &Vec<SymbolId>,
+    ) -> Result<Vec<LevenshteinStep<SymbolId>>, PhlDistanceError> {
+        self.steps(a, b, || self.calculator.diff_steps_linear(a, b))
+    }
+
+    /// Not remembered, since the answer depends on the bound, but aligned by the wrapped calculator's own
+    /// `distance_within`.
+    fn distance_within(
+        &self,
+        a: &Vec<SymbolId>,
+        b: &Vec<SymbolId>,
+        max_cost: Cost,
+    ) -> Result<Option<Cost>, PhlDistanceError> {
+        self.calculator.distance_within(a, b, max_cost)
+    }
+
+    fn distance_only(&self, a: &Vec<SymbolId>, b: &Vec<SymbolId>) -> Result<Cost, PhlDistanceError> {
+        let cache = match self.cache {
+            Some(cache) => cache,
+            None => return self.calculator.distance_only(a, b),
+        };
+        let key = self.key(a, b);
+        match cache.get(&key, false) {
+            Some(Memo::Cost(cost)) => Ok(cost),
+            Some(Memo::Steps(steps)) => Ok(steps.iter().map(|step| step.cost).sum()),
+            None => {
+                let cost = self.calculator.distance_only(a, b)?;
+                cache.insert(key, Memo::Cost(cost));
+                Ok(cost)
+            }
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use crate::distance::feature_distance::FeatureCostCalculator;
+    use crate::distance::levenshtein::{ComputeCost, LevenshteinStep};
+    use crate::distance::memo::{MemoCache, Memoized};
+    use crate::distance::phoneme_distance::PhonemeCostCalculator;
+    use crate::distance::phoneme_tokenizer::PhonemeTokenizer;
+    use crate::helpers::parallel::par_map;
+    use crate::phl::symbols::SymbolId;
+    use crate::phl::systems::PhonologicalFeatureSystem;
+
+    #[test]
+    fn test_memo_cache() {
+        let system = PhonologicalFeatureSystem::load("hayes").unwrap();
+        let tokenizer = PhonemeTokenizer::build(&system);
+        let features = FeatureCostCalculator::new(&system);
+        let phonemes = PhonemeCostCalculator::new(&system);
+        let cache = MemoCache::new(64);
+        let (kat, bats) = (tokenizer.tokenize("kæt"), tokenizer.tokenize("bæts"));
+
+        let memoized = cache.memoizing("features", &features);
+        assert_eq!(features.distance_only(&kat, &bats).unwrap(), memoized.distance_only(&kat, &bats).unwrap());
+        assert_eq!(features.distance_only(&kat, &bats).unwrap(), memoized.distance_only(&kat, &bats).unwrap());
+        let tuples = |steps: Vec<LevenshteinStep<SymbolId>>| -> Vec<_> {
+            steps.into_iter().map(|s| (s.action, s.expected, s.actual, s.cost)).collect()
+        };
+        let steps = tuples(features.diff_steps(&kat, &bats).unwrap());
+        assert_eq!(steps, tuples(memoized.diff_steps(&kat, &bats).unwrap()));
+        assert_eq!(steps, tuples(memoized.diff_steps(&kat, &bats).unwrap()));
+        // Phoneme costs of the same pair are a different entry
+        let cost = cache.memoizing("phonemes", &phonemes).distance_only(&kat, &bats).unwrap();
+        assert_eq!(phonemes.distance_only(&kat, &bats).unwrap(), cost);
+        let stats = cache.stats();
+        assert_eq!((2, 3, 0, 2), (stats.hits, stats.misses, stats.evictions, stats.len));
+
+        let unknown = tokenizer.tokenize("kæ1");
+        assert!(memoized.distance_only(&unknown, &bats).is_err());
+        assert_eq!(2, cache.stats().len);
+
+        let words: Vec<_> = (0..200).map(|i| tokenizer.tokenize(&"kæt".repeat(i % 100 + 1))).collect();
+        let costs = par_map(&words, |word| memoized.distance_only(word, &bats).unwrap());
+        for (word, cost) in words.iter().zip(costs) {
+            assert_eq!(features.distance_only(word, &bats).unwrap(), cost);
+        }
+        let stats = cache.stats();
+        assert!(stats.len <= 64);
+        assert!(stats.evictions > 0);
+        for capacity in [1, 5] {
+            let small = MemoCache::new(capacity);
+            let memoized = small.memoizing("features", &features);
+            par_map(&words, |word| memoized.distance_only(word, &bats).unwrap());
+            assert!(small.stats().len <= capacity);
+            assert!(small.stats().evictions > 0);
+        }
+
+        cache.clear();
+        assert_eq!(0, cache.stats().len);
+        assert_eq!(0, cache.stats().hits);
+        let uncached = Memoized::new(None, "features", &features);
+        assert_eq!(features.distance_only(&kat, &bats).unwrap(), uncached.distance_only(&kat, &bats).unwrap());
+    }
+}
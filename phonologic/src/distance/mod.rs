@@ -3,4 +3,13 @@ extern crate core;
 pub mod phoneme_distance;
 pub mod feature_distance;
 pub mod levenshtein;
+pub mod cost_table;
 pub mod phoneme_tokenizer;
+pub mod columnar;
+pub mod feature_index;
+pub mod nbest;
+pub mod incremental;
+pub mod error_counts;
+pub mod stats;
+pub mod memo;
+pub mod utterance;
@@ -0,0 +1,147 @@
+use crate::distance::levenshtein::{fill_column, fill_row, item, ComputeCost, Cost, Levenshteinable, TableColumn};
+use crate::errors::PhlDistanceError;
+
+/// The cost of aligning one reference with each of several hypotheses, as `distance_only` would find it.
+///
+/// The reference's deletion costs are computed once, and the table is filled a hypothesis symbol at a time, so
+/// hypotheses that start the same way (as most of an N-best list does) share the columns for their common prefix.
+pub fn score_nbest<T, C>(
+    calculator: &C,
+    reference: &Vec<T>,
+    hypotheses: &[Vec<T>],
+) -> Vec<Result<Cost, PhlDistanceError>>
+    where T: Levenshteinable + Ord,
+          C: ComputeCost<T> + ?Sized
+{
+    fill_nbest(calculator, reference, hypotheses).into_iter().map(|(cost, _)| cost).collect()
+}
+
+/// The costs `score_nbest` finds, each with the number of cells filled for it past the prefix it shares.
+pub(crate) fn fill_nbest<T, C>(
+    calculator: &C,
+    reference: &Vec<T>,
+    hypotheses: &[Vec<T>],
+) -> Vec<(Result<Cost, PhlDistanceError>, usize)>
+    where T: Levenshteinable + Ord,
+          C: ComputeCost<T> + ?Sized
+{
+    let del_costs: Vec<_> = (0..=reference.len()).map(|i| calculator.cost_del(item(reference, i))).collect();
+    let rows = reference.len() + 1;
+    // columns[j + 1] is column j of the hypothesis being scored, and columns[0] the empty one before it
+    let mut columns = vec![TableColumn::new(rows)];
+
+    by_shared_prefix(hypotheses, |hypothesis, start| {
+        for j in start..=hypothesis.len() {
+            if columns.len() == j + 1 {
+                columns.push(TableColumn::new(rows));
+            }
+            let (filled, rest) = columns.split_at_mut(j + 1);
+            fill_column(calculator, reference, &del_costs, j, item(hypothesis, j), &filled[j], &mut rest[0]);
+        }
+        (columns[hypothesis.len() + 1].total(), (hypothesis.len() + 1 - start) * rows)
+    })
+}
+
+/// The cost of aligning each of several references with one hypothesis, as `distance_only` would find it.
+///
+/// The hypothesis's insertion costs are computed once, and references that start the same way share the rows of the
+/// table for their common prefix.
+pub fn score_multi_reference<T, C>(
+    calculator: &C,
+    references: &[Vec<T>],
+    hypothesis: &Vec<T>,
+) -> Vec<Result<Cost, PhlDistanceError>>
+    where T: Levenshteinable + Ord,
+          C: ComputeCost<T> + ?Sized
+{
+    fill_multi_reference(calculator, references, hypothesis).into_iter().map(|(cost, _)| cost).collect()
+}
+
+/// The costs `score_multi_reference` finds, each with the number of cells filled for it past the prefix it shares.
+pub(crate) fn fill_multi_reference<T, C>(
+    calculator: &C,
+    references: &[Vec<T>],
+    hypothesis: &Vec<T>,
+) -> Vec<(Result<Cost, PhlDistanceError>, usize)>
+    where T: Levenshteinable + Ord,
+          C: ComputeCost<T> + ?Sized
+{
+    let ins_costs: Vec<_> = (0..=hypothesis.len()).map(|j| calculator.cost_ins(item(hypothesis, j))).collect();
+    let width = hypothesis.len() + 1;
+    // rows[i + 1] is row i of the reference being scored, and rows[0] the empty one before it
+    let mut rows = vec![vec![Cost::ZERO; width]];
+    // The first row that couldn't be filled, which fails every reference sharing it
+    let mut failed: Option<(usize, PhlDistanceError)> = None;
+
+    by_shared_prefix(references, |reference, start| {
+        match &failed {
+            Some((i, e)) if *i < start => return (Err(e.clone()), 0),
+            _ => failed = None,
+        }
+        for i in start..=reference.len() {
+            if rows.len() == i + 1 {
+                rows.push(vec![Cost::ZERO; width]);
+            }
+            let (filled, rest) = rows.split_at_mut(i + 1);
+            let row = &mut rest[0];
+            if let Err(e) = fill_row(calculator, i, item(reference, i), hypothesis, &ins_costs, &filled[i], row) {
+                failed = Some((i, e.clone()));
+                return (Err(e), (i + 1 - start) * width);
+            }
+        }
+        (Ok(rows[reference.len() + 1][hypothesis.len()]), (reference.len() + 1 - start) * width)
+    })
+}
+
+/// Scores `sequences` in sorted order, so each shares as long a prefix as possible with the one scored before it, and
+/// returns the results in the original order. `score` is given the first table position it has to recompute: 0 for
+/// the first sequence, or one past the prefix shared with the previous sequence.
+fn by_shared_prefix<T: Ord, R>(sequences: &[Vec<T>], mut score: impl FnMut(&Vec<T>, usize) -> R) -> Vec<R> {
+    let mut order: Vec<usize> = (0..sequences.len()).collect();
+    order.sort_by(|&x, &y| sequences[x].cmp(&sequences[y]));
+
+    let mut results: Vec<Option<R>> = sequences.iter().map(|_| None).collect();
+    let mut previous: Option<&Vec<T>> = None;
+    for idx in order {
+        let sequence = &sequences[idx];
+        let start = match previous {
+            None => 0,
+            Some(previous) => 1 + previous.iter().zip(sequence).take_while(|(x, y)| x == y).count(),
+        };
+        results[idx] = Some(score(sequence, start));
+        previous = Some(sequence);
+    }
+    results.into_iter().map(Option::unwrap).collect()
+}
+
+#[cfg(test)]
+mod tests {
+    use crate::distance::feature_distance::FeatureCostCalculator;
+    use crate::distance::levenshtein::ComputeCost;
+    use crate::distance::nbest::{score_multi_reference, score_nbest};
+    use crate::distance::phoneme_tokenizer::PhonemeTokenizer;
+    use crate::phl::systems::PhonologicalFeatureSystem;
+
+    #[test]
+    fn test_shared_side_scoring() {
+        let system = PhonologicalFeatureSystem::load("hayes").unwrap();
+        let tokenizer = PhonemeTokenizer::build(&system);
+        let calculator = FeatureCostCalculator::new(&system);
+        let transcripts: Vec<_> = ["kæt", "kæts", "kæ", "", "kɑt", "kæt", "bæ1", "bæ1t", "bæt", "kæ1", "ækt"]
+            .iter()
+            .map(|s| tokenizer.tokenize(s))
+            .collect();
+
+        for shared in transcripts.iter() {
+            let nbest = score_nbest(&calculator, shared, &transcripts);
+            let multi = score_multi_reference(&calculator, &transcripts, shared);
+            for (i, other) in transcripts.iter().enumerate() {
+                let expected = format!("{:?}", calculator.distance_only(shared, other));
+                assert_eq!(expected, format!("{:?}", nbest[i]));
+                let expected = format!("{:?}", calculator.distance_only(other, shared));
+                assert_eq!(expected, format!("{:?}", multi[i]));
+            }
+        }
+        assert!(score_nbest(&calculator, &transcripts[0], &[]).is_empty());
+    }
+}
@@ -1,8 +1,9 @@
-use crate::distance::levenshtein::{ComputeCost, DefaultCalculator, Cost};
+use crate::distance::levenshtein::{ComputeCost, Cost};
 use crate::phl::systems::PhonologicalFeatureSystem;
-use crate::phl::parsing::Symbol;
+use crate::phl::symbols::SymbolId;
 use crate::errors::PhlDistanceError;
 
+/// Costs of 0 or 1 per phoneme, multiplied by the system's substitution, deletion and insertion weights.
 pub struct PhonemeCostCalculator<'a> {
     pub(crate) system: &'a PhonologicalFeatureSystem
 }
@@ -12,13 +13,13 @@ impl<'a> PhonemeCostCalculator<'a> {
         PhonemeCostCalculator { system }
     }
 
-    pub(crate) fn is_zero_cost(&self, s: Option<&Symbol>) -> bool {
-        s.is_some() && self.system.is_zero_cost(s.unwrap())
+    pub(crate) fn is_zero_cost(&self, s: Option<&SymbolId>) -> bool {
+        s.is_some() && self.system.is_zero_cost(*s.unwrap())
     }
 }
 
-impl<'a> ComputeCost<Symbol> for PhonemeCostCalculator<'a> {
-    fn cost_sub(&self, expected: Option<&Symbol>, actual: Option<&Symbol>) -> Result<Cost, PhlDistanceError> {
+impl<'a> ComputeCost<SymbolId> for PhonemeCostCalculator<'a> {
+    fn cost_sub(&self, expected: Option<&SymbolId>, actual: Option<&SymbolId>) -> Result<Cost, PhlDistanceError> {
         Ok(
             if self.is_zero_cost(expected) && self.is_zero_cost(actual) {
                 Cost::ZERO
@@ -31,27 +32,37 @@ impl<'a> ComputeCost<Symbol> for PhonemeCostCalculator<'a> {
             }
             else {
                 let (expected, actual) = (expected.unwrap(), actual.unwrap());
-                Cost(if expected != actual { 1.0 } else { 0.0 })
+                Cost(if expected != actual { self.system.weights.substitution } else { 0.0 })
             }
         )
     }
 
-    fn cost_del(&self, expected: Option<&Symbol>) -> Result<Cost, PhlDistanceError> {
-        if expected.is_some() && self.system.is_zero_cost(&expected.unwrap()) {
-            Ok(Cost::ZERO)
-        }
-        else {
-            DefaultCalculator { }.cost_del(expected)
-        }
+    fn cost_del(&self, expected: Option<&SymbolId>) -> Result<Cost, PhlDistanceError> {
+        Ok(
+            if self.is_zero_cost(expected) {
+                Cost::ZERO
+            }
+            else if expected.is_none() {
+                Cost::INFINITY
+            }
+            else {
+                Cost(self.system.weights.deletion)
+            }
+        )
     }
 
-    fn cost_ins(&self, actual: Option<&Symbol>) -> Result<Cost, PhlDistanceError> {
-        if actual.is_some() && self.system.is_zero_cost(&actual.unwrap()) {
-            Ok(Cost::ZERO)
-        }
-        else {
-            DefaultCalculator { }.cost_ins(actual)
-        }
+    fn cost_ins(&self, actual: Option<&SymbolId>) -> Result<Cost, PhlDistanceError> {
+        Ok(
+            if self.is_zero_cost(actual) {
+                Cost::ZERO
+            }
+            else if actual.is_none() {
+                Cost::INFINITY
+            }
+            else {
+                Cost(self.system.weights.insertion)
+            }
+        )
     }
 }
 
@@ -1,75 +1,128 @@
-use regex::Regex;
 use std::collections::HashSet;
-use string_join::Join;
 use crate::phl::systems::PhonologicalFeatureSystem;
 use crate::phl::parsing::Symbol;
-use itertools::Itertools;
+use crate::phl::symbols::{SymbolId, SymbolTable};
 
+/// What a complete match in the trie stands for.
+#[derive(Copy, Clone, Debug)]
+enum Token {
+    Symbol(SymbolId),
+    /// Separators and ignored symbols are matched like any other symbol, so that they take part in longest-match,
+    /// but they don't make it into the output.
+    Skip,
+}
+
+#[derive(Default)]
+struct TrieNode {
+    /// Sorted by character
+    children: Vec<(char, usize)>,
+    token: Option<Token>,
+}
+
+/// Splits transcriptions into symbol ids in a single left-to-right pass over a character trie of the system's
+/// entries, separators and zero-cost symbols, always taking the longest symbol that matches. A character that starts
+/// no symbol becomes a token of its own.
 pub struct PhonemeTokenizer {
-    pattern: Regex,
+    nodes: Vec<TrieNode>,
+    symbols: SymbolTable,
     separators: HashSet<Symbol>,
     ignore_symbols: HashSet<Symbol>,
 }
 
 impl PhonemeTokenizer {
     pub fn build(system: &PhonologicalFeatureSystem) -> Self {
-        let pattern_string = Self::build_pattern_string(system);
-        let pattern = Regex::new(pattern_string.as_str()).unwrap();
-        let separators = system.separators.clone();
-        let ignore_symbols = system.ignore_symbols.clone();
-        Self { pattern, separators, ignore_symbols }
+        let mut tokenizer = Self {
+            nodes: vec![TrieNode::default()],
+            symbols: system.symbols.clone(),
+            separators: system.separators.clone(),
+            ignore_symbols: system.ignore_symbols.clone(),
+        };
+        let symbols = system.entries
+            .iter()
+            .map(|entry| &entry.symbol)
+            .filter(|symbol| !symbol.is_class())
+            .chain(system.separators.iter())
+            .chain(system.zero_cost_symbols.iter());
+        for symbol in symbols {
+            let token = tokenizer.token_for(&symbol.0);
+            tokenizer.insert(&symbol.0, token);
+        }
+        tokenizer
     }
 
-    pub fn tokenize(&self, s: &str) -> Vec<Symbol> {
-        let tokens = self.split_tokens(s)
-            .into_iter()
-            .map(|t| Symbol(t.to_string()))
-            .filter(|t| !self.separators.contains(t) && !self.ignore_symbols.contains(t))
-            .collect();
+    pub fn tokenize(&self, s: &str) -> Vec<SymbolId> {
+        #[cfg(feature = "tracing")]
+        let _span = tracing::trace_span!("tokenize", bytes = s.len()).entered();
+        let mut tokens = Vec::with_capacity(s.len());
+        let mut rest = s;
+        while let Some(c) = rest.chars().next() {
+            let (token, len) = match self.longest_match(rest) {
+                Some(found) => found,
+                None => (self.token_for_char(c), c.len_utf8()),
+            };
+            if let Token::Symbol(id) = token {
+                tokens.push(id);
+            }
+            rest = &rest[len..];
+        }
         tokens
     }
 
-    fn split_tokens(&self, s: &str) -> Vec<String> {
-        let mut s = s;
-        let mut tokens = vec![];
-        while s.len() > 0 {
-            let (token, remainder) = match self.pattern.find(s) {
-                None => (&s[..1], &s[1..]), // todo: error handling for this
-                Some(m) => (&s[m.start()..m.end()], &s[m.end()..])
+    /// The token for the longest symbol `s` starts with, and its length in bytes.
+    fn longest_match(&self, s: &str) -> Option<(Token, usize)> {
+        let mut node = &self.nodes[0];
+        let mut found = None;
+        for (offset, c) in s.char_indices() {
+            node = match self.child(node, c) {
+                Some(idx) => &self.nodes[idx],
+                None => break,
             };
-            tokens.push(token.to_string());
-            s = remainder;
+            if let Some(token) = node.token {
+                found = Some((token, offset + c.len_utf8()));
+            }
         }
-        tokens
+        found
     }
 
-    fn build_pattern_string(system: &PhonologicalFeatureSystem) -> String {
-        r"|".join(
-            Self::sort_and_group_symbols(system)
-                .into_iter()
-                .map(|(_, by_len)| "|".join(by_len))
-        )
+    #[inline]
+    fn child(&self, node: &TrieNode, c: char) -> Option<usize> {
+        node.children
+            .binary_search_by_key(&c, |&(child, _)| child)
+            .ok()
+            .map(|idx| node.children[idx].1)
     }
 
-    fn sort_and_group_symbols(system: &PhonologicalFeatureSystem) -> Vec<(usize, Vec<String>)> {
-        let mut symbol_strings: Vec<_> = system.entries
-            .clone()
-            .into_iter()
-            .map(|entry| entry.symbol)
-            .filter(|symbol| !symbol.is_class())
-            .map(|symbol| symbol.to_string())
-            .collect();
-        symbol_strings.extend(system.separators.iter().map(|s| s.to_string()));
-        symbol_strings.extend(system.zero_cost_symbols.iter().map(|s| s.to_string()));
-        symbol_strings.sort_by_key(|s| -(s.len() as i64));
-        symbol_strings.push(r".".to_string());  // A single character as a last resort
-        symbol_strings
-            .iter()
-            .map(|token| format!(r"^{token}"))
-            .group_by(|s| s.len())
-            .into_iter()
-            .map(|(key, items)| (key, items.into_iter().collect()))
-            .collect()
+    fn insert(&mut self, symbol: &str, token: Token) {
+        let mut idx = 0;
+        for c in symbol.chars() {
+            idx = match self.child(&self.nodes[idx], c) {
+                Some(child) => child,
+                None => {
+                    let child = self.nodes.len();
+                    self.nodes.push(TrieNode::default());
+                    let children = &mut self.nodes[idx].children;
+                    let position = children.partition_point(|&(other, _)| other < c);
+                    children.insert(position, (c, child));
+                    child
+                }
+            };
+        }
+        self.nodes[idx].token = Some(token);
+    }
+
+    fn token_for(&self, symbol: &str) -> Token {
+        if self.separators.contains(symbol) || self.ignore_symbols.contains(symbol) {
+            return Token::Skip;
+        }
+        match self.symbols.id(symbol) {
+            Some(id) => Token::Symbol(id),
+            None => Token::Symbol(self.symbols.unknown_id(symbol.chars().next().unwrap())),
+        }
+    }
+
+    fn token_for_char(&self, c: char) -> Token {
+        let mut buffer = [0; 4];
+        self.token_for(c.encode_utf8(&mut buffer))
     }
 }
 
@@ -93,11 +146,12 @@ mod tests {
             ("stɛθəsko͡ʊp", vec!["s", "t", "ɛ", "θ", "ə", "s", "k", "o͡ʊ", "p"]),
             ("good", vec!["g", "o", "o", "d"]),
             ("/ˈstɛθəsˌkoʊp/", vec!["s", "t", "ɛ", "θ", "ə", "s", "k", "oʊ", "p"]),
+            ("o͡ʊo͡ʊ\n?", vec!["o͡ʊ", "o͡ʊ", "\n", "?"]),
         ];
 
         for (s, expected) in test_cases {
             let expected: Vec<_> = expected.iter().map(|t| Symbol(t.to_string())).collect();
-            let actual = tokenizer.tokenize(s);
+            let actual: Vec<_> = tokenizer.tokenize(s).into_iter().map(|id| system.symbols().resolve(id)).collect();
             assert_eq!(expected, actual);
             // self.assertEqual(expected, actual)        let output = system.analyze_phoneme_errors("koko", "nono");
         }
@@ -114,7 +168,7 @@ mod tests {
 
         for (s, expected) in test_cases {
             let expected: Vec<_> = expected.iter().map(|t| Symbol(t.to_string())).collect();
-            let actual = tokenizer.tokenize(s);
+            let actual: Vec<_> = tokenizer.tokenize(s).into_iter().map(|id| system.symbols().resolve(id)).collect();
             assert_eq!(expected, actual);
             // self.assertEqual(expected, actual)        let output = system.analyze_phoneme_errors("koko", "nono");
         }
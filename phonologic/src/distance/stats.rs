@@ -0,0 +1,413 @@
+use std::borrow::Cow;
+use std::cell::Cell;
+use std::sync::atomic::{AtomicBool, AtomicU64, Ordering};
+use crate::distance::levenshtein::{fill_band, fill_table, ComputeCost, Cost, Levenshteinable, LevenshteinStep};
+use crate::distance::nbest::{fill_multi_reference, fill_nbest, score_multi_reference, score_nbest};
+use crate::distance::phoneme_tokenizer::PhonemeTokenizer;
+use crate::distance::utterance::Transcript;
+use crate::errors::PhlDistanceError;
+use crate::phl::symbols::SymbolId;
+
+/// Seconds since some fixed point, for timing work.
+pub type Clock = fn() -> f64;
+
+/// Where the time recorded by `Stats` was spent
+#[derive(Clone, Copy, Debug, PartialEq, Eq)]
+pub enum Timer {
+    Tokenize,
+    Fill,
+    Backtrace,
+    Compile,
+}
+
+/// Counts of the work done on behalf of an analyzer, and the time it took. Recording is off until `set_enabled`, and
+/// while it's off each recording call only checks the flag. Everything is atomic, so the workers of a batch can
+/// share one `Stats`.
+#[derive(Debug)]
+pub struct Stats {
+    enabled: AtomicBool,
+    clock: Clock,
+    pairs: AtomicU64,
+    tokens: AtomicU64,
+    cells: AtomicU64,
+    cost_calls: AtomicU64,
+    unknown_symbol_errors: AtomicU64,
+    nanos: [AtomicU64; 4],
+}
+
+/// The values of a `Stats` at one point in time
+#[derive(Clone, Copy, Debug, Default, PartialEq)]
+pub struct StatsSnapshot {
+    pub pairs: u64,
+    pub tokens: u64,
+    /// Dynamic programming cells filled. `distance_within` counts only the band it filled, and the N-best scorers only
+    /// the cells past the prefix each alternative shares with the one before it
+    pub cells: u64,
+    pub cost_calls: u64,
+    /// Alignments that failed because a symbol isn't in the system
+    pub unknown_symbol_errors: u64,
+    pub tokenize_seconds: f64,
+    pub fill_seconds: f64,
+    pub backtrace_seconds: f64,
+    pub compile_seconds: f64,
+}
+
+impl Default for Stats {
+    fn default() -> Self {
+        Self::new()
+    }
+}
+
+impl Stats {
+    pub fn new() -> Self {
+        Self::with_clock(default_clock)
+    }
+
+    /// Stats timed with `clock`, for targets where `std::time::Instant` isn't available.
+    pub fn with_clock(clock: Clock) -> Self {
+        Self {
+            enabled: AtomicBool::new(false),
+            clock,
+            pairs: AtomicU64::new(0),
+            tokens: AtomicU64::new(0),
+            cells: AtomicU64::new(0),
+            cost_calls: AtomicU64::new(0),
+            unknown_symbol_errors: AtomicU64::new(0),
+            nanos: Default::default(),
+        }
+    }
+
+    pub fn set_enabled(&self, enabled: bool) {
+        self.enabled.store(enabled, Ordering::Relaxed);
+    }
+
+    #[inline]
+    pub fn is_enabled(&self) -> bool {
+        self.enabled.load(Ordering::Relaxed)
+    }
+
+    pub fn reset(&self) {
+        let counters = [&self.pairs, &self.tokens, &self.cells, &self.cost_calls, &self.unknown_symbol_errors];
+        for counter in counters.into_iter().chain(self.nanos.iter()) {
+            counter.store(0, Ordering::Relaxed);
+        }
+    }
+
+    pub fn snapshot(&self) -> StatsSnapshot {
+        let seconds = |timer: Timer| self.nanos[timer as usize].load(Ordering::Relaxed) as f64 / 1e9;
+        StatsSnapshot {
+            pairs: self.pairs.load(Ordering::Relaxed),
+            tokens: self.tokens.load(Ordering::Relaxed),
+            cells: self.cells.load(Ordering::Relaxed),
+            cost_calls: self.cost_calls.load(Ordering::Relaxed),
+            unknown_symbol_errors: self.unknown_symbol_errors.load(Ordering::Relaxed),
+            tokenize_seconds: seconds(Timer::Tokenize),
+            fill_seconds: seconds(Timer::Fill),
+            backtrace_seconds: seconds(Timer::Backtrace),
+            compile_seconds: seconds(Timer::Compile),
+        }
+    }
+
+    pub fn add_pairs(&self, pairs: usize) {
+        if self.is_enabled() {
+            self.pairs.fetch_add(pairs as u64, Ordering::Relaxed);
+        }
+    }
+
+    /// Counts tokens tokenized outside `tokenize_pair`, such as the alternatives of an N-best list.
+    pub fn add_tokens(&self, tokens: usize) {
+        if self.is_enabled() {
+            self.tokens.fetch_add(tokens as u64, Ordering::Relaxed);
+        }
+    }
+
+    /// Counts cells filled outside a `Recorded` alignment, such as a column `IncrementalAligner::push` adds.
+    pub fn add_cells(&self, cells: usize) {
+        if self.is_enabled() {
+            self.cells.fetch_add(cells as u64, Ordering::Relaxed);
+        }
+    }
+
+    /// Runs `f`, adding the time it took to `timer` if recording is on.
+    #[inline]
+    pub fn time<R>(&self, timer: Timer, f: impl FnOnce() -> R) -> R {
+        if !self.is_enabled() {
+            return f();
+        }
+        let started = (self.clock)();
+        let result = f();
+        let nanos = (((self.clock)() - started) * 1e9).max(0.0) as u64;
+        self.nanos[timer as usize].fetch_add(nanos, Ordering::Relaxed);
+        result
+    }
+
+    /// Tokenizes both sides of a pair (unless they already are), counting it and its tokens.
+    pub fn tokenize_pair<'t, L: Transcript + ?Sized, R: Transcript + ?Sized>(
+        &self,
+        tokenizer: &PhonemeTokenizer,
+        left: &'t L,
+        right: &'t R,
+    ) -> (Cow<'t, Vec<SymbolId>>, Cow<'t, Vec<SymbolId>>) {
+        let tokens = self.time(Timer::Tokenize, || (left.tokens(tokenizer), right.tokens(tokenizer)));
+        if self.is_enabled() {
+            self.pairs.fetch_add(1, Ordering::Relaxed);
+            self.tokens.fetch_add((tokens.0.len() + tokens.1.len()) as u64, Ordering::Relaxed);
+        }
+        tokens
+    }
+
+    /// `calculator`, with its alignments recorded here.
+    pub fn recording<'a, C>(&'a self, calculator: &'a C) -> Recorded<'a, C> {
+        Recorded { calculator, stats: self }
+    }
+
+    fn add_alignment<R>(&self, cells: usize, cost_calls: u64, result: &Result<R, PhlDistanceError>) {
+        self.cells.fetch_add(cells as u64, Ordering::Relaxed);
+        self.cost_calls.fetch_add(cost_calls, Ordering::Relaxed);
+        if let Err(PhlDistanceError::PhonemeNotFoundError(_)) = result {
+            self.unknown_symbol_errors.fetch_add(1, Ordering::Relaxed);
+        }
+    }
+}
+
+#[cfg(not(target_arch = "wasm32"))]
+fn default_clock() -> f64 {
+    use std::time::Instant;
+    lazy_static::lazy_static! {
+        static ref START: Instant = Instant::now();
+    }
+    START.elapsed().as_secs_f64()
+}
+
+/// `Instant::now` panics on wasm, so times stay at zero unless the host supplies a clock.
+#[cfg(target_arch = "wasm32")]
+fn default_clock() -> f64 {
+    0.0
+}
+
+/// A calculator whose `diff_steps`, `distance_only` and `distance_within` record their cells, cost calls, failures
+/// and timings in a `Stats`. With recording off it aligns exactly like the calculator it wraps.
+pub struct Recorded<'a, C> {
+    calculator: &'a C,
+    stats: &'a Stats,
+}
+
+impl<'a, C> Recorded<'a, C> {
+    /// `nbest::score_nbest`, recording each hypothesis as an alignment.
+    pub fn score_nbest<T>(&self, reference: &Vec<T>, hypotheses: &[Vec<T>]) -> Vec<Result<Cost, PhlDistanceError>>
+        where T: Levenshteinable + Ord,
+              C: ComputeCost<T>
+    {
+        if !self.stats.is_enabled() {
+            return score_nbest(self.calculator, reference, hypotheses);
+        }
+        let counting = Counting { calculator: self.calculator, calls: Cell::new(0) };
+        let scored = self.stats.time(Timer::Fill, || fill_nbest(&counting, reference, hypotheses));
+        self.record_alternatives(scored, counting.calls.get())
+    }
+
+    /// `nbest::score_multi_reference`, recording each reference as an alignment.
+    pub fn score_multi_reference<T>(
+        &self,
+        references: &[Vec<T>],
+        hypothesis: &Vec<T>,
+    ) -> Vec<Result<Cost, PhlDistanceError>>
+        where T: Levenshteinable + Ord,
+              C: ComputeCost<T>
+    {
+        if !self.stats.is_enabled() {
+            return score_multi_reference(self.calculator, references, hypothesis);
+        }
+        let counting = Counting { calculator: self.calculator, calls: Cell::new(0) };
+        let scored = self.stats.time(Timer::Fill, || fill_multi_reference(&counting, references, hypothesis));
+        self.record_alternatives(scored, counting.calls.get())
+    }
+
+    /// The alternatives share their cost calls, so all of them are counted with the first.
+    fn record_alternatives(
+        &self,
+        scored: Vec<(Result<Cost, PhlDistanceError>, usize)>,
+        mut cost_calls: u64,
+    ) -> Vec<Result<Cost, PhlDistanceError>> {
+        scored.into_iter().map(|(cost, cells)| {
+            self.stats.add_alignment(cells, std::mem::take(&mut cost_calls), &cost);
+            cost
+        }).collect()
+    }
+}
+
+impl<'a, T: Levenshteinable, C: ComputeCost<T>> ComputeCost<T> for Recorded<'a, C> {
+    fn cost_sub(&self, a: Option<&T>, b: Option<&T>) -> Result<Cost, PhlDistanceError> {
+        self.calculator.cost_sub(a, b)
+    }
+
+    fn cost_del(&self, a: Option<&T>) -> Result<Cost, PhlDistanceError> {
+        self.calculator.cost_del(a)
+    }
+
+    fn cost_ins(&self, b: Option<&T>) -> Result<Cost, PhlDistanceError> {
+        self.calculator.cost_ins(b)
+    }
+
+    fn cost_eq(&self, a: Option<&T>, b: Option<&T>) -> Result<Cost, PhlDistanceError> {
+        self.calculator.cost_eq(a, b)
+    }
+
+    fn diff_steps(&self, a: &Vec<T>, b: &Vec<T>) -> Result<Vec<LevenshteinStep<T>>, PhlDistanceError> {
+        if !self.stats.is_enabled() {
+            return self.calculator.diff_steps(a, b);
+        }
+        let counting = Counting { calculator: self.calculator, calls: Cell::new(0) };
+        let steps = match self.stats.time(Timer::Fill, || fill_table(&counting, a, b)) {
+            Ok(table) => self.stats.time(Timer::Backtrace, || table.backtrace(&counting, a, b)),
+            Err(e) => Err(e),
+        };
+        self.stats.add_alignment(table_cells(a, b), counting.calls.get(), &steps);
+        steps
+    }
+
+    /// Timed as filling, since the rows are filled and traced back bit by bit.
+    fn diff_steps_linear(&self, a: &Vec<T>, b: &Vec<T>) -> Result<Vec<LevenshteinStep<T>>, PhlDistanceError> {
+        if !self.stats.is_enabled() {
+            return self.calculator.diff_steps_linear(a, b);
+        }
+        let counting = Counting { calculator: self.calculator, calls: Cell::new(0) };
+        let steps = self.stats.time(Timer::Fill, || counting.diff_steps_linear(a, b));
+        self.stats.add_alignment(table_cells(a, b), counting.calls.get(), &steps);
+        steps
+    }
+
+    fn distance_only(&self, a: &Vec<T>, b: &Vec<T>) -> Result<Cost, PhlDistanceError> {
+        if !self.stats.is_enabled() {
+            return self.calculator.distance_only(a, b);
+        }
+        let counting = Counting { calculator: self.calculator, calls: Cell::new(0) };
+        let cost = self.stats.time(Timer::Fill, || counting.distance_only(a, b));
+        self.stats.add_alignment(table_cells(a, b), counting.calls.get(), &cost);
+        cost
+    }
+
+    fn distance_within(&self, a: &Vec<T>, b: &Vec<T>, max_cost: Cost) -> Result<Option<Cost>, PhlDistanceError> {
+        if !self.stats.is_enabled() {
+            return self.calculator.distance_within(a, b, max_cost);
+        }
+        let counting = Counting { calculator: self.calculator, calls: Cell::new(0) };
+        let filled = self.stats.time(Timer::Fill, || fill_band(&counting, a, b, max_cost));
+        let cells = filled.as_ref().map_or(table_cells(a, b), |(_, cells)| *cells);
+        let cost = filled.map(|(cost, _)| cost);
+        self.stats.add_alignment(cells, counting.calls.get(), &cost);
+        cost
+    }
+}
+
+fn table_cells<T>(a: &[T], b: &[T]) -> usize {
+    (a.len() + 1) * (b.len() + 1)
+}
+
+/// Counts cost calls for one alignment on one thread, so the shared counter is only touched once per alignment.
+struct Counting<'a, C> {
+    calculator: &'a C,
+    calls: Cell<u64>,
+}
+
+impl<'a, C> Counting<'a, C> {
+    #[inline]
+    fn count(&self) {
+        self.calls.set(self.calls.get() + 1);
+    }
+}
+
+impl<'a, T: Levenshteinable, C: ComputeCost<T>> ComputeCost<T> for Counting<'a, C> {
+    fn cost_sub(&self, a: Option<&T>, b: Option<&T>) -> Result<Cost, PhlDistanceError> {
+        self.count();
+        self.calculator.cost_sub(a, b)
+    }
+
+    fn cost_del(&self, a: Option<&T>) -> Result<Cost, PhlDistanceError> {
+        self.count();
+        self.calculator.cost_del(a)
+    }
+
+    fn cost_ins(&self, b: Option<&T>) -> Result<Cost, PhlDistanceError> {
+        self.count();
+        self.calculator.cost_ins(b)
+    }
+
+    fn cost_eq(&self, a: Option<&T>, b: Option<&T>) -> Result<Cost, PhlDistanceError> {
+        self.count();
+        self.calculator.cost_eq(a, b)
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use crate::distance::feature_distance::FeatureCostCalculator;
+    use crate::distance::levenshtein::{fill_band, ComputeCost, Cost, LevenshteinStep, SpaceBounded};
+    use crate::distance::levenshtein::DEFAULT_MAX_TABLE_CELLS;
+    use crate::distance::memo::Memoized;
+    use crate::distance::nbest::{score_multi_reference, score_nbest};
+    use crate::distance::phoneme_tokenizer::PhonemeTokenizer;
+    use crate::distance::stats::{Stats, StatsSnapshot};
+    use crate::phl::symbols::SymbolId;
+    use crate::phl::systems::PhonologicalFeatureSystem;
+
+    #[test]
+    fn test_stats() {
+        let system = PhonologicalFeatureSystem::load("hayes").unwrap();
+        let tokenizer = PhonemeTokenizer::build(&system);
+        let calculator = FeatureCostCalculator::new(&system);
+        let stats = Stats::new();
+        let recorded = stats.recording(&calculator);
+        let tuples = |steps: Vec<LevenshteinStep<SymbolId>>| -> Vec<_> {
+            steps.into_iter().map(|s| (s.action, s.expected, s.actual, s.cost)).collect()
+        };
+
+        let (left, right) = stats.tokenize_pair(&tokenizer, "kæt", "bæts");
+        let expected = tuples(calculator.diff_steps(&left, &right).unwrap());
+        assert_eq!(expected, tuples(recorded.diff_steps(&left, &right).unwrap()));
+        assert_eq!(StatsSnapshot::default(), stats.snapshot());
+
+        stats.set_enabled(true);
+        let (left, right) = stats.tokenize_pair(&tokenizer, "kæt", "bæts");
+        let steps = recorded.diff_steps(&left, &right).unwrap();
+        assert_eq!(expected, tuples(steps));
+        assert_eq!(calculator.distance_only(&left, &right).unwrap(), recorded.distance_only(&left, &right).unwrap());
+        let (unknown, _) = stats.tokenize_pair(&tokenizer, "kæ1", "");
+        assert!(recorded.distance_only(&unknown, &right).is_err());
+
+        let snapshot = stats.snapshot();
+        assert_eq!(2, snapshot.pairs);
+        assert_eq!(10, snapshot.tokens);
+        assert_eq!(2 * 4 * 5 + 4 * 5, snapshot.cells);
+        assert!(snapshot.cost_calls > 2 * 3 * 4);
+        assert_eq!(1, snapshot.unknown_symbol_errors);
+        assert!(snapshot.fill_seconds > 0.0);
+
+        // Thresholded alignments are recorded too, including through the wrappers the bindings use
+        let within = recorded.distance_within(&left, &right, Cost(100.0)).unwrap();
+        assert_eq!(calculator.distance_within(&left, &right, Cost(100.0)).unwrap(), within);
+        let (_, band) = fill_band(&calculator, &left, &right, Cost(100.0)).unwrap();
+        assert_eq!(snapshot.cells + band as u64, stats.snapshot().cells);
+        let wrapped = SpaceBounded::new(Memoized::new(None, "features", &recorded), DEFAULT_MAX_TABLE_CELLS);
+        let cells = stats.snapshot().cells;
+        assert!(wrapped.diff_steps_within(&left, &right, Cost(1.0)).unwrap().is_none());
+        let (_, band) = fill_band(&calculator, &left, &right, Cost(1.0)).unwrap();
+        assert!(band < 4 * 5);
+        assert_eq!(cells + band as u64, stats.snapshot().cells);
+
+        // N-best alternatives are recorded with only the cells past the prefix they share
+        let transcripts: Vec<_> = ["bæts", "bæt", "kæt"].iter().map(|s| tokenizer.tokenize(s)).collect();
+        let (cells, cost_calls) = (stats.snapshot().cells, stats.snapshot().cost_calls);
+        let expected = format!("{:?}", score_nbest(&calculator, &left, &transcripts));
+        assert_eq!(expected, format!("{:?}", recorded.score_nbest(&left, &transcripts)));
+        assert_eq!(cells + 4 * 4 + 4 + 4 * 3, stats.snapshot().cells);
+        assert!(stats.snapshot().cost_calls > cost_calls);
+        let cells = stats.snapshot().cells;
+        let expected = format!("{:?}", score_multi_reference(&calculator, &transcripts, &right));
+        assert_eq!(expected, format!("{:?}", recorded.score_multi_reference(&transcripts, &right)));
+        assert_eq!(cells + 4 * 5 + 5 + 3 * 5, stats.snapshot().cells);
+
+        stats.reset();
+        assert_eq!(StatsSnapshot::default(), stats.snapshot());
+    }
+}
@@ -0,0 +1,118 @@
+use std::borrow::Cow;
+use std::sync::Arc;
+use crate::distance::phoneme_tokenizer::PhonemeTokenizer;
+use crate::phl::parsing::Symbol;
+use crate::phl::symbols::SymbolId;
+use crate::phl::systems::PhonologicalFeatureSystem;
+
+/// Something to align: text, which is tokenized when it's needed, or the tokens of an `Utterance`.
+pub trait Transcript {
+    fn tokens<'a>(&'a self, tokenizer: &PhonemeTokenizer) -> Cow<'a, Vec<SymbolId>>;
+}
+
+impl Transcript for str {
+    fn tokens<'a>(&'a self, tokenizer: &PhonemeTokenizer) -> Cow<'a, Vec<SymbolId>> {
+        Cow::Owned(tokenizer.tokenize(self))
+    }
+}
+
+impl Transcript for String {
+    fn tokens<'a>(&'a self, tokenizer: &PhonemeTokenizer) -> Cow<'a, Vec<SymbolId>> {
+        self.as_str().tokens(tokenizer)
+    }
+}
+
+impl<T: Transcript + ?Sized> Transcript for &T {
+    fn tokens<'a>(&'a self, tokenizer: &PhonemeTokenizer) -> Cow<'a, Vec<SymbolId>> {
+        (**self).tokens(tokenizer)
+    }
+}
+
+/// A token that isn't in the system, at `position` in the tokens of an `Utterance`
+#[derive(Clone, Debug, PartialEq, Eq)]
+pub struct UnknownSymbol {
+    pub position: usize,
+    pub symbol: Symbol,
+}
+
+/// A transcript tokenized and checked against a system once, so it can be scored any number of times, with either
+/// costs, without doing either again. Cloning one shares its tokens.
+#[derive(Clone, Debug)]
+pub struct Utterance {
+    tokens: Arc<Vec<SymbolId>>,
+    unknown: Vec<UnknownSymbol>,
+}
+
+impl Utterance {
+    /// Tokenizes `text` with `system`'s tokenizer, noting any token `system` has no features for.
+    pub fn new(tokenizer: &PhonemeTokenizer, system: &PhonologicalFeatureSystem, text: &str) -> Self {
+        let tokens = tokenizer.tokenize(text);
+        let unknown = tokens
+            .iter()
+            .enumerate()
+            .filter(|(_, &id)| !system.costs.contains(id))
+            .map(|(position, &id)| UnknownSymbol { position, symbol: system.symbols.resolve(id) })
+            .collect();
+        Self { tokens: Arc::new(tokens), unknown }
+    }
+
+    pub fn tokens(&self) -> &Vec<SymbolId> {
+        &self.tokens
+    }
+
+    /// The tokens feature costs would fail on, in order.
+    pub fn unknown(&self) -> &[UnknownSymbol] {
+        &self.unknown
+    }
+
+    /// Whether every token is in the system, so `FeatureCostCalculator::for_known` can score it.
+    pub fn is_valid(&self) -> bool {
+        self.unknown.is_empty()
+    }
+}
+
+/// Only the tokens of the system the utterance was made for mean anything.
+impl Transcript for Utterance {
+    fn tokens<'a>(&'a self, _tokenizer: &PhonemeTokenizer) -> Cow<'a, Vec<SymbolId>> {
+        Cow::Borrowed(&self.tokens)
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use crate::distance::feature_distance::FeatureCostCalculator;
+    use crate::distance::levenshtein::ComputeCost;
+    use crate::distance::phoneme_tokenizer::PhonemeTokenizer;
+    use crate::distance::utterance::{Transcript, UnknownSymbol, Utterance};
+    use crate::phl::parsing::Symbol;
+    use crate::phl::systems::PhonologicalFeatureSystem;
+
+    #[test]
+    fn test_utterance() {
+        let system = PhonologicalFeatureSystem::load("hayes").unwrap();
+        let tokenizer = PhonemeTokenizer::build(&system);
+        let reference = Utterance::new(&tokenizer, &system, "kæt");
+        let hypothesis = Utterance::new(&tokenizer, &system, "bæts");
+        assert!(reference.is_valid());
+        assert_eq!(&tokenizer.tokenize("kæt"), reference.tokens());
+        assert_eq!(tokenizer.tokenize("bæts"), *"bæts".tokens(&tokenizer));
+
+        let checked = FeatureCostCalculator::new(&system);
+        let unchecked = FeatureCostCalculator::for_known(&system);
+        assert_eq!(
+            checked.diff_steps(reference.tokens(), hypothesis.tokens()).unwrap(),
+            unchecked.diff_steps(&Transcript::tokens(&reference, &tokenizer), hypothesis.tokens()).unwrap(),
+        );
+
+        let unknown = Utterance::new(&tokenizer, &system, "k1æ2");
+        assert!(!unknown.is_valid());
+        assert_eq!(
+            &[
+                UnknownSymbol { position: 1, symbol: Symbol("1".to_string()) },
+                UnknownSymbol { position: 3, symbol: Symbol("2".to_string()) },
+            ],
+            unknown.unknown(),
+        );
+        assert!(checked.distance_only(unknown.tokens(), hypothesis.tokens()).is_err());
+    }
+}
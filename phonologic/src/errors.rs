@@ -19,6 +19,8 @@ pub enum PhlParseError {
     SyntaxError(String),
     RedefinedSymbolError(String),
     FileReadError(String),
+    FileWriteError(String),
+    InvalidBinaryError(String),
     MustHaveDefaultError(),
     SymbolNotDefinedError(String),
     UnexpectedFeaturesError(String),
@@ -35,6 +37,8 @@ impl Display for PhlParseError {
             PhlParseError::SyntaxError(s) => s,
             PhlParseError::RedefinedSymbolError(s) => s,
             PhlParseError::FileReadError(s) => s,
+            PhlParseError::FileWriteError(s) => s,
+            PhlParseError::InvalidBinaryError(s) => s,
             PhlParseError::MustHaveDefaultError() => "",
             PhlParseError::SymbolNotDefinedError(s) => s,
             PhlParseError::UnexpectedFeaturesError(s) => s,
@@ -42,7 +46,7 @@ impl Display for PhlParseError {
     }
 }
 
-#[derive(Debug)]
+#[derive(Debug, Clone)]
 pub enum PhlDistanceError {
     PhonemeNotFoundError(String)
 }
@@ -1,3 +1,4 @@
 extern crate core;
 
-pub(crate) mod introspection;
\ No newline at end of file
+pub(crate) mod introspection;
+pub mod parallel;
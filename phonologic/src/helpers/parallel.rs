@@ -0,0 +1,80 @@
+use std::panic::resume_unwind;
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::thread;
+
+const DEFAULT_CHUNK_SIZE: usize = 64;
+
+pub fn available_workers() -> usize {
+    thread::available_parallelism().map(|n| n.get()).unwrap_or(1)
+}
+
+/// Maps `f` over `items` on a pool of scoped worker threads (one per core), preserving order.
+pub fn par_map<T, R, F>(items: &[T], f: F) -> Vec<R>
+    where T: Sync,
+          R: Send,
+          F: Fn(&T) -> R + Sync
+{
+    par_map_chunks(items, DEFAULT_CHUNK_SIZE, |chunk| chunk.iter().map(&f).collect::<Vec<_>>())
+        .into_iter()
+        .flatten()
+        .collect()
+}
+
+/// Maps `f` over consecutive chunks of `items`. Workers claim chunks as they go, so a few long items
+/// don't hold up the rest of the batch. Results come back in chunk order.
+pub fn par_map_chunks<T, R, F>(items: &[T], chunk_size: usize, f: F) -> Vec<R>
+    where T: Sync,
+          R: Send,
+          F: Fn(&[T]) -> R + Sync
+{
+    let chunks: Vec<&[T]> = items.chunks(chunk_size.max(1)).collect();
+    let workers = available_workers().min(chunks.len());
+    if workers <= 1 {
+        return chunks.into_iter().map(f).collect();
+    }
+
+    let next_chunk = AtomicUsize::new(0);
+    let mut results: Vec<(usize, R)> = thread::scope(|scope| {
+        let handles: Vec<_> = (0..workers)
+            .map(|_| scope.spawn(|| {
+                let mut done = vec![];
+                loop {
+                    let idx = next_chunk.fetch_add(1, Ordering::Relaxed);
+                    match chunks.get(idx) {
+                        Some(chunk) => done.push((idx, f(chunk))),
+                        None => break done,
+                    }
+                }
+            }))
+            .collect();
+        handles
+            .into_iter()
+            .flat_map(|handle| handle.join().unwrap_or_else(|e| resume_unwind(e)))
+            .collect()
+    });
+    results.sort_by_key(|(idx, _)| *idx);
+    results.into_iter().map(|(_, result)| result).collect()
+}
+
+#[cfg(test)]
+mod tests {
+    use crate::helpers::parallel::{par_map, par_map_chunks};
+
+    #[test]
+    fn test_par_map_preserves_order() {
+        let items: Vec<usize> = (0..1000).collect();
+        let actual = par_map(&items, |i| i * 2);
+        let expected: Vec<_> = items.iter().map(|i| i * 2).collect();
+        assert_eq!(expected, actual);
+
+        let empty: Vec<usize> = vec![];
+        assert_eq!(par_map(&empty, |i| *i), Vec::<usize>::new());
+    }
+
+    #[test]
+    fn test_par_map_chunks() {
+        let items: Vec<usize> = (0..10).collect();
+        let sums = par_map_chunks(&items, 3, |chunk| chunk.iter().sum::<usize>());
+        assert_eq!(vec![3, 12, 21, 9], sums);
+    }
+}
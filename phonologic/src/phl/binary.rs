@@ -0,0 +1,134 @@
+use std::str;
+use crate::errors::PhlParseError;
+use crate::errors::PhlParseError::InvalidBinaryError;
+use crate::phl::parsing::{Feature, FeatureValue, Symbol};
+use crate::phl::systems::PhonologicalFeatureEntry;
+
+/// Compiled feature systems are stored as their folded entries, so loading one skips parsing and class resolution
+/// entirely. All integers are little-endian:
+///
+/// ```text
+/// "PHLB" version:u32
+/// num_features:u32 (name)*num_features
+/// num_entries:u32 (symbol value_code*num_features)*num_entries
+/// ```
+///
+/// Strings are a u32 byte length followed by UTF-8. Every entry lists its values in the order of the feature names,
+/// which is the order of `<default>`, as a one-byte index into `FEATURE_VALUES`.
+const MAGIC: &[u8; 4] = b"PHLB";
+const VERSION: u32 = 1;
+const FEATURE_VALUES: [&str; 6] = ["-", "-+", "0", "+-", "+", "?"];
+
+pub(crate) fn encode(entries: &Vec<PhonologicalFeatureEntry>) -> Vec<u8> {
+    let mut bytes = vec![];
+    bytes.extend_from_slice(MAGIC);
+    put_u32(&mut bytes, VERSION);
+
+    let names: Vec<&str> = entries.first().map_or(vec![], |e| e.features.iter().map(|f| f.name.as_str()).collect());
+    put_u32(&mut bytes, names.len() as u32);
+    for name in names.iter() {
+        put_str(&mut bytes, name);
+    }
+
+    put_u32(&mut bytes, entries.len() as u32);
+    for entry in entries {
+        put_str(&mut bytes, &entry.symbol.0);
+        for (feature, name) in entry.features.iter().zip(names.iter()) {
+            debug_assert_eq!(&feature.name, name);
+            let code = FEATURE_VALUES
+                .iter()
+                .position(|&v| v == feature.value.symbol)
+                .expect("feature values are limited to those the grammar accepts");
+            bytes.push(code as u8);
+        }
+    }
+    bytes
+}
+
+pub(crate) fn decode(bytes: &[u8]) -> Result<Vec<PhonologicalFeatureEntry>, PhlParseError> {
+    let mut reader = Reader { bytes, position: 0 };
+    if reader.take(MAGIC.len())? != MAGIC {
+        return Err(InvalidBinaryError("not a compiled feature system".to_string()));
+    }
+    let version = reader.u32()?;
+    if version != VERSION {
+        return Err(InvalidBinaryError(format!("unsupported version {version}")));
+    }
+
+    let num_features = reader.u32()? as usize;
+    let names = (0..num_features).map(|_| reader.str()).collect::<Result<Vec<_>, _>>()?;
+
+    let num_entries = reader.u32()? as usize;
+    let mut entries = Vec::with_capacity(num_entries);
+    for _ in 0..num_entries {
+        let symbol = Symbol::new(reader.str()?);
+        let codes = reader.take(num_features)?;
+        let features = codes
+            .iter()
+            .zip(names.iter())
+            .map(|(&code, &name)| match FEATURE_VALUES.get(code as usize) {
+                Some(value) => Ok(Feature { value: FeatureValue::new(value), name: name.to_string() }),
+                None => Err(InvalidBinaryError(format!("invalid feature value {code} for {symbol}"))),
+            })
+            .collect::<Result<Vec<_>, _>>()?;
+        entries.push(PhonologicalFeatureEntry { symbol, features });
+    }
+    if reader.position != bytes.len() {
+        return Err(InvalidBinaryError("trailing data".to_string()));
+    }
+    Ok(entries)
+}
+
+fn put_u32(bytes: &mut Vec<u8>, n: u32) {
+    bytes.extend_from_slice(&n.to_le_bytes());
+}
+
+fn put_str(bytes: &mut Vec<u8>, s: &str) {
+    put_u32(bytes, s.len() as u32);
+    bytes.extend_from_slice(s.as_bytes());
+}
+
+struct Reader<'a> {
+    bytes: &'a [u8],
+    position: usize,
+}
+
+impl<'a> Reader<'a> {
+    fn take(&mut self, n: usize) -> Result<&'a [u8], PhlParseError> {
+        let end = self.position.checked_add(n).filter(|&end| end <= self.bytes.len());
+        match end {
+            Some(end) => {
+                let taken = &self.bytes[self.position..end];
+                self.position = end;
+                Ok(taken)
+            }
+            None => Err(InvalidBinaryError("unexpected end of data".to_string())),
+        }
+    }
+
+    fn u32(&mut self) -> Result<u32, PhlParseError> {
+        let bytes = self.take(4)?;
+        Ok(u32::from_le_bytes([bytes[0], bytes[1], bytes[2], bytes[3]]))
+    }
+
+    fn str(&mut self) -> Result<&'a str, PhlParseError> {
+        let len = self.u32()? as usize;
+        str::from_utf8(self.take(len)?).map_err(|e| InvalidBinaryError(e.to_string()))
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use crate::phl::binary::{decode, encode};
+    use crate::phl::systems::PhonologicalFeatureSystem;
+
+    #[test]
+    fn test_round_trip() {
+        let system = PhonologicalFeatureSystem::load("hayes").unwrap();
+        let bytes = encode(&system.entries);
+        assert_eq!(system.entries, decode(&bytes).unwrap());
+
+        assert!(decode(&bytes[..bytes.len() - 1]).is_err());
+        assert!(decode(b"<default> = [+feat]").is_err());
+    }
+}
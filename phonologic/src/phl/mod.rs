@@ -2,3 +2,6 @@ extern crate core;
 
 pub mod systems;
 pub mod parsing;
+pub mod symbols;
+pub mod registry;
+mod binary;
@@ -0,0 +1,133 @@
+use std::collections::HashMap;
+use std::fs;
+use std::sync::{Arc, Mutex};
+use std::time::SystemTime;
+use lazy_static::lazy_static;
+use crate::distance::cost_table::CostWeights;
+use crate::distance::feature_index::FeatureIndex;
+use crate::distance::phoneme_tokenizer::PhonemeTokenizer;
+use crate::errors::PhlParseError;
+use crate::phl::systems::PhonologicalFeatureSystem;
+
+/// A feature system with its tokenizer and nearest-neighbour index, built once and shared by everything that loads the same system.
+#[derive(Clone)]
+pub struct SharedSystem {
+    pub system: Arc<PhonologicalFeatureSystem>,
+    pub tokenizer: Arc<PhonemeTokenizer>,
+    pub index: Arc<FeatureIndex>,
+}
+
+impl SharedSystem {
+    /// This system with its costs weighted by `weights`, and a tokenizer and index built for them. It isn't kept in
+    /// the registry.
+    pub fn weighted(&self, weights: &CostWeights) -> Result<SharedSystem, PhlParseError> {
+        if weights == self.system.weights() {
+            return Ok(self.clone());
+        }
+        let system = self.system.weighted(weights)?;
+        let tokenizer = Arc::new(PhonemeTokenizer::build(&system));
+        let index = Arc::new(FeatureIndex::build(&system));
+        Ok(SharedSystem { system: Arc::new(system), tokenizer, index })
+    }
+}
+
+/// Identifies the version of a system file that was loaded. The size is included because a quick rewrite can land
+/// within the resolution of the modification time.
+type FileVersion = Option<(SystemTime, u64)>;
+
+lazy_static! {
+    static ref REGISTRY: Mutex<HashMap<String, (FileVersion, SharedSystem)>> = Mutex::new(HashMap::new());
+}
+
+/// Loads a system the same way `PhonologicalFeatureSystem::load` does, unless it was already loaded in this process.
+/// Built-in systems are kept by name, and files by canonical path, until the file changes on disk.
+///
+/// Systems are parsed and compiled without holding the registry's lock, so loading a large file doesn't hold up
+/// analyzers loading anything else. Two threads loading the same new file at once may both build it, but only the
+/// first to finish is kept.
+pub fn load(name: &str) -> Result<SharedSystem, PhlParseError> {
+    let key = registry_key(name);
+    let version = file_version(name);
+    if let Some(shared) = loaded(&key, &version) {
+        return Ok(shared);
+    }
+    let system = PhonologicalFeatureSystem::load(name)?;
+    let tokenizer = PhonemeTokenizer::build(&system);
+    let index = FeatureIndex::build(&system);
+    let shared = SharedSystem { system: Arc::new(system), tokenizer: Arc::new(tokenizer), index: Arc::new(index) };
+
+    let mut registry = REGISTRY.lock().unwrap_or_else(|e| e.into_inner());
+    match registry.get(&key) {
+        Some((loaded_version, existing)) if *loaded_version == version => Ok(existing.clone()),
+        _ => {
+            registry.insert(key, (version, shared.clone()));
+            Ok(shared)
+        }
+    }
+}
+
+/// Drops every loaded system. Analyzers that already hold one keep it.
+pub fn clear() {
+    REGISTRY.lock().unwrap_or_else(|e| e.into_inner()).clear();
+}
+
+fn loaded(key: &str, version: &FileVersion) -> Option<SharedSystem> {
+    let registry = REGISTRY.lock().unwrap_or_else(|e| e.into_inner());
+    match registry.get(key) {
+        Some((loaded_version, shared)) if loaded_version == version => Some(shared.clone()),
+        _ => None,
+    }
+}
+
+/// Built-in systems by name, and files by canonical path, so that e.g. `./x.phl` and `x.phl` are the same system.
+fn registry_key(name: &str) -> String {
+    if PhonologicalFeatureSystem::is_predefined(name) {
+        return name.to_string();
+    }
+    match fs::canonicalize(name) {
+        Ok(path) => path.to_string_lossy().into_owned(),
+        Err(_) => name.to_string(),
+    }
+}
+
+fn file_version(name: &str) -> FileVersion {
+    let metadata = fs::metadata(name).ok()?;
+    Some((metadata.modified().ok()?, metadata.len()))
+}
+
+#[cfg(test)]
+mod tests {
+    use std::fs;
+    use std::sync::Arc;
+    use crate::phl::registry::load;
+
+    #[test]
+    fn test_shared_systems() {
+        let a = load("hayes").unwrap();
+        let b = load("hayes").unwrap();
+        assert!(Arc::ptr_eq(&a.system, &b.system));
+        assert!(Arc::ptr_eq(&a.tokenizer, &b.tokenizer));
+        assert!(!Arc::ptr_eq(&a.system, &load("hayes-arpabet").unwrap().system));
+        assert!(load("no-such-system.phl").is_err());
+    }
+
+    #[test]
+    fn test_reloads_changed_files() {
+        let path = std::env::temp_dir().join(format!("phonologic-registry-{}.phl", std::process::id()));
+        let path_str = path.to_str().unwrap();
+
+        fs::write(&path, "<default> = [0feat1, 0feat2]\na = [+feat1]\n").unwrap();
+        let first = load(path_str).unwrap();
+        assert!(Arc::ptr_eq(&first.system, &load(path_str).unwrap().system));
+
+        fs::write(&path, "<default> = [0feat1, 0feat2]\na = [+feat1]\nb = [+feat2]\n").unwrap();
+        let second = load(path_str).unwrap();
+        assert!(!Arc::ptr_eq(&first.system, &second.system));
+        assert!(second.system.symbol_id("b").is_some());
+
+        let dotted = path.parent().unwrap().join(".").join(path.file_name().unwrap());
+        assert!(Arc::ptr_eq(&second.system, &load(dotted.to_str().unwrap()).unwrap().system));
+
+        fs::remove_file(&path).unwrap();
+    }
+}
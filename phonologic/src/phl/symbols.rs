@@ -0,0 +1,84 @@
+use std::collections::HashMap;
+use crate::phl::parsing::Symbol;
+
+pub type SymbolId = u32;
+
+/// Interns every symbol a feature system knows about. Entries keep their position in the system as their id, and
+/// zero-cost symbols are numbered after them.
+///
+/// Characters outside the inventory get an id past the end of the table, derived from their code point, so that
+/// unknown tokens still compare equal to each other without the table having to grow.
+#[derive(Clone, Debug, Default)]
+pub struct SymbolTable {
+    symbols: Vec<Symbol>,
+    ids: HashMap<Symbol, SymbolId>,
+}
+
+impl SymbolTable {
+    pub fn new() -> Self {
+        Self::default()
+    }
+
+    pub(crate) fn intern(&mut self, symbol: &Symbol) -> SymbolId {
+        if let Some(&id) = self.ids.get(symbol) {
+            return id;
+        }
+        let id = self.symbols.len() as SymbolId;
+        self.symbols.push(symbol.clone());
+        self.ids.insert(symbol.clone(), id);
+        id
+    }
+
+    pub fn id(&self, symbol: &str) -> Option<SymbolId> {
+        self.ids.get(symbol).copied()
+    }
+
+    pub fn unknown_id(&self, c: char) -> SymbolId {
+        self.symbols.len() as SymbolId + c as SymbolId
+    }
+
+    pub fn is_known(&self, id: SymbolId) -> bool {
+        (id as usize) < self.symbols.len()
+    }
+
+    pub fn get(&self, id: SymbolId) -> Option<&Symbol> {
+        self.symbols.get(id as usize)
+    }
+
+    pub fn resolve(&self, id: SymbolId) -> Symbol {
+        match self.get(id) {
+            Some(symbol) => symbol.clone(),
+            None => {
+                let c = char::from_u32(id - self.symbols.len() as SymbolId).unwrap_or(char::REPLACEMENT_CHARACTER);
+                Symbol(c.to_string())
+            }
+        }
+    }
+
+    pub fn len(&self) -> usize {
+        self.symbols.len()
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use crate::phl::parsing::Symbol;
+    use crate::phl::symbols::SymbolTable;
+
+    #[test]
+    fn test_symbol_table() {
+        let mut table = SymbolTable::new();
+        let a = table.intern(&Symbol::new("a"));
+        let b = table.intern(&Symbol::new("o͡ʊ"));
+        assert_eq!((0, 1), (a, b));
+        assert_eq!(a, table.intern(&Symbol::new("a")));
+        assert_eq!(Some(b), table.id("o͡ʊ"));
+        assert_eq!(None, table.id("x"));
+
+        let x = table.unknown_id('x');
+        assert!(!table.is_known(x));
+        assert_ne!(x, table.unknown_id('y'));
+        assert_eq!(Symbol::new("x"), table.resolve(x));
+        assert_eq!(Symbol::new("o͡ʊ"), table.resolve(b));
+    }
+}
@@ -1,17 +1,36 @@
 use std::collections::{HashMap, HashSet};
+use std::fs;
 use std::hash::Hash;
 use phf::phf_map;
+use crate::distance::cost_table::{CostWeights, FeatureCostTable};
 use crate::errors::PhlParseError;
-use crate::errors::PhlParseError::{MustHaveDefaultError, RedefinedSymbolError, SymbolNotDefinedError, UnexpectedFeaturesError};
-use crate::phl::parsing::{parse_file, Definition, DefinitionItem, Feature, FeatureValue, FeatureVectorFunc, Parseable, PhlFile, Symbol};
+use crate::errors::PhlParseError::{
+    FileReadError, FileWriteError, InvalidTokenError, MustHaveDefaultError, RedefinedSymbolError, SymbolNotDefinedError,
+    UnexpectedFeaturesError,
+};
+use crate::phl::parsing::{parse_file, Definition, DefinitionItem, Feature, FeatureValue, FeatureVectorFunc, PhlFile, Symbol};
+use crate::phl::binary;
+use crate::phl::symbols::{SymbolId, SymbolTable};
+
+/// The built-in systems, compiled from `assets/systems/*.phl` with `phonologic compile`.
+static PREDEFINED_SYSTEMS: phf::Map<&'static str, &'static [u8]> = phf_map! {
+    "hayes" => include_bytes!("../../assets/systems/hayes.phlb"),
+    "hayes-arpabet" => include_bytes!("../../assets/systems/hayes-arpabet.phlb"),
+    "hayes-ipa-arpabet" => include_bytes!("../../assets/systems/hayes-ipa-arpabet.phlb"),
+};
+
+/// Extension of compiled systems written by `PhonologicalFeatureSystem::save`
+pub const COMPILED_EXTENSION: &str = "phlb";
 
 pub struct PhonologicalFeatureSystem {
     pub(crate) entries: Vec<PhonologicalFeatureEntry>,
-    by_symbol: HashMap<Symbol, usize>,
+    pub(crate) symbols: SymbolTable,
     // by_features: HashMap<Vec<Feature>, usize>,
     pub(crate) ignore_symbols: HashSet<Symbol>,
     pub(crate) zero_cost_symbols: HashSet<Symbol>,
     pub(crate) separators: HashSet<Symbol>,
+    pub(crate) costs: FeatureCostTable,
+    pub(crate) weights: CostWeights,
     pub num_features: usize,
 }
 
@@ -22,14 +41,15 @@ pub struct FeatureDelta {
 }
 
 impl PhonologicalFeatureSystem {
-    pub(crate) fn is_zero_cost(&self, s: &Symbol) -> bool {
-        self.zero_cost_symbols.contains(s)
+    pub(crate) fn is_zero_cost(&self, id: SymbolId) -> bool {
+        self.costs.is_zero_cost(id)
     }
 
-    pub fn deltas(&self, a: &Symbol, b: &Symbol) -> Vec<FeatureDelta>{
-        let a_features = &self.get_for_symbol(a).unwrap().features;
-        let b_features = &self.get_for_symbol(b).unwrap().features;
-        a_features
+    /// The features `a` and `b` differ in, or `None` if either has no features, as zero-cost symbols don't.
+    pub fn deltas(&self, a: SymbolId, b: SymbolId) -> Option<Vec<FeatureDelta>> {
+        let a_features = &self.entry(a)?.features;
+        let b_features = &self.entry(b)?.features;
+        let deltas = a_features
             .iter()
             .zip(b_features)
             .filter(|(a_feat, b_feat)| (a_feat != b_feat))
@@ -38,7 +58,8 @@ impl PhonologicalFeatureSystem {
                 left: a_feat.value.clone(),
                 right: b_feat.value.clone()
             })
-            .collect()
+            .collect();
+        Some(deltas)
     }
 }
 
@@ -61,48 +82,151 @@ impl Into<FeatureSystemIdx> for &Vec<Feature> {
 }
 
 impl PhonologicalFeatureSystem {
+    /// Loads a built-in system by name, or a system from a path: a compiled `.phlb` file, or a `.phl` file otherwise.
     pub fn load(name: &str) -> Result<PhonologicalFeatureSystem, PhlParseError> {
-        static PREDEFINED_SYSTEMS: phf::Map<&'static str, &'static str> = phf_map! {
-            "hayes" => include_str!("../../assets/systems/hayes.phl"),
-            "hayes-arpabet" => include_str!("../../assets/systems/hayes-arpabet.phl"),
-            "hayes-ipa-arpabet" => include_str!("../../assets/systems/hayes-ipa-arpabet.phl"),
-        };
-
-        let definitions = match PREDEFINED_SYSTEMS.get(name) {
-            Some(&predefined_contents) => PhlFile::parse(predefined_contents),
-            None => parse_file(name)
-        };
-        let definitions = definitions?;
-
+        if let Some(&compiled) = PREDEFINED_SYSTEMS.get(name) {
+            return Self::from_bytes(compiled);
+        }
+        if name.ends_with(&format!(".{COMPILED_EXTENSION}")) {
+            let compiled = fs::read(name).map_err(|e| FileReadError(e.to_string()))?;
+            return Self::from_bytes(&compiled);
+        }
+        let definitions = parse_file(name)?;
         let system = PhonologicalFeatureSystem::build(&definitions)?;
         Ok(system)
     }
 
+    /// Whether `load` takes `name` to be one of the built-in systems.
+    pub fn is_predefined(name: &str) -> bool {
+        PREDEFINED_SYSTEMS.get(name).is_some()
+    }
+
     pub fn build(definitions: &PhlFile) -> Result<Self, PhlParseError> {
         let entries = Self::fold_entries(definitions)?;
+        Self::from_entries(entries)
+    }
+
+    /// Loads a system compiled with `to_bytes`, without parsing it again.
+    pub fn from_bytes(bytes: &[u8]) -> Result<Self, PhlParseError> {
+        Self::from_entries(binary::decode(bytes)?)
+    }
+
+    pub fn to_bytes(&self) -> Vec<u8> {
+        binary::encode(&self.entries)
+    }
+
+    /// Writes the compiled form of this system, which `load` reads back if the path ends in `.phlb`.
+    pub fn save(&self, path: &str) -> Result<(), PhlParseError> {
+        fs::write(path, self.to_bytes()).map_err(|e| FileWriteError(e.to_string()))
+    }
+
+    /// A copy of this system whose costs are weighted by `weights`, instead of the weights it was compiled with.
+    pub fn weighted(&self, weights: &CostWeights) -> Result<Self, PhlParseError> {
+        Self::compile(self.entries.clone(), weights)
+    }
+
+    pub fn weights(&self) -> &CostWeights {
+        &self.weights
+    }
+
+    fn from_entries(entries: Vec<PhonologicalFeatureEntry>) -> Result<Self, PhlParseError> {
+        Self::compile(entries, &CostWeights::default())
+    }
+
+    fn compile(entries: Vec<PhonologicalFeatureEntry>, weights: &CostWeights) -> Result<Self, PhlParseError> {
         if entries.len() == 0 || entries[0].symbol != Symbol::default() {
             return Err(MustHaveDefaultError());
         }
         let num_features = entries[0].features.len();
-        let mut by_symbol: HashMap<Symbol, _> = HashMap::new();
+        let mut symbols = SymbolTable::new();
         // let mut by_features: HashMap<Vec<Feature>, _> = HashMap::new();
-        for (idx, entry) in entries.iter().enumerate() {
-            by_symbol.insert(entry.symbol.clone(), idx);
+        for entry in entries.iter() {
+            symbols.intern(&entry.symbol);
             // by_features.insert(entry.features.clone(), idx);
         }
+        if weights.zero_cost_symbols.iter().any(String::is_empty) {
+            return Err(InvalidTokenError("Zero-cost symbols can't be empty".to_string()));
+        }
+        let zero_cost_list: Vec<_> = ["<sil>", "<unk>", "<spn>"]
+            .into_iter()
+            .chain(weights.zero_cost_symbols.iter().map(String::as_str))
+            .map(|s| Symbol(s.to_string()))
+            .collect();
+        for symbol in zero_cost_list.iter() {
+            symbols.intern(symbol);
+        }
         let ignore_symbols = HashSet::from([" ", "ˌ", "ˈ", "/", "[", "]"].map(|s| Symbol(s.to_string())));
-        let zero_cost_symbols = HashSet::from(["<sil>", "<unk>", "<spn>"].map(|s| Symbol(s.to_string())));
+        let zero_cost_symbols: HashSet<_> = zero_cost_list.into_iter().collect();
         let separators: HashSet<_> = vec![" "].into_iter().map(|s| Symbol(s.to_string())).collect();
-        Ok(Self { entries, by_symbol, ignore_symbols, zero_cost_symbols, separators, num_features })
+        let feature_names: Vec<_> = entries[0].features.iter().map(|f| f.name.as_str()).collect();
+        let feature_weights = weights.feature_vector(&feature_names)?;
+        let costs = FeatureCostTable::compile(&entries, &symbols, &zero_cost_symbols, &feature_weights, weights);
+        let weights = weights.clone();
+        Ok(Self { entries, symbols, ignore_symbols, zero_cost_symbols, separators, costs, weights, num_features })
+    }
+
+    pub fn symbols(&self) -> &SymbolTable {
+        &self.symbols
+    }
+
+    pub fn symbol_id(&self, symbol: &str) -> Option<SymbolId> {
+        self.symbols.id(symbol)
+    }
+
+    pub fn entry(&self, id: SymbolId) -> Option<&PhonologicalFeatureEntry> {
+        self.entries.get(id as usize)
     }
 
     pub fn get_for_symbol(&self, symbol: &Symbol) -> Option<&PhonologicalFeatureEntry> {
-        match self.by_symbol.get(symbol) {
-            Some(&i) => self.entries.get(i),
+        match self.symbol_id(&symbol.0) {
+            Some(id) => self.entry(id),
             None => None
         }
     }
 
+    /// Ids of the system's phonemes, i.e. every entry that isn't a class, in the order they were defined.
+    pub fn inventory(&self) -> Vec<SymbolId> {
+        self.entries
+            .iter()
+            .enumerate()
+            .filter(|(_, entry)| !entry.symbol.is_class())
+            .map(|(id, _)| id as SymbolId)
+            .collect()
+    }
+
+    /// The feature values of any entry, in `feature_names()` order.
+    pub fn feature_vector(&self, id: SymbolId) -> Option<Vec<f64>> {
+        Some(self.entry(id)?.features.iter().map(|f| f.value.value).collect())
+    }
+
+    pub fn feature_names(&self) -> Vec<&str> {
+        self.entries[0].features.iter().map(|f| f.name.as_str()).collect()
+    }
+
+    /// The inventory as a dense matrix of feature values.
+    pub fn feature_matrix(&self) -> FeatureMatrix {
+        let inventory = self.inventory();
+        let values = inventory
+            .iter()
+            .flat_map(|&id| self.entries[id as usize].features.iter().map(|f| f.value.value as f32))
+            .collect();
+        FeatureMatrix {
+            symbols: inventory.iter().map(|&id| self.symbols.resolve(id).to_string()).collect(),
+            features: self.feature_names().into_iter().map(str::to_string).collect(),
+            values,
+        }
+    }
+
+    /// Feature distance between every pair of phonemes, row-major in `inventory()` order. These are the same
+    /// substitution costs the aligner uses, read from the system's compiled cost table.
+    pub fn distance_matrix(&self) -> Vec<f64> {
+        let inventory = self.inventory();
+        inventory
+            .iter()
+            .flat_map(|&expected| inventory.iter().map(move |&actual| self.costs.sub(expected, actual).0))
+            .collect()
+    }
+
     // pub fn get_for_features(&self, features: &Vec<Feature>) -> Option<&PhonologicalFeatureEntry> {
     //     match self.by_features.get(features) {
     //         Some(&i) => self.entries.get(i),
@@ -139,6 +263,25 @@ impl PhonologicalFeatureSystem {
     }
 }
 
+/// A system's phonemes as a dense matrix of feature values, one row per symbol.
+#[derive(Clone, Debug)]
+pub struct FeatureMatrix {
+    pub symbols: Vec<String>,
+    pub features: Vec<String>,
+    /// Row-major: -1, -0.5, 0, 0.5 or 1, and NaN for a feature left undefined
+    pub values: Vec<f32>,
+}
+
+impl FeatureMatrix {
+    /// The values doubled so they fit in integers, with `i8::MIN` for undefined features.
+    pub fn half_steps(&self) -> Vec<i8> {
+        self.values
+            .iter()
+            .map(|&v| if v.is_nan() { i8::MIN } else { (v * 2.0) as i8 })
+            .collect()
+    }
+}
+
 #[derive(Eq, PartialEq, Clone, Debug)]
 pub struct PhonologicalFeatureEntry {
     pub(crate) symbol: Symbol,
@@ -171,10 +314,10 @@ fn compute_features(
     for item in &definition.items {
         features = match item {
             DefinitionItem::Sym(symbol) => {
-                if !symbol_map.contains_key(&symbol) {
+                if !symbol_map.contains_key(symbol) {
                     return Err(SymbolNotDefinedError(symbol.to_string()))
                 }
-                let base = symbol_map.get(&symbol).unwrap().features.clone();
+                let base = symbol_map.get(symbol).unwrap().features.clone();
                 base.apply_features(&features)
             },
             DefinitionItem::Feats(f) => {
@@ -202,7 +345,52 @@ fn compute_features(
 #[cfg(test)]
 mod tests {
     use crate::phl::parsing::{Parseable, PhlFile};
-    use crate::phl::systems::PhonologicalFeatureSystem;
+    use crate::phl::systems::{PhonologicalFeatureSystem, PREDEFINED_SYSTEMS};
+
+    #[test]
+    fn test_predefined_systems_are_compiled() {
+        let sources = [
+            ("hayes", include_str!("../../assets/systems/hayes.phl")),
+            ("hayes-arpabet", include_str!("../../assets/systems/hayes-arpabet.phl")),
+            ("hayes-ipa-arpabet", include_str!("../../assets/systems/hayes-ipa-arpabet.phl")),
+        ];
+        assert_eq!(sources.len(), PREDEFINED_SYSTEMS.len());
+        for (name, source) in sources {
+            let system = PhonologicalFeatureSystem::build(&PhlFile::parse(source).unwrap()).unwrap();
+            assert!(
+                Some(&system.to_bytes()[..]) == PREDEFINED_SYSTEMS.get(name).copied(),
+                "assets/systems/{name}.phlb is out of date with {name}.phl, recompile it with \
+                `cargo run -p phonologic-cli -- compile phonologic/assets/systems/{name}.phl`"
+            );
+        }
+    }
+
+    #[test]
+    fn test_feature_and_distance_matrix() {
+        let system = PhonologicalFeatureSystem::load("hayes-arpabet").unwrap();
+        let matrix = system.feature_matrix();
+        let n = matrix.symbols.len();
+        assert_eq!(system.inventory().len(), n);
+        assert!(matrix.symbols.iter().all(|s| !s.starts_with('<')));
+        assert_eq!(system.num_features, matrix.features.len());
+        assert_eq!(n * system.num_features, matrix.values.len());
+
+        let row = |symbol: &str| matrix.symbols.iter().position(|s| s == symbol).unwrap();
+        let voice = matrix.features.iter().position(|f| f == "voice").unwrap();
+        assert_eq!(-1.0, matrix.values[row("F") * system.num_features + voice]);
+        assert_eq!(1.0, matrix.values[row("V") * system.num_features + voice]);
+        assert_eq!(-2, matrix.half_steps()[row("F") * system.num_features + voice]);
+
+        let distances = system.distance_matrix();
+        assert_eq!(n * n, distances.len());
+        assert_eq!(1.0, distances[row("F") * n + row("V")]);
+        for i in 0..n {
+            assert_eq!(0.0, distances[i * n + i]);
+            for j in 0..n {
+                assert_eq!(distances[i * n + j], distances[j * n + i]);
+            }
+        }
+    }
 
     #[test]
     fn test_build_system() {